@@ -2,6 +2,8 @@ import sqlite3
 import os
 import logging
 import argparse
+from fleet_db import connect, ANALYSIS, CLEANUP
+from fleet_tables import has_fleet_tables, prune_orphans, dedup_fleets, DEDUP_KEEP
 
 # Configure logging
 logging.basicConfig(
@@ -14,8 +16,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DatabaseCleanup")
 
-def cleanup_database(db_file, max_points=425, backup=True):
-    """Remove all fleets with points over the specified maximum"""
+def backup_database(db_file, backup_file, pages=1024):
+    """Copy a database with SQLite's online backup API, pages at a time
+    
+    Each step holds the source read lock only briefly, so writers and readers keep
+    running; memory use is bounded by the page cache instead of the file size.
+    """
+    logged = [0]
+    
+    # Log progress roughly every 10%
+    def progress(status, remaining, total):
+        done = total - remaining
+        if total > 0 and (remaining == 0 or done - logged[0] >= total // 10):
+            logged[0] = done
+            logger.info(f"Backup progress: {done}/{total} pages ({done * 100 // total}%)")
+    
+    source = connect(db_file, ANALYSIS)
+    target = sqlite3.connect(backup_file)
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    finally:
+        target.close()
+        source.close()
+
+def enable_incremental_vacuum(conn):
+    """Switch a database to auto_vacuum=INCREMENTAL; returns True if it already was
+    
+    Changing the mode of an existing database takes one full VACUUM, after which
+    later cleanups reclaim space incrementally.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return True
+    logger.info("Converting database to auto_vacuum=INCREMENTAL (one-time full VACUUM)...")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return False
+
+def incremental_vacuum(conn, step_pages=2000):
+    """Return free pages to the file system in short transactions of step_pages pages
+    
+    Each step is its own write transaction, so readers and the scrapers' writers are
+    only held up for one step at a time rather than for a whole-file rewrite.
+    """
+    conn.commit()
+    if not enable_incremental_vacuum(conn):
+        return
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    logger.info(f"Reclaiming {free_pages} free pages ({free_pages * page_size / (1024 * 1024):.1f} MB) "
+                f"in steps of {step_pages}...")
+    reclaimed = 0
+    while True:
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining == 0:
+            break
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({step_pages});")
+        reclaimed += remaining - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        logger.info(f"Incremental vacuum: {reclaimed}/{free_pages} pages reclaimed")
+
+def cleanup_database(db_file, max_points=425, backup=True, vacuum="incremental", backup_pages=1024,
+                     vacuum_step=2000, dedup=None):
+    """Remove all fleets with points over the specified maximum
+    
+    dedup ("first" or "last") also removes fleets repeating another fleet's list,
+    keeping that copy of each. vacuum is "incremental" (reclaim free pages in steps of vacuum_step pages),
+    "full" (rewrite the file with VACUUM) or "none".
+    """
     
     # Check if database exists
     if not os.path.exists(db_file):
@@ -27,10 +94,8 @@ def cleanup_database(db_file, max_points=425, backup=True):
         backup_file = f"{db_file}.backup"
         logger.info(f"Creating backup of database at {backup_file}")
         try:
-            # Use binary copy for backup
-            with open(db_file, 'rb') as src_file:
-                with open(backup_file, 'wb') as dst_file:
-                    dst_file.write(src_file.read())
+            # Online backup: copies pages in steps, consistent even while a WAL writer is active
+            backup_database(db_file, backup_file, pages=backup_pages)
             logger.info("Backup created successfully")
         except Exception as e:
             logger.error(f"Failed to create backup: {e}")
@@ -38,7 +103,7 @@ def cleanup_database(db_file, max_points=425, backup=True):
     
     # Connect to database
     try:
-        conn = sqlite3.connect(db_file)
+        conn = connect(db_file, CLEANUP)
         cursor = conn.cursor()
         
         # Count total records
@@ -46,12 +111,15 @@ def cleanup_database(db_file, max_points=425, backup=True):
         total_records = cursor.fetchone()[0]
         logger.info(f"Total records in database: {total_records}")
         
+        # Drop repeated lists with a GROUP BY over the fingerprint index
+        duplicates_removed = dedup_fleets(conn, keep=dedup) if dedup else 0
+        
         # Count records to be deleted
         cursor.execute(f"SELECT COUNT(*) FROM fleets WHERE points > {max_points}")
         records_to_delete = cursor.fetchone()[0]
         logger.info(f"Records to be deleted (points > {max_points}): {records_to_delete}")
         
-        if records_to_delete == 0:
+        if records_to_delete == 0 and not duplicates_removed:
             logger.info("No records to delete. Database is already clean.")
             conn.close()
             return True
@@ -71,6 +139,8 @@ def cleanup_database(db_file, max_points=425, backup=True):
         # Perform the deletion
         logger.info(f"Deleting fleets with points > {max_points}...")
         cursor.execute(f"DELETE FROM fleets WHERE points > {max_points}")
+        if has_fleet_tables(conn):
+            prune_orphans(conn)
         conn.commit()
         
         # Count remaining records
@@ -90,10 +160,13 @@ def cleanup_database(db_file, max_points=425, backup=True):
         for faction, count in faction_counts:
             logger.info(f"  {faction}: {count}")
         
-        # Run VACUUM to reclaim space
-        logger.info("Running VACUUM to optimize database size...")
-        cursor.execute("VACUUM")
-        conn.commit()
+        # Reclaim the space freed by the deletion
+        if vacuum == "incremental":
+            incremental_vacuum(conn, step_pages=vacuum_step)
+        elif vacuum == "full":
+            logger.info("Running VACUUM to optimize database size...")
+            cursor.execute("VACUUM")
+            conn.commit()
         
         # Close connection
         conn.close()
@@ -109,6 +182,13 @@ def main():
     parser.add_argument('--database', '-d', default='armada_fleets_merged.db', help='Database file path')
     parser.add_argument('--max-points', '-m', type=int, default=425, help='Maximum points threshold')
     parser.add_argument('--no-backup', action='store_true', help='Skip creating a backup')
+    parser.add_argument('--dedup', choices=DEDUP_KEEP, default=None,
+                        help='Also delete fleets that repeat another list, keeping the first or last copy of each')
+    parser.add_argument('--backup-pages', type=int, default=1024, help='Pages copied per online backup step')
+    parser.add_argument('--vacuum', choices=['incremental', 'full', 'none'], default='incremental',
+                        help='How to reclaim freed space: auto_vacuum=INCREMENTAL steps (the first run converts '
+                             'the database with one full VACUUM), a full VACUUM, or not at all')
+    parser.add_argument('--vacuum-step', type=int, default=2000, help='Pages freed per incremental vacuum step')
     args = parser.parse_args()
     
     logger.info(f"Starting cleanup of {args.database} with max points {args.max_points}")
@@ -116,7 +196,11 @@ def main():
     success = cleanup_database(
         db_file=args.database,
         max_points=args.max_points,
-        backup=not args.no_backup
+        backup=not args.no_backup,
+        vacuum=args.vacuum,
+        backup_pages=args.backup_pages,
+        vacuum_step=args.vacuum_step,
+        dedup=args.dedup
     )
     
     if success:
@@ -1,42 +1,192 @@
-import sqlite3
+import math
+import argparse
 import pandas as pd
+from fleet_db import connect, ANALYSIS
+from fleet_codec import DERIVED_COLUMNS, FINGERPRINT_COLUMN, register_functions, fleet_select_sql
+from fleet_tables import count_unique_lists
 
-# Connect to the database
-conn = sqlite3.connect('armada_fleets-357111.db')
-cursor = conn.cursor()
-
-# Get table names
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = cursor.fetchall()
-print("Tables in the database:", tables)
-
-# Get column information
-cursor.execute("PRAGMA table_info(fleets)")
-columns = cursor.fetchall()
-print("\nColumns in the fleets table:")
-for col in columns:
-    print(col)
-
-# Count total records
-cursor.execute("SELECT COUNT(*) FROM fleets")
-count = cursor.fetchone()[0]
-print(f"\nTotal records: {count}")
-
-# Sample data query (first 5 records)
-cursor.execute("SELECT numerical_id, fleet_name, faction, commander, points FROM fleets LIMIT 5")
-sample_data = cursor.fetchall()
-print("\nSample data:")
-for row in sample_data:
-    print(row)
-
-# Using pandas for more complex analysis
-df = pd.read_sql_query("SELECT * FROM fleets", conn)
-print("\nDatabase summary using pandas:")
-print(df.describe())
-
-# Faction distribution
-print("\nFaction distribution:")
-print(df['faction'].value_counts())
-
-# Close the connection
-conn.close()
\ No newline at end of file
+# Row labels of DataFrame.describe() for numeric columns
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Columns pandas would load as numeric: at least one value and only INTEGER/REAL values
+def numeric_columns(conn):
+    """Return [(column, non-null count)] for the columns describe() would summarize"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(fleets)") if row[1] not in DERIVED_COLUMNS]
+    checks = ", ".join(
+        f"COUNT({column}), TOTAL(typeof({column}) IN ('text', 'blob'))" for column in columns
+    )
+    row = conn.execute(f"SELECT {checks} FROM fleets").fetchone()
+    result = []
+    for i, column in enumerate(columns):
+        count, non_numeric = row[2 * i], row[2 * i + 1]
+        if count and not non_numeric:
+            result.append((column, count))
+    return result
+
+# One ordered pass over a column's distinct values gives min/max, exact quantiles and moments
+def column_summary(conn, column, count, chunk_size=10000):
+    """Return the describe() statistics of one numeric column with constant memory
+
+    SQLite streams (value, frequency) pairs in value order, so quantiles are read off the
+    cumulative frequency with pandas' linear interpolation, and the mean and variance are
+    accumulated exactly for integers (weighted Welford updates otherwise).
+    """
+    ranks = []
+    for q in QUANTILES:
+        position = (count - 1) * q
+        low = math.floor(position)
+        ranks.append((low, min(low + 1, count - 1), position - low))
+    wanted = sorted({rank for low, high, _ in ranks for rank in (low, high)})
+    values_at = {}
+
+    minimum = maximum = None
+    seen = 0
+    exact = True
+    total = total_squares = 0
+    mean = m2 = 0.0
+
+    cursor = conn.execute(
+        f"SELECT {column}, COUNT(*) FROM fleets WHERE {column} IS NOT NULL GROUP BY {column} ORDER BY {column}"
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for value, frequency in rows:
+            if minimum is None:
+                minimum = value
+            maximum = value
+            while wanted and wanted[0] < seen + frequency:
+                values_at[wanted.pop(0)] = value
+            seen += frequency
+
+            if exact and not isinstance(value, int):
+                # First REAL value: continue from the exact integer sums with Welford updates
+                exact = False
+                previous = seen - frequency
+                if previous:
+                    mean = total / previous
+                    m2 = total_squares - total * total / previous
+            if exact:
+                total += value * frequency
+                total_squares += value * value * frequency
+            else:
+                delta = value - mean
+                mean += delta * frequency / seen
+                m2 += delta * (value - mean) * frequency
+
+    if exact:
+        mean_value = total / count
+        variance = (count * total_squares - total * total) / (count * (count - 1)) if count > 1 else math.nan
+    else:
+        mean_value = mean
+        variance = m2 / (count - 1) if count > 1 else math.nan
+
+    quantiles = []
+    for low, high, fraction in ranks:
+        low_value, high_value = values_at[low], values_at[high]
+        quantiles.append(low_value + (high_value - low_value) * fraction)
+
+    return [float(count), float(mean_value), math.sqrt(variance) if variance == variance else math.nan,
+            float(minimum), *[float(value) for value in quantiles], float(maximum)]
+
+def streaming_describe(conn, chunk_size=10000):
+    """Build the same DataFrame as df.describe() without loading the table"""
+    summary = {}
+    for column, count in numeric_columns(conn):
+        summary[column] = column_summary(conn, column, count, chunk_size)
+    return pd.DataFrame(summary, index=DESCRIBE_INDEX)
+
+def streaming_value_counts(conn, column):
+    """Build the same Series as df[column].value_counts() with a GROUP BY"""
+    rows = conn.execute(
+        f"SELECT {column}, COUNT(*), MIN(rowid) FROM fleets WHERE {column} IS NOT NULL GROUP BY {column}"
+    ).fetchall()
+    # Ties keep first-appearance order, like pandas' hash table
+    rows.sort(key=lambda row: (-row[1], row[2]))
+    return pd.Series([row[1] for row in rows], index=pd.Index([row[0] for row in rows], name=column),
+                     name="count", dtype="int64")
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize an Armada fleets database')
+    parser.add_argument('--db', default='armada_fleets-357111.db', help='Database file to analyze')
+    parser.add_argument('--stream', action='store_true',
+                        help='Compute the summary with SQL aggregates and chunked cursors instead of loading '
+                             'the table into pandas (constant memory, same report)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows fetched per cursor chunk in --stream mode')
+    parser.add_argument('--commanders', action='store_true', help='Also print the commander distribution')
+    parser.add_argument('--unique', action='store_true',
+                        help='Also print how many distinct fleet lists there are (by content fingerprint)')
+    args = parser.parse_args()
+
+    # Connect to the database (read-only, large cache and mmap)
+    conn = connect(args.db, ANALYSIS)
+    cursor = conn.cursor()
+
+    # Read compressed fleet_data transparently
+    register_functions(conn)
+
+    # Get table names
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    tables = cursor.fetchall()
+    print("Tables in the database:", tables)
+
+    # Get column information
+    cursor.execute("PRAGMA table_info(fleets)")
+    columns = cursor.fetchall()
+    print("\nColumns in the fleets table:")
+    for col in columns:
+        print(col)
+
+    # Count total records
+    cursor.execute("SELECT COUNT(*) FROM fleets")
+    count = cursor.fetchone()[0]
+    print(f"\nTotal records: {count}")
+
+    # Distinct lists by fingerprint (the column is filled in by fleet_tables.py index)
+    if args.unique:
+        if any(col[1] == FINGERPRINT_COLUMN for col in columns):
+            unique, missing = count_unique_lists(conn)
+            print(f"Unique fleet lists: {unique}" + (f" ({missing} fleets not fingerprinted yet)" if missing else ""))
+        else:
+            print("Unique fleet lists: unknown (no fingerprint column; run fleet_tables.py index first)")
+
+    # Sample data query (first 5 records)
+    cursor.execute("SELECT numerical_id, fleet_name, faction, commander, points FROM fleets LIMIT 5")
+    sample_data = cursor.fetchall()
+    print("\nSample data:")
+    for row in sample_data:
+        print(row)
+
+    if args.stream:
+        # Aggregate in SQLite; only the summary frames are built in pandas
+        print("\nDatabase summary using pandas:")
+        print(streaming_describe(conn, args.chunk_size))
+
+        # Faction distribution
+        print("\nFaction distribution:")
+        print(streaming_value_counts(conn, 'faction'))
+
+        if args.commanders:
+            print("\nCommander distribution:")
+            print(streaming_value_counts(conn, 'commander'))
+    else:
+        # Using pandas for more complex analysis
+        df = pd.read_sql_query(fleet_select_sql(conn), conn)
+        print("\nDatabase summary using pandas:")
+        print(df.describe())
+
+        # Faction distribution
+        print("\nFaction distribution:")
+        print(df['faction'].value_counts())
+
+        if args.commanders:
+            print("\nCommander distribution:")
+            print(df['commander'].value_counts())
+
+    # Close the connection
+    conn.close()
+
+if __name__ == "__main__":
+    main()
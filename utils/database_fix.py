@@ -1,9 +1,11 @@
 import os
-import sqlite3
 import logging
 import argparse
-import time
 from pathlib import Path
+from fleet_db import connect, BULK_MERGE, ANALYSIS, CLEANUP
+from fleet_merge import merge_shards, kway_merge, MERGE_POLICIES
+from fleet_codec import DICT_COLUMN, has_codec_column, compress_database, export_csv
+from fleet_tables import index_fleets, has_fleet_tables, prune_orphans, dedup_fleets, count_unique_lists, has_fingerprints
 
 # Configure logging
 logging.basicConfig(
@@ -35,7 +37,7 @@ def analyze_database(db_file):
     try:
         size_mb = get_db_size(db_file)
         
-        conn = sqlite3.connect(db_file)
+        conn = connect(db_file, ANALYSIS)
         cursor = conn.cursor()
         
         # Check if the fleets table exists
@@ -61,6 +63,19 @@ def analyze_database(db_file):
             cursor.execute("SELECT MIN(numerical_id), MAX(numerical_id) FROM fleets")
             min_id, max_id = cursor.fetchone()
         
+        # Count rows stored with dictionary-compressed fleet_data
+        compressed_count = 0
+        if has_codec_column(conn):
+            cursor.execute(f"SELECT COUNT(*) FROM fleets WHERE {DICT_COLUMN} IS NOT NULL")
+            compressed_count = cursor.fetchone()[0]
+        
+        # Count distinct fleet lists by content fingerprint
+        unique_lists = None
+        if has_fingerprints(conn):
+            unique_lists, unfingerprinted = count_unique_lists(conn)
+            if unfingerprinted:
+                unique_lists = None
+        
         # Get faction distribution
         factions = {}
         cursor.execute("SELECT faction, COUNT(*) FROM fleets GROUP BY faction")
@@ -77,6 +92,8 @@ def analyze_database(db_file):
             'min_id': min_id,
             'max_id': max_id,
             'factions': factions,
+            'compressed_count': compressed_count,
+            'unique_lists': unique_lists,
             'valid': True,
             'error': None
         }
@@ -91,8 +108,11 @@ def analyze_database(db_file):
             'error': str(e)
         }
 
-def simple_merge_databases(source_files, destination_file, chunk_size=500):
-    """Merge multiple database files assuming all rows are unique"""
+def simple_merge_databases(source_files, destination_file, chunk_size=5000, policy=None, dedup=False):
+    """Merge multiple database files, keeping the first copy of each numerical_id unless a conflict policy is given
+    
+    With dedup, fleets repeating an earlier list (same fingerprint) are dropped after the merge.
+    """
     
     # Analyze source files first
     valid_sources = []
@@ -122,11 +142,11 @@ def simple_merge_databases(source_files, destination_file, chunk_size=500):
             os.rename(destination_file, backup_file)
         
         # Create new destination database
-        dest_conn = sqlite3.connect(destination_file)
+        dest_conn = connect(destination_file, BULK_MERGE)
         dest_cursor = dest_conn.cursor()
         
         # Create table structure (using first valid source as template)
-        source_conn = sqlite3.connect(valid_sources[0])
+        source_conn = connect(valid_sources[0], ANALYSIS)
         source_cursor = source_conn.cursor()
         
         # Get table creation SQL
@@ -136,78 +156,28 @@ def simple_merge_databases(source_files, destination_file, chunk_size=500):
         # Create table in destination
         dest_cursor.execute(create_table_sql)
         
-        # Get column names
-        source_cursor.execute("PRAGMA table_info(fleets)")
-        columns_info = source_cursor.fetchall()
-        columns = [column[1] for column in columns_info]
-        
-        # Identify columns we should exclude from the INSERT (id and possibly user_id)
-        exclude_columns = []
-        for i, column_info in enumerate(columns_info):
-            column_name = column_info[1]
-            if column_name == 'id' or column_name == 'user_id':
-                exclude_columns.append(i)
-        
-        # Create filtered column lists without id fields
-        filtered_columns = [col for i, col in enumerate(columns) if i not in exclude_columns]
-        filtered_columns_str = ", ".join(filtered_columns)
-        
         # Close the source connection we used as template
         source_conn.close()
         
-        # Now process each source database
-        records_merged = 0
-        start_time = time.time()
+        # Copy every source with set-based batches; id and user_id are left for the destination to assign
+        if policy:
+            merge_stats = kway_merge(dest_conn, valid_sources, policy=policy, batch_size=chunk_size,
+                                     exclude_columns=('id', 'user_id'))
+            records_merged = sum(source_stats['kept'] for source_stats in merge_stats.values())
+        else:
+            merge_stats = merge_shards(dest_conn, valid_sources, batch_size=chunk_size,
+                                       exclude_columns=('id', 'user_id'))
+            records_merged = sum(source_stats['inserted'] for source_stats in merge_stats.values())
+        logger.info(f"Merged {records_merged}/{total_records} records")
         
-        for source_idx, source_file in enumerate(valid_sources, 1):
-            try:
-                logger.info(f"Processing source {source_idx}/{len(valid_sources)}: {source_file}")
-                source_conn = sqlite3.connect(source_file)
-                source_cursor = source_conn.cursor()
-                
-                # Get record count for progress tracking
-                source_cursor.execute("SELECT COUNT(*) FROM fleets")
-                source_count = source_cursor.fetchone()[0]
-                
-                if source_count == 0:
-                    logger.warning(f"Source {source_file} contains 0 records, skipping")
-                    source_conn.close()
-                    continue
-                
-                # Process in chunks
-                for offset in range(0, source_count, chunk_size):
-                    # Fetch a chunk of records
-                    source_cursor.execute(f"SELECT {filtered_columns_str} FROM fleets LIMIT {chunk_size} OFFSET {offset}")
-                    records = source_cursor.fetchall()
-                    
-                    if not records:
-                        break
-                    
-                    # Prepare for bulk insert
-                    placeholders = ", ".join(["?" for _ in filtered_columns])
-                    
-                    # Insert into destination, assuming all records are unique
-                    for record in records:
-                        try:
-                            dest_cursor.execute(f"INSERT INTO fleets ({filtered_columns_str}) VALUES ({placeholders})", record)
-                            records_merged += 1
-                        except sqlite3.Error as e:
-                            logger.warning(f"Error inserting record: {e}")
-                    
-                    # Commit each chunk
-                    dest_conn.commit()
-                    
-                    # Progress update
-                    elapsed = time.time() - start_time
-                    rate = records_merged / elapsed if elapsed > 0 else 0
-                    logger.info(f"Merged {records_merged}/{total_records} records ({records_merged/total_records*100:.1f}%) - Rate: {rate:.1f} records/sec")
-                
-                # Close source connection
-                source_conn.close()
-                
-            except Exception as e:
-                logger.error(f"Error processing source {source_file}: {e}")
-                # Continue with next source
+        # Write the normalized ship/upgrade/squadron tables for the merged fleets
+        logger.info("Indexing ships, upgrades and squadrons...")
+        index_fleets(dest_conn)
+        
+        # Drop repeated lists, keeping the first saved copy of each
+        if dedup:
+            logger.info("Removing duplicate fleet lists...")
+            dedup_fleets(dest_conn)
         
         # Create indices for better performance
         logger.info("Creating indices on merged database...")
@@ -234,22 +204,25 @@ def simple_merge_databases(source_files, destination_file, chunk_size=500):
         logger.error(f"Error during merge: {e}")
         return False
 
-def cleanup_database(db_file, max_points=425):
-    """Remove all fleets with points over the specified maximum"""
+def cleanup_database(db_file, max_points=425, dedup=False):
+    """Remove all fleets with points over the specified maximum (and repeated lists with dedup)"""
     if not os.path.exists(db_file):
         logger.error(f"Database file {db_file} not found!")
         return False
     
     try:
-        conn = sqlite3.connect(db_file)
+        conn = connect(db_file, CLEANUP)
         cursor = conn.cursor()
         
+        # Drop repeated lists first; the fingerprint index makes this a GROUP BY
+        duplicates_removed = dedup_fleets(conn) if dedup else 0
+        
         # Count records to be deleted
         cursor.execute(f"SELECT COUNT(*) FROM fleets WHERE points > {max_points}")
         records_to_delete = cursor.fetchone()[0]
         logger.info(f"Records to be deleted (points > {max_points}): {records_to_delete}")
         
-        if records_to_delete == 0:
+        if records_to_delete == 0 and not duplicates_removed:
             logger.info("No records to delete. Database is already clean.")
             conn.close()
             return True
@@ -257,6 +230,8 @@ def cleanup_database(db_file, max_points=425):
         # Perform the deletion
         logger.info(f"Deleting fleets with points > {max_points}...")
         cursor.execute(f"DELETE FROM fleets WHERE points > {max_points}")
+        if has_fleet_tables(conn):
+            prune_orphans(conn)
         conn.commit()
         
         # Count remaining records
@@ -282,10 +257,18 @@ def main():
     parser = argparse.ArgumentParser(description='Analyze and fix Armada fleet databases')
     parser.add_argument('--analyze', action='store_true', help='Analyze database files only (no merge)')
     parser.add_argument('--merge', action='store_true', help='Perform simple merge of databases')
+    parser.add_argument('--policy', choices=sorted(MERGE_POLICIES), default=None,
+                        help='Resolve duplicate fleets with a deterministic k-way merge (newest, longest or first)')
     parser.add_argument('--db-dir', default='databases', help='Directory containing database files')
     parser.add_argument('--output', default='armada_fleets_merged_new.db', help='Output merged database file')
     parser.add_argument('--cleanup', action='store_true', help='Clean up merged database (remove fleets with points > 425)')
     parser.add_argument('--max-points', type=int, default=425, help='Maximum points threshold for cleanup')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Drop fleets that repeat an earlier list (same ships, upgrades and squadrons) when merging and cleaning up')
+    parser.add_argument('--compress', action='store_true',
+                        help='Store fleet_data in the merged database as dictionary-compressed blobs')
+    parser.add_argument('--export-csv', default=None,
+                        help='Export the merged database to this CSV file with plain-text fleet_data')
     args = parser.parse_args()
     
     # Find all database files
@@ -318,6 +301,10 @@ def main():
     for result in sorted(analysis_results, key=lambda x: x['file']):
         if result['valid']:
             logger.info(f"- {result['file']}: {result['size_mb']:.2f} MB, {result['record_count']} records, ID range: {result['min_id']} to {result['max_id']}")
+            if result.get('unique_lists') is not None:
+                logger.info(f"  Unique fleet lists: {result['unique_lists']}")
+            if result['compressed_count']:
+                logger.info(f"  Compressed fleet_data rows: {result['compressed_count']}")
             if result['factions']:
                 faction_str = ", ".join([f"{k}: {v}" for k, v in result['factions'].items()])
                 logger.info(f"  Factions: {faction_str}")
@@ -329,14 +316,23 @@ def main():
         valid_dbs = [result['file'] for result in analysis_results if result['valid'] and result['record_count'] > 0]
         if valid_dbs:
             logger.info(f"Performing simple merge of {len(valid_dbs)} valid databases...")
-            merge_success = simple_merge_databases(valid_dbs, args.output)
+            merge_success = simple_merge_databases(valid_dbs, args.output, policy=args.policy, dedup=args.dedup)
             if merge_success:
                 logger.info(f"Merge completed successfully to {args.output}")
                 
                 # Clean up merged database if requested
                 if args.cleanup:
                     logger.info("Cleaning up merged database...")
-                    cleanup_database(args.output, args.max_points)
+                    cleanup_database(args.output, args.max_points, dedup=args.dedup)
+                
+                # Compress fleet_data if requested
+                if args.compress:
+                    logger.info("Compressing fleet_data in merged database...")
+                    compress_database(args.output)
+                
+                # Export to CSV if requested
+                if args.export_csv:
+                    export_csv(args.output, args.export_csv)
             else:
                 logger.error("Merge operation failed")
         else:
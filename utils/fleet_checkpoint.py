@@ -0,0 +1,217 @@
+import os
+import sys
+import logging
+import argparse
+from fleet_db import connect, SCRAPE_WRITER, ANALYSIS
+
+logger = logging.getLogger("FleetCheckpoint")
+
+# Completed fleet IDs as coalesced, non-overlapping inclusive intervals
+JOURNAL_TABLE = "scanned_ranges"
+
+def ensure_checkpoint_table(conn):
+    """Create the scan journal table if it does not exist"""
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} (
+        range_low INTEGER PRIMARY KEY,
+        range_high INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+
+def has_checkpoint_table(conn):
+    """Return True if the database has a scan journal"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (JOURNAL_TABLE,)
+    ).fetchone() is not None
+
+def record_scanned(conn, low, high):
+    """Add low <= id <= high to the journal, merging touching intervals; the caller commits
+
+    Run it in the same transaction as the inserts of those IDs, so an interval is never
+    marked scanned without its fleets (or the other way round) after a crash.
+    """
+    rows = conn.execute(
+        f"SELECT range_low, range_high FROM {JOURNAL_TABLE} WHERE range_low <= ? AND range_high >= ?",
+        (high + 1, low - 1)
+    ).fetchall()
+    if rows:
+        low = min(low, *(row[0] for row in rows))
+        high = max(high, *(row[1] for row in rows))
+        conn.executemany(f"DELETE FROM {JOURNAL_TABLE} WHERE range_low = ?", ((row[0],) for row in rows))
+    conn.execute(f"INSERT INTO {JOURNAL_TABLE} (range_low, range_high) VALUES (?, ?)", (low, high))
+
+def scanned_intervals(conn, start_id, end_id):
+    """Return the journal intervals overlapping end < id <= start, clipped and in descending order"""
+    rows = conn.execute(
+        f"SELECT range_low, range_high FROM {JOURNAL_TABLE} WHERE range_low <= ? AND range_high > ? "
+        "ORDER BY range_low DESC",
+        (start_id, end_id)
+    ).fetchall()
+    return [(max(low, end_id + 1), min(high, start_id)) for low, high in rows]
+
+def remaining_gaps(conn, start_id, end_id):
+    """Return the unscanned parts of end < id <= start as descending (start, end) pairs
+
+    Each pair has process_range semantics (start is processed, end is not), so a
+    worker can walk the gaps one after another.
+    """
+    gaps = []
+    next_id = start_id
+    for low, high in scanned_intervals(conn, start_id, end_id):
+        if high < next_id:
+            gaps.append((next_id, high))
+        next_id = min(next_id, low - 1)
+    if next_id > end_id:
+        gaps.append((next_id, end_id))
+    return gaps
+
+def subtract_runs(gaps, runs):
+    """Return the parts of descending (start, end) gaps not covered by inclusive (low, high) runs
+
+    For runs that are known to be scanned but may not be committed yet, such as the
+    ones a worker handed to the writer process.
+    """
+    merged = []
+    for low, high in sorted(runs):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+
+    left = []
+    for start_id, end_id in gaps:
+        next_id = start_id
+        for low, high in reversed(merged):
+            if low > next_id or high <= end_id:
+                continue
+            if high < next_id:
+                left.append((next_id, high))
+            next_id = low - 1
+        if next_id > end_id:
+            left.append((next_id, end_id))
+    return left
+
+class ScanJournal:
+    """Collect the IDs a worker has finished and write them as intervals with its inserts
+
+    mark() is cheap and only extends runs in memory; write() records the pending runs
+    on a connection without committing and clear() forgets them once the caller has
+    committed. Workers scan downward, so consecutive marks extend one run.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def mark(self, fleet_id):
+        """Note that a fleet ID needs no further work"""
+        if self.runs:
+            low, high = self.runs[-1]
+            if fleet_id == low - 1:
+                self.runs[-1] = (fleet_id, high)
+                return
+            if low <= fleet_id <= high:
+                return
+        self.runs.append((fleet_id, fleet_id))
+
+    def take(self):
+        """Return and forget the pending runs (for handing them to another writer)"""
+        runs, self.runs = self.runs, []
+        return runs
+
+    def write(self, conn):
+        """Record the pending runs in the current transaction"""
+        for low, high in self.runs:
+            record_scanned(conn, low, high)
+
+    def clear(self):
+        self.runs = []
+
+    def flush(self, conn):
+        """Record and commit the pending runs on their own"""
+        if not self.runs:
+            return
+        self.write(conn)
+        conn.commit()
+        self.clear()
+
+# Workers used to write their next fleet ID to databases/checkpoints/worker_N_checkpoint.txt
+def legacy_checkpoint_file(db_file, worker_id):
+    return os.path.join(os.path.dirname(db_file), "checkpoints", f"worker_{worker_id}_checkpoint.txt")
+
+def import_legacy_checkpoint(conn, db_file, worker_id, start_id):
+    """Move an old checkpoint file into the journal: every ID above it up to start_id was scanned
+
+    The file is renamed to *.imported so it is only read once. Returns the number of
+    IDs recorded.
+    """
+    checkpoint_file = legacy_checkpoint_file(db_file, worker_id)
+    if not os.path.exists(checkpoint_file):
+        return 0
+    try:
+        with open(checkpoint_file, 'r') as f:
+            next_id = int(f.read().strip())
+    except (OSError, ValueError) as e:
+        logger.warning(f"[Worker {worker_id}] Ignoring unreadable checkpoint {checkpoint_file}: {e}")
+        return 0
+
+    scanned = 0
+    if next_id < start_id:
+        with conn:
+            ensure_checkpoint_table(conn)
+            record_scanned(conn, next_id + 1, start_id)
+        scanned = start_id - next_id
+    os.replace(checkpoint_file, checkpoint_file + ".imported")
+    logger.info(f"[Worker {worker_id}] Imported checkpoint at fleet ID {next_id} ({scanned} IDs already scanned)")
+    return scanned
+
+def journal_status(db_file, start_id=None, end_id=None):
+    """Print the scanned intervals of a database and, for a range, what is left to scan"""
+    conn = connect(db_file, ANALYSIS)
+    try:
+        if not has_checkpoint_table(conn):
+            print(f"{db_file}: no scan journal")
+            return
+        rows = conn.execute(
+            f"SELECT range_low, range_high FROM {JOURNAL_TABLE} ORDER BY range_low DESC"
+        ).fetchall()
+        total = sum(high - low + 1 for low, high in rows)
+        print(f"{db_file}: {total} IDs scanned in {len(rows)} interval(s)")
+        for low, high in rows:
+            print(f"  {high} .. {low} ({high - low + 1} IDs)")
+        if start_id is not None and end_id is not None:
+            gaps = remaining_gaps(conn, start_id, end_id)
+            left = sum(gap_start - gap_end for gap_start, gap_end in gaps)
+            print(f"Range {start_id} to {end_id}: {left} IDs left in {len(gaps)} gap(s)")
+            for gap_start, gap_end in gaps:
+                print(f"  {gap_start} .. {gap_end + 1} ({gap_start - gap_end} IDs)")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan journal of fleet IDs already processed by the scrapers')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    status_parser = subparsers.add_parser('status', help='Print scanned intervals and remaining gaps')
+    status_parser.add_argument('database', help='Shard database to inspect')
+    status_parser.add_argument('--start', type=int, help='Range start (inclusive) to compute gaps for')
+    status_parser.add_argument('--end', type=int, help='Range end (exclusive) to compute gaps for')
+
+    import_parser = subparsers.add_parser('import', help='Move a worker_N_checkpoint.txt file into the journal')
+    import_parser.add_argument('database', help='Shard database the checkpoint belongs to')
+    import_parser.add_argument('--worker', type=int, required=True, help='Worker number of the checkpoint file')
+    import_parser.add_argument('--start', type=int, required=True, help='First fleet ID of the worker\'s range')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        journal_status(args.database, args.start, args.end)
+    else:
+        conn = connect(args.database, SCRAPE_WRITER)
+        try:
+            import_legacy_checkpoint(conn, args.database, args.worker, args.start)
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
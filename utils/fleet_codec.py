@@ -0,0 +1,330 @@
+import os
+import csv
+import sys
+import time
+import zlib
+import logging
+import hashlib
+import argparse
+from collections import Counter
+from fleet_db import connect, ANALYSIS, CLEANUP
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+logger = logging.getLogger("FleetCodec")
+
+# Compressed fleet_data is stored as a BLOB in the same column, with the dictionary it
+# was compressed against in fleet_data_dict (NULL means the row holds plain text)
+DICT_COLUMN = "fleet_data_dict"
+DICT_TABLE = "fleet_data_dicts"
+
+# Content fingerprint of each fleet's composition, written by fleet_tables at ingest
+FINGERPRINT_COLUMN = "fingerprint"
+
+# Columns the tools maintain rather than scrape; default selects leave them out
+DERIVED_COLUMNS = (DICT_COLUMN, FINGERPRINT_COLUMN)
+
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+# zlib can only reference the last 32KB of a preset dictionary
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 64 * 1024
+
+def default_codec():
+    """Return the best codec available in this environment"""
+    return ZSTD if zstd is not None else ZLIB
+
+def has_codec_column(conn, schema="main"):
+    """Return True if a schema's fleets table can hold compressed fleet_data"""
+    return any(row[1] == DICT_COLUMN for row in conn.execute(f"PRAGMA {schema}.table_info(fleets)"))
+
+def ensure_codec_schema(conn, schema="main"):
+    """Add the dictionary table and fleet_data_dict column to a schema if missing"""
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS {schema}.{DICT_TABLE} (
+        dict_id INTEGER PRIMARY KEY,
+        codec TEXT NOT NULL,
+        dictionary BLOB NOT NULL,
+        created_at INTEGER NOT NULL
+    )
+    ''')
+    if not has_codec_column(conn, schema):
+        conn.execute(f"ALTER TABLE {schema}.fleets ADD COLUMN {DICT_COLUMN} INTEGER")
+
+def copy_dictionaries(dest_conn, source_conn, schema="main"):
+    """Copy every dictionary a source database (or attached schema) uses into the destination
+
+    Dictionary ids are content hashes, so compressed rows stay readable after being
+    copied between databases as long as their dictionary travels with them.
+    """
+    if not source_conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name='{DICT_TABLE}'").fetchone():
+        return 0
+    rows = source_conn.execute(f"SELECT dict_id, codec, dictionary, created_at FROM {schema}.{DICT_TABLE}").fetchall()
+    dest_conn.executemany(f"INSERT OR IGNORE INTO {DICT_TABLE} (dict_id, codec, dictionary, created_at) VALUES (?, ?, ?, ?)", rows)
+    return len(rows)
+
+def train_dictionary(samples, codec=None, dict_size=None):
+    """Build a compression dictionary from a list of fleet_data strings"""
+    codec = codec or default_codec()
+    if codec == ZSTD:
+        if zstd is None:
+            raise RuntimeError("zstd codec requested but the zstandard package is not installed")
+        trained = zstd.train_dictionary(dict_size or ZSTD_DICT_SIZE, [s.encode("utf-8") for s in samples])
+        return codec, trained.as_bytes()
+
+    # zlib has no trainer: keep the lines that save the most bytes, most valuable last
+    # because zlib prefers the shortest back-references
+    line_counts = Counter()
+    for sample in samples:
+        line_counts.update(line + "\n" for line in sample.splitlines() if line.strip())
+    scored = sorted(line_counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True)
+    chosen = []
+    used = 0
+    limit = dict_size or ZLIB_DICT_SIZE
+    for line, count in scored:
+        encoded = line.encode("utf-8")
+        if count < 2 or used + len(encoded) > limit:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    return codec, b"".join(reversed(chosen))
+
+def store_dictionary(conn, codec, dictionary):
+    """Save a dictionary and return its content-derived id"""
+    dict_id = int.from_bytes(hashlib.sha256(codec.encode() + dictionary).digest()[:7], "big")
+    conn.execute(
+        f"INSERT OR IGNORE INTO {DICT_TABLE} (dict_id, codec, dictionary, created_at) VALUES (?, ?, ?, ?)",
+        (dict_id, codec, dictionary, int(time.time()))
+    )
+    return dict_id
+
+class FleetDataCodec:
+    """Compress and decompress fleet_data against the dictionaries stored in a database
+
+    Dictionaries are loaded lazily and cached per connection, so decoding a row is a
+    single decompress call.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dictionaries = {}
+
+    def _dictionary(self, dict_id):
+        entry = self.dictionaries.get(dict_id)
+        if entry is None:
+            row = self.conn.execute(f"SELECT codec, dictionary FROM {DICT_TABLE} WHERE dict_id = ?", (dict_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown fleet_data dictionary {dict_id}")
+            codec, dictionary = row
+            if codec == ZSTD:
+                if zstd is None:
+                    raise RuntimeError("Rows were compressed with zstd but the zstandard package is not installed")
+                compression_dict = zstd.ZstdCompressionDict(dictionary)
+                entry = (codec, dictionary, zstd.ZstdCompressor(level=19, dict_data=compression_dict),
+                         zstd.ZstdDecompressor(dict_data=compression_dict))
+            else:
+                entry = (codec, dictionary, None, None)
+            self.dictionaries[dict_id] = entry
+        return entry
+
+    def encode(self, text, dict_id):
+        """Compress text with a stored dictionary and return the blob"""
+        codec, dictionary, compressor, _ = self._dictionary(dict_id)
+        raw = text.encode("utf-8")
+        if codec == ZSTD:
+            return compressor.compress(raw)
+        compressor = zlib.compressobj(level=9, zdict=dictionary)
+        return compressor.compress(raw) + compressor.flush()
+
+    def decode(self, value, dict_id):
+        """Return the export text of a fleet_data value, compressed or not"""
+        if value is None or dict_id is None or not isinstance(value, bytes):
+            return value
+        codec, dictionary, _, decompressor = self._dictionary(dict_id)
+        if codec == ZSTD:
+            raw = decompressor.decompress(value)
+        else:
+            decompressor = zlib.decompressobj(zdict=dictionary)
+            raw = decompressor.decompress(value) + decompressor.flush()
+        return raw.decode("utf-8")
+
+def register_functions(conn):
+    """Register fleet_text(fleet_data, fleet_data_dict) so SQL can read compressed rows"""
+    codec = FleetDataCodec(conn)
+    conn.create_function("fleet_text", 2, codec.decode, deterministic=True)
+    return codec
+
+def fleet_select_sql(conn, columns=None, table="fleets"):
+    """Return a SELECT over fleets that yields plain-text fleet_data whatever the storage mode
+
+    Call register_functions(conn) before running the query. The fleet_data_dict column
+    is left out so callers see the same columns as an uncompressed database, and so is
+    the fingerprint column unless it is asked for.
+    """
+    all_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    compressed = DICT_COLUMN in all_columns
+    select = []
+    for column in columns or [c for c in all_columns if c not in DERIVED_COLUMNS]:
+        if column == DICT_COLUMN:
+            continue
+        if column == "fleet_data" and compressed:
+            select.append(f"fleet_text(fleet_data, {DICT_COLUMN}) AS fleet_data")
+        else:
+            select.append(column)
+    return f"SELECT {', '.join(select)} FROM {table}"
+
+def compress_database(db_file, codec=None, sample_size=2000, dict_size=None, batch_size=1000, vacuum=True):
+    """Compress every plain-text fleet_data row of a database in place
+
+    Each run trains a fresh dictionary on a sample of the rows that are still plain
+    text and only touches those rows, so it can be re-run after new scrapes. Rows
+    that would not shrink are left as text.
+    """
+    size_before = os.path.getsize(db_file)
+    conn = connect(db_file, CLEANUP)
+    try:
+        ensure_codec_schema(conn)
+        conn.commit()
+
+        samples = [row[0] for row in conn.execute(
+            f"SELECT fleet_data FROM fleets WHERE {DICT_COLUMN} IS NULL AND typeof(fleet_data) = 'text' "
+            f"ORDER BY random() LIMIT ?", (sample_size,)
+        )]
+        if not samples:
+            logger.info(f"{db_file}: no plain-text rows to compress")
+            return None
+
+        codec_name, dictionary = train_dictionary(samples, codec, dict_size)
+        with conn:
+            dict_id = store_dictionary(conn, codec_name, dictionary)
+        logger.info(f"{db_file}: trained {codec_name} dictionary {dict_id} ({len(dictionary)} bytes) on {len(samples)} rows")
+
+        codec_obj = FleetDataCodec(conn)
+        last_rowid = 0
+        compressed = raw_bytes = stored_bytes = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, fleet_data FROM fleets WHERE rowid > ? AND {DICT_COLUMN} IS NULL "
+                f"AND typeof(fleet_data) = 'text' ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for rowid, text in rows:
+                blob = codec_obj.encode(text, dict_id)
+                raw_size = len(text.encode("utf-8"))
+                raw_bytes += raw_size
+                if len(blob) < raw_size:
+                    updates.append((blob, dict_id, rowid))
+                    stored_bytes += len(blob)
+                else:
+                    stored_bytes += raw_size
+            with conn:
+                conn.executemany(f"UPDATE fleets SET fleet_data = ?, {DICT_COLUMN} = ? WHERE rowid = ?", updates)
+            compressed += len(updates)
+            last_rowid = rows[-1][0]
+
+        if vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    size_after = os.path.getsize(db_file)
+    ratio = raw_bytes / stored_bytes if stored_bytes else 0
+    logger.info(f"{db_file}: compressed {compressed} rows, fleet_data {raw_bytes} -> {stored_bytes} bytes ({ratio:.1f}x), "
+                f"file {size_before / 1024 / 1024:.2f} MB -> {size_after / 1024 / 1024:.2f} MB")
+    return {"rows": compressed, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes,
+            "size_before": size_before, "size_after": size_after, "dict_id": dict_id}
+
+def decompress_database(db_file, batch_size=1000, vacuum=True):
+    """Turn every compressed fleet_data row of a database back into plain text"""
+    conn = connect(db_file, CLEANUP)
+    try:
+        if not has_codec_column(conn):
+            logger.info(f"{db_file}: no compressed rows")
+            return 0
+        codec_obj = FleetDataCodec(conn)
+        restored = 0
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, fleet_data, {DICT_COLUMN} FROM fleets WHERE rowid > ? AND {DICT_COLUMN} IS NOT NULL "
+                f"ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                conn.executemany(
+                    f"UPDATE fleets SET fleet_data = ?, {DICT_COLUMN} = NULL WHERE rowid = ?",
+                    [(codec_obj.decode(data, dict_id), rowid) for rowid, data, dict_id in rows]
+                )
+            restored += len(rows)
+            last_rowid = rows[-1][0]
+        if vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    logger.info(f"{db_file}: decompressed {restored} rows")
+    return restored
+
+def export_csv(db_file, csv_file, batch_size=1000):
+    """Write the fleets table to CSV with plain-text fleet_data, in the converted-fleets.csv layout"""
+    conn = connect(db_file, ANALYSIS)
+    try:
+        register_functions(conn)
+        cursor = conn.execute(fleet_select_sql(conn) + " ORDER BY numerical_id")
+        header = [description[0] for description in cursor.description]
+        written = 0
+        with open(csv_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+    finally:
+        conn.close()
+    logger.info(f"Exported {written} fleets from {db_file} to {csv_file}")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='Compressed fleet_data storage for Armada fleet databases')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compress_parser = subparsers.add_parser('compress', help='Train a dictionary and compress plain-text fleet_data')
+    compress_parser.add_argument('databases', nargs='+', help='Database files to compress in place')
+    compress_parser.add_argument('--codec', choices=[ZSTD, ZLIB], default=None,
+                                 help='Compression codec (default: zstd if installed, otherwise zlib)')
+    compress_parser.add_argument('--sample-size', type=int, default=2000, help='Rows sampled to train the dictionary')
+    compress_parser.add_argument('--dict-size', type=int, default=None, help='Dictionary size in bytes')
+    compress_parser.add_argument('--no-vacuum', action='store_true', help='Skip the VACUUM that reclaims freed pages')
+
+    decompress_parser = subparsers.add_parser('decompress', help='Restore plain-text fleet_data')
+    decompress_parser.add_argument('databases', nargs='+', help='Database files to decompress in place')
+    decompress_parser.add_argument('--no-vacuum', action='store_true', help='Skip the VACUUM after decompressing')
+
+    export_parser = subparsers.add_parser('export-csv', help='Export fleets to CSV with plain-text fleet_data')
+    export_parser.add_argument('database', help='Database file to export')
+    export_parser.add_argument('output', help='CSV file to write')
+    args = parser.parse_args()
+
+    if args.command == 'compress':
+        for db_file in args.databases:
+            compress_database(db_file, codec=args.codec, sample_size=args.sample_size,
+                              dict_size=args.dict_size, vacuum=not args.no_vacuum)
+    elif args.command == 'decompress':
+        for db_file in args.databases:
+            decompress_database(db_file, vacuum=not args.no_vacuum)
+    else:
+        export_csv(args.database, args.output)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+
+logger = logging.getLogger("FleetDB")
+
+# Connection profiles
+SCRAPE_WRITER = "scrape-writer"
+BULK_MERGE = "bulk-merge"
+ANALYSIS = "analysis"
+CLEANUP = "cleanup"
+
+MB = 1024 * 1024
+
+# PRAGMAs per profile, applied in order right after connecting. cache_size is negative,
+# so it is in KiB rather than pages.
+PROFILES = {
+    # Many workers inserting into their shards while readers poll them: WAL with
+    # NORMAL sync is durable at checkpoints and never blocks readers
+    SCRAPE_WRITER: [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 60000),
+        ("cache_size", -64 * 1024),
+        ("temp_store", "MEMORY"),
+        ("mmap_size", 256 * MB),
+    ],
+    # A destination nobody else touches until the merge is done: hold the lock for the
+    # whole connection and skip fsyncs; a crash means re-running the merge. Only main is
+    # exclusive, so shards ATTACHed as merge sources stay writable for the scrapers.
+    BULK_MERGE: [
+        ("main.locking_mode", "EXCLUSIVE"),
+        ("journal_mode", "WAL"),
+        ("synchronous", "OFF"),
+        ("cache_size", -256 * 1024),
+        ("temp_store", "MEMORY"),
+        ("mmap_size", 1024 * MB),
+    ],
+    # Read-only scans and aggregates: big page cache and memory-mapped reads
+    ANALYSIS: [
+        ("query_only", "ON"),
+        ("busy_timeout", 60000),
+        ("cache_size", -128 * 1024),
+        ("temp_store", "MEMORY"),
+        ("mmap_size", 1024 * MB),
+    ],
+    # In-place deletes, index builds and vacuums on databases a scraper may still be
+    # using: keep the journal mode, wait for locks, sort in memory
+    CLEANUP: [
+        ("busy_timeout", 60000),
+        ("synchronous", "NORMAL"),
+        ("cache_size", -128 * 1024),
+        ("temp_store", "MEMORY"),
+        ("mmap_size", 256 * MB),
+    ],
+}
+
+READ_ONLY_PROFILES = (ANALYSIS,)
+
+def connect(db_file, profile=SCRAPE_WRITER, timeout=60, **kwargs):
+    """Open a database with a named profile's PRAGMAs applied
+
+    The analysis profile opens the file read-only (mode=ro), so it never creates a
+    missing database or takes a write lock. Extra keyword arguments go to sqlite3.connect.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown connection profile: {profile}")
+    if profile in READ_ONLY_PROFILES:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=timeout, **kwargs)
+    else:
+        conn = sqlite3.connect(db_file, timeout=timeout, **kwargs)
+    for pragma, value in PROFILES[profile]:
+        conn.execute(f"PRAGMA {pragma}={value}").fetchall()
+    return conn
+
+def _plain_connect(db_file, profile):
+    """Connect the way the scripts did before profiles: defaults, read-only where it was"""
+    if profile in READ_ONLY_PROFILES:
+        return sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=60)
+    return sqlite3.connect(db_file, timeout=60)
+
+def _bench_merge(work_dir, shards, open_conn):
+    from fleet_merge import merge_shards
+    from fleet_tables import ensure_fleet_tables, index_fleets
+    dest_file = os.path.join(work_dir, "merged.db")
+    if os.path.exists(dest_file):
+        os.remove(dest_file)
+    started = time.perf_counter()
+    conn = open_conn(dest_file, BULK_MERGE)
+    try:
+        source = sqlite3.connect(f"file:{shards[0]}?mode=ro", uri=True)
+        create_sql = source.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='fleets'").fetchone()[0]
+        source.close()
+        conn.execute(create_sql)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_numerical_id ON fleets(numerical_id)")
+        ensure_fleet_tables(conn)
+        merge_shards(conn, shards, exclude_columns=("id", "user_id"))
+        index_fleets(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return time.perf_counter() - started, dest_file
+
+def _bench_cleanup(merged_file, work_dir, open_conn, max_points):
+    from fleet_tables import prune_orphans
+    db_file = os.path.join(work_dir, "cleanup.db")
+    shutil.copyfile(merged_file, db_file)
+    started = time.perf_counter()
+    conn = open_conn(db_file, CLEANUP)
+    try:
+        conn.execute("DELETE FROM fleets WHERE points > ?", (max_points,))
+        prune_orphans(conn)
+        conn.commit()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_points ON fleets(points)")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return time.perf_counter() - started
+
+def _bench_analysis(merged_file, open_conn):
+    from fleet_codec import register_functions, fleet_select_sql
+    from fleet_tables import upgrade_frequency
+    started = time.perf_counter()
+    conn = open_conn(merged_file, ANALYSIS)
+    try:
+        register_functions(conn)
+        conn.execute("SELECT faction, COUNT(*), AVG(points), MIN(points), MAX(points) FROM fleets GROUP BY faction").fetchall()
+        conn.execute("SELECT commander, COUNT(*) FROM fleets GROUP BY commander ORDER BY 2 DESC").fetchall()
+        conn.execute("SELECT points, COUNT(*) FROM fleets GROUP BY points ORDER BY points").fetchall()
+        for _ in conn.execute(fleet_select_sql(conn, ["numerical_id", "fleet_data"]) + " ORDER BY fleet_name"):
+            pass
+        upgrade_frequency(conn)
+    finally:
+        conn.close()
+    return time.perf_counter() - started
+
+def benchmark(shards, repeat=3, max_points=425):
+    """Time merge, cleanup and analysis with default connections and with the tuned profiles
+
+    Each stage runs repeat times per mode on copies in a temporary directory; the best
+    time is reported. The merge stage includes building the card tables.
+    """
+    modes = [("default", _plain_connect), ("profile", connect)]
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="fleet_db_bench_")
+    logging.getLogger("FleetMerge").setLevel(logging.WARNING)
+    logging.getLogger("FleetTables").setLevel(logging.WARNING)
+    try:
+        for mode, open_conn in modes:
+            timings = {"merge": [], "cleanup": [], "analysis": []}
+            merged_file = None
+            for _ in range(repeat):
+                elapsed, merged_file = _bench_merge(work_dir, shards, open_conn)
+                timings["merge"].append(elapsed)
+            kept_file = os.path.join(work_dir, f"merged-{mode}.db")
+            shutil.move(merged_file, kept_file)
+            for _ in range(repeat):
+                timings["cleanup"].append(_bench_cleanup(kept_file, work_dir, open_conn, max_points))
+                timings["analysis"].append(_bench_analysis(kept_file, open_conn))
+            results[mode] = {stage: min(values) for stage, values in timings.items()}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    profile_names = {"merge": BULK_MERGE, "cleanup": CLEANUP, "analysis": ANALYSIS}
+    print(f"{'stage':10s} {'profile':14s} {'default':>10s} {'tuned':>10s} {'speedup':>8s}")
+    for stage, profile in profile_names.items():
+        default_time = results["default"][stage]
+        tuned_time = results["profile"][stage]
+        print(f"{stage:10s} {profile:14s} {default_time:9.3f}s {tuned_time:9.3f}s "
+              f"{default_time / tuned_time if tuned_time > 0 else 0:7.2f}x")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Tuned SQLite connection profiles for the fleet tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bench_parser = subparsers.add_parser('bench', help='Compare default connections with the tuned profiles')
+    bench_parser.add_argument('databases', nargs='+', help='Shard files to merge, e.g. databases/armada_fleets_*.db')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='Runs per stage and mode (best is reported)')
+    bench_parser.add_argument('--max-points', type=int, default=425, help='Points threshold for the cleanup stage')
+
+    subparsers.add_parser('show', help='Print the PRAGMAs of each profile')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.databases, repeat=args.repeat, max_points=args.max_points)
+    else:
+        for name, pragmas in PROFILES.items():
+            print(f"{name}{' (read-only)' if name in READ_ONLY_PROFILES else ''}")
+            for pragma, value in pragmas:
+                print(f"  PRAGMA {pragma}={value}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
@@ -0,0 +1,324 @@
+import os
+import time
+import heapq
+import logging
+from fleet_db import connect, ANALYSIS
+from fleet_codec import DICT_COLUMN, FleetDataCodec, copy_dictionaries, ensure_codec_schema, register_functions
+from fleet_tables import forget_fleets, has_fleet_tables
+
+logger = logging.getLogger("FleetMerge")
+
+# Columns never copied between databases: autoincrement ids collide across shards
+DEFAULT_EXCLUDED_COLUMNS = ("id",)
+
+def get_columns(conn, schema="main"):
+    """Return the column names of a schema's fleets table"""
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(fleets)")]
+
+def has_numerical_id_index(conn, schema="main"):
+    """Return True if a schema's fleets table has an index leading with numerical_id"""
+    for index in conn.execute(f"PRAGMA {schema}.index_list(fleets)").fetchall():
+        columns = conn.execute(f"PRAGMA {schema}.index_info('{index[1]}')").fetchall()
+        if columns and columns[0][2] == "numerical_id":
+            return True
+    return False
+
+def ensure_unique_numerical_id(conn):
+    """Make numerical_id a valid ON CONFLICT target in the destination fleets table"""
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fleets_numerical_id_unique ON fleets(numerical_id)")
+
+def merge_shards(dest_conn, source_files, batch_size=5000, exclude_columns=DEFAULT_EXCLUDED_COLUMNS):
+    """Stream fleets from each shard into dest_conn with set-based INSERT ... SELECT
+
+    Each shard is ATTACHed and copied in keyset-paginated batches ordered by numerical_id
+    (one transaction per batch), so cost stays linear in shard size. Fleets whose
+    numerical_id is already present are skipped with ON CONFLICT DO NOTHING. Shards
+    without a numerical_id index are copied in a single statement instead of sorting
+    once per batch.
+
+    Returns {source_file: {"read": rows, "inserted": rows, "duplicates": rows}}.
+    """
+    ensure_unique_numerical_id(dest_conn)
+    dest_conn.commit()
+    dest_columns = get_columns(dest_conn)
+
+    stats = {}
+    total_read = 0
+    total_inserted = 0
+    start_time = time.time()
+
+    for source_idx, source_file in enumerate(source_files, 1):
+        if not os.path.exists(source_file):
+            logger.warning(f"Source file {source_file} doesn't exist. Skipping...")
+            continue
+
+        dest_conn.execute("ATTACH DATABASE ? AS src", (source_file,))
+        try:
+            source_columns = set(get_columns(dest_conn, "src"))
+            if not source_columns:
+                logger.warning(f"Source {source_file} has no fleets table. Skipping...")
+                continue
+
+            # Compressed fleet_data only stays readable if its dictionaries come along
+            if DICT_COLUMN in source_columns:
+                with dest_conn:
+                    ensure_codec_schema(dest_conn)
+                    copy_dictionaries(dest_conn, dest_conn, schema="src")
+                dest_columns = get_columns(dest_conn)
+
+            columns = [c for c in dest_columns if c in source_columns and c not in exclude_columns]
+            columns_str = ", ".join(columns)
+            insert_sql = (f"INSERT INTO main.fleets ({columns_str}) SELECT {columns_str} FROM src.fleets "
+                          f"WHERE {{where}} ON CONFLICT(numerical_id) DO NOTHING")
+            source_count = dest_conn.execute("SELECT COUNT(*) FROM src.fleets").fetchone()[0]
+            logger.info(f"Merging {source_file} ({source_idx}/{len(source_files)}): {source_count} records")
+
+            read = inserted = 0
+
+            # Rows without a numerical_id cannot conflict and are copied as-is
+            with dest_conn:
+                null_rows = dest_conn.execute("SELECT COUNT(*) FROM src.fleets WHERE numerical_id IS NULL").fetchone()[0]
+                if null_rows:
+                    inserted += dest_conn.execute(insert_sql.format(where="numerical_id IS NULL")).rowcount
+                    read += null_rows
+
+            if not has_numerical_id_index(dest_conn, "src"):
+                with dest_conn:
+                    read += source_count - null_rows
+                    inserted += dest_conn.execute(insert_sql.format(where="numerical_id IS NOT NULL")).rowcount
+            else:
+                last_id = None
+                while True:
+                    bound = dest_conn.execute(
+                        "SELECT MAX(numerical_id), COUNT(*) FROM (SELECT numerical_id FROM src.fleets "
+                        "WHERE numerical_id > COALESCE(?, -1) ORDER BY numerical_id LIMIT ?)",
+                        (last_id, batch_size)
+                    ).fetchone()
+                    upper_id, batch_rows = bound
+                    if not batch_rows:
+                        break
+
+                    with dest_conn:
+                        inserted += dest_conn.execute(
+                            insert_sql.format(where="numerical_id > COALESCE(?, -1) AND numerical_id <= ?"),
+                            (last_id, upper_id)
+                        ).rowcount
+                    read += batch_rows
+                    last_id = upper_id
+
+                    elapsed = time.time() - start_time
+                    rate = (total_read + read) / elapsed if elapsed > 0 else 0
+                    logger.info(f"  {source_file}: {read}/{source_count} records read, {inserted} inserted "
+                                f"- Rate: {rate:.0f} records/sec")
+
+            stats[source_file] = {"read": read, "inserted": inserted, "duplicates": read - inserted}
+            total_read += read
+            total_inserted += inserted
+            logger.info(f"Finished {source_file}: {inserted} inserted, {read - inserted} duplicates skipped")
+        finally:
+            dest_conn.execute("DETACH DATABASE src")
+
+    elapsed = time.time() - start_time
+    logger.info(f"Merged {total_inserted} of {total_read} records from {len(stats)} databases in {elapsed:.1f}s")
+    return stats
+
+# Conflict policies for the k-way merge: each maps a candidate row to a sort key where
+# higher wins; ties go to the earlier shard so the result does not depend on timing
+MERGE_POLICIES = {
+    "newest": lambda date_added, length, shard_idx: (date_added or "", length, -shard_idx),
+    "longest": lambda date_added, length, shard_idx: (length, date_added or "", -shard_idx),
+    "first": lambda date_added, length, shard_idx: (-shard_idx,),
+}
+
+def _shard_rows(conn, columns, shard_idx):
+    """Yield (numerical_id, shard_idx, row) from one shard in numerical_id order"""
+    cursor = conn.execute(
+        f"SELECT numerical_id, {', '.join(columns)} FROM fleets "
+        f"WHERE numerical_id IS NOT NULL ORDER BY numerical_id"
+    )
+    for row in cursor:
+        yield row[0], shard_idx, row[1:]
+
+def kway_merge(dest_conn, source_files, policy="newest", batch_size=5000,
+               exclude_columns=DEFAULT_EXCLUDED_COLUMNS):
+    """Merge shards with a streaming k-way merge on numerical_id and an explicit conflict policy
+
+    Only one cursor per shard is open, and rows are consumed in numerical_id order, so
+    memory stays flat however large the shards are. When the same fleet appears in
+    several shards (or is already in the destination), the policy picks one copy:
+    "newest" date_added, "longest" fleet_data, or the "first" shard in source order.
+
+    Returns {source_file: {"read", "kept", "dropped", "overwritten"}}, where kept rows
+    were new to the destination, overwritten rows replaced a destination row, and
+    dropped rows lost to another copy.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy}")
+    rank = MERGE_POLICIES[policy]
+
+    ensure_unique_numerical_id(dest_conn)
+    dest_conn.commit()
+    dest_columns = get_columns(dest_conn)
+
+    sources = []
+    for source_file in source_files:
+        if not os.path.exists(source_file):
+            logger.warning(f"Source file {source_file} doesn't exist. Skipping...")
+            continue
+        conn = connect(source_file, ANALYSIS)
+        if not get_columns(conn):
+            logger.warning(f"Source {source_file} has no fleets table. Skipping...")
+            conn.close()
+            continue
+        sources.append((source_file, conn))
+
+    try:
+        source_columns = [set(get_columns(conn)) for _, conn in sources]
+        shared_columns = set(dest_columns)
+        for columns in source_columns:
+            shared_columns &= columns
+
+        # Compressed fleet_data only stays readable if its dictionaries come along;
+        # shards stored as plain text contribute NULL for the dictionary column
+        compressed = any(DICT_COLUMN in columns for columns in source_columns)
+        if compressed:
+            with dest_conn:
+                ensure_codec_schema(dest_conn)
+                for _, conn in sources:
+                    copy_dictionaries(dest_conn, conn)
+            dest_columns = get_columns(dest_conn)
+            shared_columns.add(DICT_COLUMN)
+        columns = [c for c in dest_columns if c in shared_columns and c not in exclude_columns]
+        shard_selects = [[c if c in available else f"NULL AS {c}" for c in columns] for available in source_columns]
+        date_pos = columns.index("date_added") if "date_added" in columns else None
+        data_pos = columns.index("fleet_data") if "fleet_data" in columns else None
+        dict_pos = columns.index(DICT_COLUMN) if DICT_COLUMN in columns else None
+        codecs = [FleetDataCodec(conn) for _, conn in sources]
+
+        def row_date(row):
+            return (row[date_pos] if date_pos is not None else None) or ""
+
+        def row_length(row, shard_idx):
+            if data_pos is None:
+                return 0
+            fleet_text = row[data_pos]
+            if dict_pos is not None:
+                fleet_text = codecs[shard_idx].decode(fleet_text, row[dict_pos])
+            return len(fleet_text or "")
+
+        def row_rank(row, shard_idx, with_length):
+            return rank(row_date(row), row_length(row, shard_idx) if with_length else 0, shard_idx)
+
+        # Length decides "longest" and only breaks date ties under "newest", so fleet_data
+        # is decoded just for the copies where it can change the outcome
+        def pick_winner(group):
+            if len(group) == 1:
+                return group[0]
+            if policy == "newest":
+                newest = max(row_date(candidate[2]) for candidate in group)
+                group = [candidate for candidate in group if row_date(candidate[2]) == newest]
+                if len(group) == 1:
+                    return group[0]
+            with_length = policy != "first"
+            return max(group, key=lambda candidate: row_rank(candidate[2], candidate[1], with_length))
+
+        stats = {source_file: {"read": 0, "kept": 0, "dropped": 0, "overwritten": 0}
+                 for source_file, _ in sources}
+        shard_files = [source_file for source_file, _ in sources]
+        columns_str = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        insert_sql = f"INSERT INTO fleets ({columns_str}) VALUES ({placeholders})"
+        update_sql = (f"UPDATE fleets SET {', '.join(f'{c} = ?' for c in columns)} "
+                      f"WHERE numerical_id = ?")
+        length_sql = "0"
+        if data_pos is not None:
+            length_sql = "length(fleet_data)"
+            if compressed:
+                register_functions(dest_conn)
+                length_sql = f"length(fleet_text(fleet_data, {DICT_COLUMN}))"
+        existing_sql = (f"SELECT numerical_id, {'date_added' if date_pos is not None else 'NULL'}, {length_sql} "
+                        f"FROM fleets WHERE numerical_id BETWEEN ? AND ?")
+
+        start_time = time.time()
+        written = 0
+        batch = []
+
+        def write_batch():
+            nonlocal written
+            if not batch:
+                return
+            # Existing destination copies compete under the same policy (and win ties)
+            existing = {row[0]: row for row in dest_conn.execute(existing_sql, (batch[0][0], batch[-1][0]))}
+            inserts, updates = [], []
+            for numerical_id, shard_idx, row in batch:
+                current = existing.get(numerical_id)
+                if current is None:
+                    inserts.append(row)
+                    stats[shard_files[shard_idx]]["kept"] += 1
+                    continue
+                current_rank = rank(current[1], current[2] or 0, -1)
+                with_length = policy == "longest" or row_date(row) == (current[1] or "")
+                if policy != "first" and row_rank(row, shard_idx, with_length)[:-1] > current_rank[:-1]:
+                    updates.append(row + (numerical_id,))
+                    stats[shard_files[shard_idx]]["overwritten"] += 1
+                else:
+                    stats[shard_files[shard_idx]]["dropped"] += 1
+            with dest_conn:
+                dest_conn.executemany(insert_sql, inserts)
+                dest_conn.executemany(update_sql, updates)
+                # Overwritten fleets get their card rows rebuilt by the next index_fleets
+                if updates and has_fleet_tables(dest_conn):
+                    forget_fleets(dest_conn, [row[-1] for row in updates])
+            written += len(batch)
+            elapsed = time.time() - start_time
+            logger.info(f"K-way merge: {written} fleets resolved up to numerical_id {batch[-1][0]} "
+                        f"- Rate: {written / elapsed if elapsed > 0 else 0:.0f} fleets/sec")
+            batch.clear()
+
+        streams = [_shard_rows(conn, shard_selects[shard_idx], shard_idx) for shard_idx, (_, conn) in enumerate(sources)]
+        group = []
+        for item in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            stats[shard_files[item[1]]]["read"] += 1
+            if group and item[0] != group[0][0]:
+                winner = pick_winner(group)
+                for loser in group:
+                    if loser is not winner:
+                        stats[shard_files[loser[1]]]["dropped"] += 1
+                batch.append(winner)
+                if len(batch) >= batch_size:
+                    write_batch()
+                group = []
+            group.append(item)
+        if group:
+            winner = pick_winner(group)
+            for loser in group:
+                if loser is not winner:
+                    stats[shard_files[loser[1]]]["dropped"] += 1
+            batch.append(winner)
+        write_batch()
+
+        # Rows without a numerical_id cannot conflict and are copied as-is
+        for shard_idx, (source_file, conn) in enumerate(sources):
+            null_rows = conn.execute(f"SELECT {', '.join(shard_selects[shard_idx])} FROM fleets "
+                                     f"WHERE numerical_id IS NULL").fetchall()
+            if null_rows:
+                with dest_conn:
+                    dest_conn.executemany(insert_sql, null_rows)
+                stats[source_file]["read"] += len(null_rows)
+                stats[source_file]["kept"] += len(null_rows)
+    finally:
+        for _, conn in sources:
+            conn.close()
+
+    log_merge_report(stats, policy)
+    return stats
+
+def log_merge_report(stats, policy):
+    """Log rows read, kept, overwritten and dropped per shard"""
+    logger.info(f"--- K-way merge report (policy: {policy}) ---")
+    for source_file, counts in stats.items():
+        logger.info(f"  {source_file}: read {counts['read']}, kept {counts['kept']}, "
+                    f"overwritten {counts['overwritten']}, dropped {counts['dropped']}")
+    totals = {key: sum(counts[key] for counts in stats.values()) for key in ("read", "kept", "overwritten", "dropped")}
+    logger.info(f"  Total: read {totals['read']}, kept {totals['kept']}, "
+                f"overwritten {totals['overwritten']}, dropped {totals['dropped']}")
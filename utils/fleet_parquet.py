@@ -0,0 +1,291 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+from urllib.parse import quote
+from fleet_db import connect, ANALYSIS
+from fleet_codec import register_functions, fleet_select_sql
+from fleet_parser import parse_fleet
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger("FleetParquet")
+
+# Hive convention for partition values that are empty or NULL
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Written into every export directory; only directories that have it are replaced without --overwrite
+EXPORT_MARKER = "_fleet_parquet"
+
+# Columns copied from the fleets table when present, with their Arrow type names
+FLEET_COLUMNS = [
+    ("numerical_id", "int64"),
+    ("fleet_name", "dict"),
+    ("faction", "dict"),
+    ("commander", "dict"),
+    ("points", "int32"),
+    ("date_added", "string"),
+    ("created_at", "string"),
+    ("updated_at", "string"),
+    ("legends", "int8"),
+    ("legacy", "int8"),
+    ("old_legacy", "int8"),
+    ("arc", "int8"),
+    ("shared", "int8"),
+    ("fingerprint", "int64"),
+]
+
+# Fields derived from the parsed export, appended to every fleets row
+PARSED_FLEET_COLUMNS = [
+    ("assault", "dict"),
+    ("defense", "dict"),
+    ("navigation", "dict"),
+    ("ship_count", "int16"),
+    ("squadron_count", "int16"),
+    ("squadron_points", "int32"),
+]
+
+CARD_TABLES = {
+    "fleet_ships": [
+        ("numerical_id", "int64"), ("faction", "dict"), ("position", "int16"), ("ship", "dict"),
+        ("cost", "int32"), ("points", "int32"), ("marked", "bool"),
+    ],
+    "fleet_ship_upgrades": [
+        ("numerical_id", "int64"), ("faction", "dict"), ("ship_position", "int16"), ("ship", "dict"),
+        ("position", "int16"), ("upgrade", "dict"), ("cost", "int32"), ("marked", "bool"),
+    ],
+    "fleet_squadrons": [
+        ("numerical_id", "int64"), ("faction", "dict"), ("position", "int16"), ("squadron", "dict"),
+        ("count", "int16"), ("cost", "int32"), ("marked", "bool"),
+    ],
+}
+
+def require_pyarrow():
+    """Raise a helpful error when pyarrow is not installed"""
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+def _arrow_type(name):
+    """Map a column type name to an Arrow type; strings with few distinct values are dictionary-encoded"""
+    if name == "dict":
+        return pa.dictionary(pa.int32(), pa.string())
+    return getattr(pa, {"bool": "bool_"}.get(name, name))()
+
+def _as_int(value):
+    """Coerce SQLite flag and number values (int, numeric text or NULL) to int or None"""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class PartitionedWriter:
+    """Stream rows of one table into hive-partitioned Parquet files (<table>/<column>=<value>/part-0.parquet)
+
+    One ParquetWriter stays open per partition, so each partition is a single file with
+    one row group per flushed chunk. The partition column lives in the directory name,
+    not in the files.
+    """
+
+    def __init__(self, out_dir, table, columns, partition_by=None, compression="zstd"):
+        self.table_dir = os.path.join(out_dir, table)
+        self.partition_by = partition_by if partition_by in dict(columns) else None
+        self.columns = [(name, kind) for name, kind in columns if name != self.partition_by]
+        self.schema = pa.schema([(name, _arrow_type(kind)) for name, kind in self.columns])
+        self.compression = compression
+        self.writers = {}
+        self.partitions = 0
+        self.rows = 0
+
+    def write(self, rows):
+        """Write a chunk of row dicts, grouped by partition value"""
+        if not rows:
+            return
+        groups = {}
+        if self.partition_by:
+            for row in rows:
+                groups.setdefault(row.get(self.partition_by) or DEFAULT_PARTITION, []).append(row)
+        else:
+            groups[None] = rows
+        for value, group in groups.items():
+            arrays = [pa.array([row.get(name) for row in group], type=self.schema.field(name).type)
+                      for name, _ in self.columns]
+            self._writer(value).write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+            self.rows += len(group)
+
+    def _writer(self, value):
+        writer = self.writers.get(value)
+        if writer is None:
+            directory = self.table_dir
+            if value is not None:
+                directory = os.path.join(directory, f"{self.partition_by}={quote(str(value), safe='')}")
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), self.schema,
+                                      compression=self.compression, use_dictionary=True)
+            self.writers[value] = writer
+            self.partitions += 1
+        return writer
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+def export_parquet(db_file, out_dir, partition_by="faction", include_fleet_data=True,
+                   include_cards=True, chunk_size=20000, overwrite=False):
+    """Write a fleets database to partitioned Parquet datasets in one streaming pass
+
+    Produces <out_dir>/fleets plus, with include_cards, fleet_ships, fleet_ship_upgrades
+    and fleet_squadrons with card names resolved. Card rows come from parsing fleet_data
+    as it streams past, so the source database is opened read-only and does not need
+    its card tables built. Memory is bounded by chunk_size fleets.
+
+    An existing out_dir is replaced only if it is empty, was written by an earlier
+    export, or overwrite is set; anything else raises ValueError.
+    """
+    require_pyarrow()
+    if os.path.exists(out_dir):
+        if not os.path.isdir(out_dir):
+            raise ValueError(f"{out_dir} exists and is not a directory")
+        if os.listdir(out_dir) and not overwrite and not os.path.exists(os.path.join(out_dir, EXPORT_MARKER)):
+            raise ValueError(f"{out_dir} is not empty and was not written by an export; pass --overwrite to replace it")
+        logger.info(f"Replacing existing export in {out_dir}")
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    with open(os.path.join(out_dir, EXPORT_MARKER), 'w') as f:
+        f.write(f"{os.path.abspath(db_file)}\n")
+
+    conn = connect(db_file, ANALYSIS)
+    register_functions(conn)
+    source_columns = [row[1] for row in conn.execute("PRAGMA table_info(fleets)")]
+    fleet_columns = [(name, kind) for name, kind in FLEET_COLUMNS if name in source_columns]
+    fleet_columns += PARSED_FLEET_COLUMNS
+    if include_fleet_data:
+        fleet_columns.append(("fleet_data", "large_string"))
+
+    writers = {"fleets": PartitionedWriter(out_dir, "fleets", fleet_columns, partition_by)}
+    if include_cards:
+        for table, columns in CARD_TABLES.items():
+            writers[table] = PartitionedWriter(out_dir, table, columns, partition_by)
+
+    select_columns = [name for name, _ in fleet_columns if name in source_columns or name == "fleet_data"]
+    if "fleet_data" not in select_columns:
+        select_columns.append("fleet_data")
+    cursor = conn.execute(fleet_select_sql(conn, select_columns) + " ORDER BY numerical_id")
+
+    start_time = time.time()
+    exported = 0
+    try:
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            rows = {table: [] for table in writers}
+            for values in chunk:
+                fleet_row = dict(zip(select_columns, values))
+                for name, kind in fleet_columns:
+                    if kind.startswith("int") and name in fleet_row:
+                        fleet_row[name] = _as_int(fleet_row[name])
+                fleet = parse_fleet(fleet_row["fleet_data"])
+                numerical_id = fleet_row.get("numerical_id")
+                faction = fleet_row.get("faction")
+                fleet_row.update(assault=fleet.assault, defense=fleet.defense, navigation=fleet.navigation,
+                                 ship_count=len(fleet.ships), squadron_count=len(fleet.squadrons),
+                                 squadron_points=fleet.squadron_points)
+                rows["fleets"].append(fleet_row)
+                if not include_cards:
+                    continue
+                for ship_position, ship in enumerate(fleet.ships):
+                    rows["fleet_ships"].append({
+                        "numerical_id": numerical_id, "faction": faction, "position": ship_position,
+                        "ship": ship.name, "cost": ship.cost, "points": ship.points, "marked": ship.marked,
+                    })
+                    for position, upgrade in enumerate(ship.upgrades):
+                        rows["fleet_ship_upgrades"].append({
+                            "numerical_id": numerical_id, "faction": faction, "ship_position": ship_position,
+                            "ship": ship.name, "position": position, "upgrade": upgrade.name,
+                            "cost": upgrade.cost, "marked": upgrade.marked,
+                        })
+                for position, squadron in enumerate(fleet.squadrons):
+                    rows["fleet_squadrons"].append({
+                        "numerical_id": numerical_id, "faction": faction, "position": position,
+                        "squadron": squadron.name, "count": squadron.count, "cost": squadron.cost,
+                        "marked": squadron.marked,
+                    })
+            for table, writer in writers.items():
+                writer.write(rows[table])
+            exported += len(chunk)
+            elapsed = time.time() - start_time
+            logger.info(f"Exported {exported} fleets - Rate: {exported / elapsed if elapsed > 0 else 0:.0f} fleets/sec")
+    finally:
+        for writer in writers.values():
+            writer.close()
+        conn.close()
+
+    for table, writer in writers.items():
+        logger.info(f"  {table}: {writer.rows} rows in {writer.partitions} partition(s)")
+    logger.info(f"Parquet snapshot of {db_file} written to {out_dir} in {time.time() - start_time:.1f}s")
+    return {table: writer.rows for table, writer in writers.items()}
+
+def load_table(out_dir, table="fleets", columns=None, filters=None):
+    """Load only the needed columns of an exported table as a memory-mapped Arrow table
+
+    filters uses pyarrow's DNF form, e.g. [("faction", "=", "Imperial")], and prunes
+    whole partitions when it targets the partition column.
+    """
+    require_pyarrow()
+    return pq.read_table(os.path.join(out_dir, table), columns=columns, filters=filters,
+                         memory_map=True, partitioning="hive")
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar Parquet snapshots of Armada fleet databases')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Write partitioned Parquet datasets')
+    export_parser.add_argument('database', help='Database file to export')
+    export_parser.add_argument('output', help='Output directory (an earlier export there is replaced)')
+    export_parser.add_argument('--overwrite', action='store_true',
+                               help='Replace the output directory even if it was not written by an export')
+    export_parser.add_argument('--partition-by', choices=['faction', 'none'], default='faction',
+                               help='Partition column for every dataset')
+    export_parser.add_argument('--no-fleet-data', action='store_true', help='Leave the export text out of the fleets dataset')
+    export_parser.add_argument('--no-cards', action='store_true', help='Skip the ship/upgrade/squadron datasets')
+    export_parser.add_argument('--chunk-size', type=int, default=20000, help='Fleets per streamed chunk')
+
+    summary_parser = subparsers.add_parser('summary', help='Print point statistics and faction counts from a snapshot')
+    summary_parser.add_argument('output', help='Directory written by export')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        try:
+            export_parquet(args.database, args.output,
+                           partition_by=None if args.partition_by == 'none' else args.partition_by,
+                           include_fleet_data=not args.no_fleet_data, include_cards=not args.no_cards,
+                           chunk_size=args.chunk_size, overwrite=args.overwrite)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        started = time.time()
+        fleets = load_table(args.output, columns=["points", "faction"])
+        points = fleets.column("points")
+        print(f"Loaded {fleets.num_rows} fleets ({fleets.nbytes / 1024:.0f} KB) in {time.time() - started:.3f}s")
+        print(f"points: min {pc.min(points).as_py()}, max {pc.max(points).as_py()}, "
+              f"mean {pc.mean(points).as_py():.2f}, std {pc.stddev(points, ddof=1).as_py():.2f}")
+        faction_counts = pc.value_counts(fleets.column("faction").combine_chunks().cast(pa.string()))
+        for entry in sorted(faction_counts.to_pylist(), key=lambda item: -item["counts"]):
+            print(f"  {entry['values']}: {entry['counts']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
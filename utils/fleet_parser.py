@@ -0,0 +1,277 @@
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from collections import namedtuple
+from fleet_db import connect, ANALYSIS
+from fleet_codec import register_functions, fleet_select_sql
+
+# Compact parse results: plain tuples with named fields, no per-instance dict. Parsed
+# Upgrade and Squadron tuples are shared between fleets, so treat them as immutable.
+Upgrade = namedtuple("Upgrade", "name cost marked")
+Ship = namedtuple("Ship", "name cost marked points upgrades")
+Squadron = namedtuple("Squadron", "name count cost marked")
+Fleet = namedtuple("Fleet", "name faction commander assault defense navigation ships squadrons squadron_points total_points")
+
+# Header lines before the first ship, mapped to their Fleet field
+HEADER_FIELDS = {
+    "Name": "name",
+    "Faction": "faction",
+    "Commander": "commander",
+    "Assault": "assault",
+    "Defense": "defense",
+    "Navigation": "navigation",
+}
+
+def split_card(text):
+    """Split a card line into (name, cost, marked); cost is None if the line has none
+
+    Names may contain parentheses ("Darth Vader (TIE Defender) (25)"), so the cost is
+    the last parenthesised number; a trailing "!" is the export's marker.
+    """
+    marked = text[-1:] == "!"
+    body = text[:-1] if marked else text
+    if body[-1:] == ")":
+        name, separator, cost = body[:-1].rpartition(" (")
+        if separator and (cost.isdigit() or (cost[:1] == "-" and cost[1:].isdigit())):
+            return name, int(cost), marked
+    return body, None, marked
+
+def _points(line):
+    """Return N from "= N Points" / "Total Points: N" style lines, or None"""
+    for token in line.split():
+        if token.isdigit():
+            return int(token)
+    return None
+
+# Line kinds, the first element of a classified line
+BULLET, SHIP, SUBTOTAL, SQUADRONS, TOTAL, HEADER, OTHER = range(7)
+
+# Exports repeat the same card lines across fleets (a few thousand distinct lines over the
+# whole corpus), so each distinct line is classified once and its parsed Upgrade/Squadron
+# tuples are shared between fleets. Fleet names are unique and never cached.
+LINE_CACHE_LIMIT = 200000
+_line_cache = {}
+
+_new_tuple = tuple.__new__
+
+def classify_line(line):
+    """Classify one export line into a tuple whose first element is its kind
+
+    Bullets carry both readings, (BULLET, Upgrade, Squadron), because only the section
+    decides which one applies; ships are (SHIP, name, cost, marked).
+    """
+    line = line.strip()
+    if not line:
+        return (OTHER,)
+    first = line[0]
+    if first == "•":
+        entry = line[1:].lstrip()
+        count = 1
+        squadron_entry = entry
+        count_text, separator, rest = entry.partition(" x ")
+        if separator and count_text.isdigit():
+            count = int(count_text)
+            squadron_entry = rest
+        name, cost, marked = split_card(squadron_entry)
+        return (BULLET, Upgrade(*split_card(entry)), Squadron(name, count, cost, marked))
+    if first == "=":
+        return (SUBTOTAL, _points(line))
+    if line.startswith("Total Points:"):
+        return (TOTAL, _points(line))
+    if line.startswith("Squadrons:"):
+        return (SQUADRONS,)
+    key, separator, value = line.partition(":")
+    if separator and key in HEADER_FIELDS:
+        return (HEADER, HEADER_FIELDS[key], value.strip())
+    name, cost, marked = split_card(line)
+    if cost is None:
+        return (OTHER,)
+    return (SHIP, name, cost, marked)
+
+def parse_fleet(export_text):
+    """Parse an Armada export text into a Fleet in a single pass over its lines
+
+    Header fields count only before the first ship, "• " lines are upgrades of the
+    current ship until "Squadrons:" and squadrons after it, "= N Points" closes a ship
+    (or gives the squadron subtotal) and "Total Points:" ends the fleet. Unknown lines
+    are ignored, so partial or odd exports still parse.
+    """
+    cache = _line_cache
+    cached = cache.get
+    header = {}
+    ships = []
+    squadrons = []
+    squadron_points = None
+    total_points = None
+    ship = None
+    upgrades = None
+    in_squadrons = False
+
+    for line in (export_text or "").splitlines():
+        entry = cached(line)
+        if entry is None:
+            entry = classify_line(line)
+            if entry[0] != HEADER or entry[1] != "name":
+                if len(cache) >= LINE_CACHE_LIMIT:
+                    cache.clear()
+                cache[line] = entry
+        kind = entry[0]
+        if kind == BULLET:
+            if upgrades is not None:
+                upgrades.append(entry[1])
+            elif in_squadrons:
+                squadrons.append(entry[2])
+        elif kind == SHIP:
+            if in_squadrons:
+                continue
+            if upgrades is not None:
+                ships.append(_new_tuple(Ship, (ship[1], ship[2], ship[3], None, tuple(upgrades))))
+            ship = entry
+            upgrades = []
+        elif kind == SUBTOTAL:
+            if upgrades is not None:
+                ships.append(_new_tuple(Ship, (ship[1], ship[2], ship[3], entry[1], tuple(upgrades))))
+                upgrades = None
+            elif in_squadrons:
+                squadron_points = entry[1]
+        elif kind == HEADER:
+            if not ships and upgrades is None:
+                header[entry[1]] = entry[2]
+        elif kind == SQUADRONS:
+            if upgrades is not None:
+                ships.append(_new_tuple(Ship, (ship[1], ship[2], ship[3], None, tuple(upgrades))))
+                upgrades = None
+            in_squadrons = True
+        elif kind == TOTAL:
+            total_points = entry[1]
+            break
+
+    if upgrades is not None:
+        ships.append(_new_tuple(Ship, (ship[1], ship[2], ship[3], None, tuple(upgrades))))
+
+    field = header.get
+    return _new_tuple(Fleet, (
+        field("name", ""),
+        field("faction", ""),
+        field("commander", ""),
+        field("assault", ""),
+        field("defense", ""),
+        field("navigation", ""),
+        tuple(ships),
+        tuple(squadrons),
+        squadron_points,
+        total_points,
+    ))
+
+def fleet_to_dict(fleet):
+    """Return a JSON-friendly dict of a Fleet"""
+    result = fleet._asdict()
+    result["ships"] = [dict(ship._asdict(), upgrades=[upgrade._asdict() for upgrade in ship.upgrades])
+                       for ship in fleet.ships]
+    result["squadrons"] = [squadron._asdict() for squadron in fleet.squadrons]
+    return result
+
+# The summary extraction the scrapers used before this parser, kept for the benchmark
+def _legacy_summary(export_text):
+    fleet_name_match = re.search(r"Name:\s+(.*)", export_text)
+    faction_match = re.search(r"Faction:\s+(.*)", export_text)
+    commander_match = re.search(r"Commander:\s+(.*)", export_text)
+    points_match = re.search(r"Total Points:\s+(\d+)", export_text)
+    return (fleet_name_match.group(1) if fleet_name_match else "",
+            faction_match.group(1) if faction_match else "",
+            commander_match.group(1) if commander_match else "",
+            int(points_match.group(1)) if points_match else 0)
+
+def load_corpus(db_files):
+    """Return every plain-text fleet_data string from the given databases"""
+    corpus = []
+    for db_file in db_files:
+        conn = connect(db_file, ANALYSIS)
+        try:
+            register_functions(conn)
+            corpus.extend(row[0] for row in conn.execute(fleet_select_sql(conn, ["fleet_data"])) if row[0])
+        finally:
+            conn.close()
+    return corpus
+
+def benchmark(db_files, repeat=3, alloc_sample=500):
+    """Time parse_fleet over a corpus and measure per-fleet allocations"""
+    corpus = load_corpus(db_files)
+    if not corpus:
+        print("No fleets found")
+        return None
+    total_bytes = sum(len(text) for text in corpus)
+    print(f"Corpus: {len(corpus)} fleets, {total_bytes / 1024 / 1024:.1f} MB of export text from {len(db_files)} databases")
+
+    results = {}
+    _line_cache.clear()
+    started = time.perf_counter()
+    for text in corpus:
+        parse_fleet(text)
+    elapsed = time.perf_counter() - started
+    results["parse_fleet (cold line cache)"] = len(corpus) / elapsed
+    print(f"{'parse_fleet (cold line cache)':36s} {len(corpus) / elapsed:10.0f} fleets/sec  "
+          f"({elapsed * 1e6 / len(corpus):.1f} us/fleet, {len(_line_cache)} distinct lines cached)")
+
+    for label, function in (("parse_fleet", parse_fleet), ("legacy 4x re.search (summary only)", _legacy_summary)):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for text in corpus:
+                function(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[label] = len(corpus) / best
+        print(f"{label:36s} {len(corpus) / best:10.0f} fleets/sec  ({best * 1e6 / len(corpus):.1f} us/fleet, best of {repeat})")
+
+    # Allocations that survive a parse are the returned Fleet; peak includes temporaries
+    sample = corpus[:alloc_sample]
+    tracemalloc.start()
+    kept = []
+    before = tracemalloc.take_snapshot()
+    for text in sample:
+        kept.append(parse_fleet(text))
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    print(f"Retained per fleet: {blocks / len(sample):.1f} allocations, {size / len(sample):.0f} bytes "
+          f"(peak {peak / 1024:.0f} KB over {len(sample)} fleets)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse Armada fleet export text')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bench_parser = subparsers.add_parser('bench', help='Benchmark the parser over fleet databases')
+    bench_parser.add_argument('databases', nargs='+', help='Database files, e.g. databases/armada_fleets_*.db')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='Timed passes over the corpus (best is reported)')
+    bench_parser.add_argument('--alloc-sample', type=int, default=500, help='Fleets traced for allocation counts')
+
+    show_parser = subparsers.add_parser('show', help='Print the parsed structure of one fleet as JSON')
+    show_parser.add_argument('database', help='Database file')
+    show_parser.add_argument('fleet_id', type=int, help='numerical_id of the fleet')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.databases, repeat=args.repeat, alloc_sample=args.alloc_sample)
+    else:
+        conn = connect(args.database, ANALYSIS)
+        try:
+            register_functions(conn)
+            row = conn.execute(fleet_select_sql(conn, ["fleet_data"]) + " WHERE numerical_id = ?",
+                               (args.fleet_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            print(f"Fleet {args.fleet_id} not found")
+            sys.exit(1)
+        print(json.dumps(fleet_to_dict(parse_fleet(row[0])), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+import os
+import sys
+import glob
+import html
+import time
+import random
+import shutil
+import signal
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fleet_db import connect, ANALYSIS
+from fleet_codec import register_functions, fleet_select_sql
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger("FleetSite")
+
+SCRAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kingston-scraper2.py")
+
+# Same minimum the scraper applies before storing a fleet (MIN_FLEET_POINTS)
+MIN_FLEET_POINTS = 375
+
+# How the fleet page's export button names its export view; the real site's markup
+# has used both, and find_export_url reads either
+DATA_HREF = "data-href"
+ONCLICK = "onclick"
+EXPORT_LINKS = (DATA_HREF, ONCLICK)
+
+FLEET_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>{name}</title></head>
+<body>
+<h1>{name}</h1>
+<p>{faction} &middot; {points} points</p>
+{button}
+</body>
+</html>
+"""
+
+EXPORT_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Export</title></head>
+<body><pre>{text}</pre></body>
+</html>
+"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Armada fleets (local stand-in)</title></head>
+<body><h1>Armada fleets</h1><p>{count} public fleets.</p></body>
+</html>
+"""
+
+def load_fleets(patterns, limit=None):
+    """Return (numerical_id, fleet_data, points) rows from shard databases, newest ID first
+
+    The same ID in several shards is kept once; fleet_data is plain text whether or
+    not the shard is compressed.
+    """
+    fleets = {}
+    for pattern in patterns:
+        for db_file in sorted(glob.glob(pattern)):
+            conn = connect(db_file, ANALYSIS)
+            try:
+                register_functions(conn)
+                select = fleet_select_sql(conn, ["numerical_id", "fleet_data", "points"])
+                for fleet_id, fleet_data, points in conn.execute(select):
+                    if fleet_data and fleet_id not in fleets:
+                        fleets[fleet_id] = (fleet_data, points or 0)
+            finally:
+                conn.close()
+    rows = [(fleet_id, text, points) for fleet_id, (text, points) in sorted(fleets.items(), reverse=True)]
+    return rows[:limit] if limit else rows
+
+class FleetSite:
+    """In-memory stand-in for the fleet site serving seeded fleets
+
+    By default fleets keep their stored numerical_id. With `start`, they are laid out
+    downward from that ID instead, each ID holding the next fleet with probability
+    `density`, so a benchmark can choose how much of its range is empty. A `private_rate`
+    fraction of the placed fleets is private. Empty and private IDs redirect to / like
+    the real site.
+
+    Every request waits `latency` seconds (+/- `jitter` as a fraction) and fails with
+    `error_status` at `error_rate`.
+    """
+
+    def __init__(self, fleets, start=None, density=1.0, private_rate=0.0, latency=0.0, jitter=0.5,
+                 error_rate=0.0, error_status=503, export_link=DATA_HREF, plain_export=False, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.export_link = export_link
+        self.plain_export = plain_export
+        self.rng = random.Random(seed)
+        self.public = {}
+        self.private = set()
+
+        layout = random.Random(seed)
+        next_id = start
+        for fleet_id, text, points in fleets:
+            if start is not None:
+                while density < 1.0 and layout.random() >= density:
+                    next_id -= 1
+                fleet_id, next_id = next_id, next_id - 1
+            if layout.random() < private_rate:
+                self.private.add(fleet_id)
+            else:
+                self.public[fleet_id] = (text, points)
+
+        self.requests = {}
+        self._lock = threading.Lock()
+        self.httpd = None
+
+    def id_range(self):
+        """Return (highest, lowest) ID holding a fleet, public or private"""
+        ids = list(self.public) + list(self.private)
+        return (max(ids), min(ids)) if ids else (0, 0)
+
+    def expected(self, start_id, end_id, min_points=MIN_FLEET_POINTS):
+        """Number of fleets a full scan of end < id <= start should store"""
+        return sum(1 for fleet_id, (_, points) in self.public.items()
+                   if end_id < fleet_id <= start_id and points >= min_points)
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def take_counts(self):
+        """Return and reset the served request counts"""
+        with self._lock:
+            counts, self.requests = self.requests, {}
+        return counts
+
+    def export_button(self, fleet_id):
+        export_url = f"/fleet/{fleet_id}/export/"
+        if self.export_link == ONCLICK:
+            return f'<button class="export" onclick="window.open(&#39;{export_url}&#39;)">Export</button>'
+        return f'<button class="export" data-href="{export_url}" onclick="window.open(this.dataset.href)">Export</button>'
+
+    def respond(self, path):
+        """Return (status, content_type, body, location) for a request path"""
+        if path == "/":
+            return 200, "text/html", HOME_PAGE.format(count=len(self.public)), None
+
+        parts = [part for part in path.split("/") if part]
+        if len(parts) not in (2, 3) or parts[0] != "fleet" or not parts[1].isdigit() \
+                or (len(parts) == 3 and parts[2] != "export"):
+            return 404, "text/plain", "Not found", None
+
+        fleet = self.public.get(int(parts[1]))
+        if fleet is None:
+            return 302, "text/plain", "", "/"
+
+        text, points = fleet
+        if len(parts) == 3:
+            if self.plain_export:
+                return 200, "text/plain", text, None
+            return 200, "text/html", EXPORT_PAGE.format(text=html.escape(text)), None
+
+        header = dict(line.split(":", 1) for line in text.splitlines()[:2] if ":" in line)
+        page = FLEET_PAGE.format(name=html.escape(header.get("Name", "").strip()),
+                                 faction=html.escape(header.get("Faction", "").strip()),
+                                 points=points, button=self.export_button(parts[1]))
+        return 200, "text/html", page, None
+
+    def start(self, host="127.0.0.1", port=0):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if site.latency > 0:
+                    time.sleep(site.latency * site.rng.uniform(1 - site.jitter, 1 + site.jitter))
+                path = self.path.split("?", 1)[0]
+                if path != "/" and site.rng.random() < site.error_rate:
+                    site.count("error")
+                    self.send_error(site.error_status)
+                    return
+                status, content_type, body, location = site.respond(path)
+                site.count({200: "export" if path.endswith("/export/") else "page",
+                            302: "redirect"}.get(status, "not_found") if path != "/" else "home")
+                data = body.encode("utf-8")
+                self.send_response(status)
+                if location:
+                    self.send_header("Location", location)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="fleet-site", daemon=True).start()
+        logger.info(f"Serving {len(self.public)} public and {len(self.private)} private fleets at {self.url}")
+        return self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+def _tree_rss(root_pid):
+    """Total resident memory in bytes of a process and all its descendants (Linux /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so fields are counted after its closing paren
+        parent = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, ()))
+        try:
+            with open(f"/proc/{pid}/statm", 'r') as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            pass
+    return total
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _count_fleets(work_dir):
+    total = 0
+    for db_file in glob.glob(os.path.join(work_dir, "databases", "armada_fleets_*.db")):
+        conn = connect(db_file, ANALYSIS)
+        try:
+            total += conn.execute("SELECT COUNT(*) FROM fleets").fetchone()[0]
+        finally:
+            conn.close()
+    return total
+
+def run_scraper(site, start_id, end_id, workers, backend="http", engine="process", rate=200.0,
+                extra_args=None, timeout=600, keep=False):
+    """Run kingston-scraper2.py once against the site in a fresh directory and measure it
+
+    CPU is the user+system time of the scraper and every process it waited for; RSS is
+    the peak total over the process tree, sampled every 0.2s (Linux only, else 0).
+    """
+    work_dir = tempfile.mkdtemp(prefix="fleet_site_bench_")
+    host, port = site.httpd.server_address[:2]
+    command = [sys.executable, SCRAPER, "--start", str(start_id), "--end", str(end_id),
+               "--workers", str(workers), "--backend", backend, "--engine", engine,
+               "--base-url", site.url, "--connectivity-check", f"{host}:{port}",
+               "--rate", str(rate), "--max-rate", str(rate), "--min-rate", str(min(0.5, rate)),
+               "--no-probe-ledger"]
+    if backend == "http":
+        command.append("--no-selenium-fallback")
+    command.extend(extra_args or [])
+
+    site.take_counts()
+    cpu_before = _children_cpu()
+    peak_rss = 0
+    timed_out = False
+    started = time.time()
+    with open(os.path.join(work_dir, "scraper.out"), 'w') as output:
+        process = subprocess.Popen(command, cwd=work_dir, stdout=output, stderr=subprocess.STDOUT,
+                                   start_new_session=True)
+        try:
+            while process.poll() is None:
+                if time.time() - started > timeout:
+                    timed_out = True
+                    os.killpg(process.pid, signal.SIGINT)
+                    try:
+                        process.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        os.killpg(process.pid, signal.SIGKILL)
+                        process.wait()
+                    break
+                if os.path.isdir("/proc"):
+                    peak_rss = max(peak_rss, _tree_rss(process.pid))
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+            raise
+    elapsed = time.time() - started
+    cpu = _children_cpu() - cpu_before
+
+    result = {
+        "backend": backend, "engine": engine, "workers": workers,
+        "ids": start_id - end_id, "fleets": _count_fleets(work_dir), "expected": site.expected(start_id, end_id),
+        "seconds": elapsed, "cpu": cpu, "peak_rss": peak_rss, "returncode": process.returncode,
+        "timed_out": timed_out, "requests": site.take_counts(), "work_dir": work_dir if keep else None,
+    }
+    if process.returncode != 0 and not timed_out:
+        logger.warning(f"Scraper exited with {process.returncode}; output in {os.path.join(work_dir, 'scraper.out')}")
+        keep = True
+        result["work_dir"] = work_dir
+    if not keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+def benchmark(site, start_id, end_id, worker_counts, backends, engines, repeat=1, **kwargs):
+    """Run the scraper for every backend/engine/worker count and print fleets/sec, CPU and RSS
+
+    The async engine only runs with the HTTP backend, as in kingston-scraper2.py.
+    """
+    results = []
+    for backend in backends:
+        for engine in engines:
+            if engine == "async" and backend != "http":
+                continue
+            for workers in worker_counts:
+                for _ in range(repeat):
+                    logger.info(f"Running {backend}/{engine} with {workers} workers over {start_id - end_id} IDs")
+                    results.append(run_scraper(site, start_id, end_id, workers, backend, engine, **kwargs))
+
+    print(f"{'backend':9s} {'engine':8s} {'workers':>7s} {'fleets':>13s} {'time':>8s} {'fleets/s':>9s} "
+          f"{'IDs/s':>8s} {'CPU':>8s} {'CPU%':>6s} {'peak RSS':>9s}")
+    for row in results:
+        seconds = row["seconds"]
+        note = " (timed out)" if row["timed_out"] else (f" (exit {row['returncode']})" if row["returncode"] else "")
+        print(f"{row['backend']:9s} {row['engine']:8s} {row['workers']:7d} "
+              f"{str(row['fleets']) + '/' + str(row['expected']):>13s} {seconds:7.1f}s {row['fleets'] / seconds:9.2f} "
+              f"{row['ids'] / seconds:8.2f} {row['cpu']:7.1f}s {row['cpu'] / seconds:6.0%} "
+              f"{row['peak_rss'] / (1024 * 1024):7.0f}MB{note}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the fleet site and scraper throughput benchmark')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    site_parser = argparse.ArgumentParser(add_help=False)
+    site_parser.add_argument('--databases', nargs='+', default=['databases/armada_fleets_*.db'],
+                             help='Shard files (or globs) whose fleets are served')
+    site_parser.add_argument('--fleets', type=int, default=None, help='Serve at most this many fleets (newest first)')
+    site_parser.add_argument('--start', type=int, default=None,
+                             help='Lay the fleets out downward from this ID instead of their stored IDs')
+    site_parser.add_argument('--density', type=float, default=1.0,
+                             help='With --start, fraction of IDs that hold a fleet (the rest redirect to /)')
+    site_parser.add_argument('--private-rate', type=float, default=0.0,
+                             help='Fraction of fleets that are private and redirect to /')
+    site_parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    site_parser.add_argument('--jitter', type=float, default=0.5, help='Latency varies by +/- this fraction')
+    site_parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    site_parser.add_argument('--error-status', type=int, default=503, help='HTTP status of failed requests')
+    site_parser.add_argument('--export-link', choices=EXPORT_LINKS, default=DATA_HREF,
+                             help='How the export button links to the export view')
+    site_parser.add_argument('--plain-export', action='store_true',
+                             help='Serve the export view as text/plain instead of HTML with a <pre>')
+    site_parser.add_argument('--seed', type=int, default=0, help='Seed for layout, privacy, latency and errors')
+    site_parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+
+    serve_parser = subparsers.add_parser('serve', parents=[site_parser], help='Serve the stand-in site until interrupted')
+    serve_parser.add_argument('--port', type=int, default=8080, help='Port to listen on (0 picks a free port)')
+
+    bench_parser = subparsers.add_parser('bench', parents=[site_parser],
+                                         help='Run kingston-scraper2.py against the stand-in site and compare throughput')
+    bench_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to compare')
+    bench_parser.add_argument('--backends', nargs='+', choices=['http', 'selenium'], default=['http'],
+                              help='Fetch backends to compare')
+    bench_parser.add_argument('--engines', nargs='+', choices=['process', 'async'], default=['process'],
+                              help='Scraper engines to compare')
+    bench_parser.add_argument('--ids', type=int, default=None,
+                              help='Fleet IDs to scan, downward from the highest served ID (default: all of them)')
+    bench_parser.add_argument('--rate', type=float, default=200.0, help='Requests/sec the scraper\'s limiter is held at')
+    bench_parser.add_argument('--repeat', type=int, default=1, help='Runs per configuration')
+    bench_parser.add_argument('--timeout', type=float, default=600, help='Seconds before a run is interrupted')
+    bench_parser.add_argument('--keep', action='store_true', help='Keep each run\'s working directory')
+    bench_parser.add_argument('scraper_args', nargs=argparse.REMAINDER,
+                              help='Extra kingston-scraper2.py arguments after --')
+    args = parser.parse_args()
+
+    site = FleetSite(load_fleets(args.databases, args.fleets), start=args.start, density=args.density,
+                     private_rate=args.private_rate, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, error_status=args.error_status, export_link=args.export_link,
+                     plain_export=args.plain_export, seed=args.seed)
+    if not site.public and not site.private:
+        parser.error(f"no fleets found in {' '.join(args.databases)}")
+
+    if args.command == 'serve':
+        site.start(args.host, args.port)
+        high, low = site.id_range()
+        logger.info(f"Fleet IDs {high} down to {low}; scrape with --base-url {site.url} "
+                    f"--connectivity-check {args.host}:{site.httpd.server_address[1]}")
+        try:
+            while True:
+                time.sleep(60)
+                logger.info(f"Requests in the last minute: {site.take_counts()}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            site.stop()
+        return
+
+    high, low = site.id_range()
+    start_id = high
+    end_id = max(low - 1, high - args.ids) if args.ids else low - 1
+    extra_args = args.scraper_args[1:] if args.scraper_args[:1] == ['--'] else args.scraper_args
+    site.start(args.host, 0)
+    try:
+        benchmark(site, start_id, end_id, args.workers, args.backends, args.engines, repeat=args.repeat,
+                  rate=args.rate, extra_args=extra_args, timeout=args.timeout, keep=args.keep)
+    finally:
+        site.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from fleet_db import connect, CLEANUP
+
+logger = logging.getLogger("FleetStats")
+
+STAT_TABLES = ("stat_fleets", "stat_ship_upgrades", "stat_faction_squadrons", "stat_commanders")
+
+# process-ship-data.cjs leaves upgrades costing more than this out of ship builds
+MAX_UPGRADE_COST = 20
+
+# SQLite caps bound parameters per statement; id lists are applied in chunks of this size
+ID_CHUNK = 500
+
+# Card labels as the statistics files spell them: "Name (cost)"
+def _label(name, cost):
+    return f"CASE WHEN {cost} IS NULL THEN {name} ELSE {name} || ' (' || {cost} || ')' END"
+
+# Aggregate queries over the card rows of the stat_fleets rows f matched by {where}; ? is +1 or -1.
+# New keys are inserted in order of first appearance (fleet, ship, card position).
+SHIP_UPGRADE_DELTA = f'''
+INSERT INTO stat_ship_upgrades (ship_name, upgrade_name, frequency)
+SELECT {_label("ship.name", "s.cost")}, {_label("upgrade.name", "u.cost")}, ? * COUNT(*)
+FROM fleet_ship_upgrades u
+JOIN fleet_ships s ON s.numerical_id = u.numerical_id AND s.position = u.ship_position
+JOIN cards ship ON ship.card_id = u.ship_card_id
+JOIN cards upgrade ON upgrade.card_id = u.upgrade_card_id
+JOIN stat_fleets f ON f.numerical_id = u.numerical_id
+WHERE (u.cost IS NULL OR u.cost <= {MAX_UPGRADE_COST}) AND {{where}}
+GROUP BY 1, 2
+ORDER BY MIN((u.numerical_id * 100 + u.ship_position) * 100 + u.position)
+ON CONFLICT (ship_name, upgrade_name) DO UPDATE SET frequency = frequency + excluded.frequency
+'''
+
+FACTION_SQUADRON_DELTA = f'''
+INSERT INTO stat_faction_squadrons (faction, squadron_name, total_count)
+SELECT f.faction, {_label("squadron.name", "q.cost")}, ? * SUM(q.count)
+FROM fleet_squadrons q
+JOIN cards squadron ON squadron.card_id = q.squadron_card_id
+JOIN stat_fleets f ON f.numerical_id = q.numerical_id
+WHERE {{where}}
+GROUP BY 1, 2
+ORDER BY MIN(q.numerical_id * 100 + q.position)
+ON CONFLICT (faction, squadron_name) DO UPDATE SET total_count = total_count + excluded.total_count
+'''
+
+COMMANDER_DELTA = '''
+INSERT INTO stat_commanders (faction, commander, fleets)
+SELECT f.faction, f.commander, ? * COUNT(*)
+FROM stat_fleets f
+WHERE {where}
+GROUP BY 1, 2
+ORDER BY MIN(f.numerical_id)
+ON CONFLICT (faction, commander) DO UPDATE SET fleets = fleets + excluded.fleets
+'''
+
+def has_stat_tables(conn):
+    """Return True if a database has the aggregate statistics tables"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='stat_fleets'").fetchone() is not None
+
+def ensure_stat_tables(conn):
+    """Create the aggregate tables; databases indexed before they existed are backfilled once
+
+    stat_fleets remembers the faction and commander each fleet was counted under, so
+    a fleet is subtracted exactly as it was added even if its fleets row changes.
+    Aggregate rows keep their rowid on update, so exports list entries in the order
+    they were first seen, like the JavaScript generator did.
+    """
+    created = not has_stat_tables(conn)
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS stat_fleets (
+        numerical_id INTEGER PRIMARY KEY,
+        faction TEXT NOT NULL,
+        commander TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS stat_ship_upgrades (
+        ship_name TEXT NOT NULL,
+        upgrade_name TEXT NOT NULL,
+        frequency INTEGER NOT NULL,
+        UNIQUE (ship_name, upgrade_name)
+    );
+
+    CREATE TABLE IF NOT EXISTS stat_faction_squadrons (
+        faction TEXT NOT NULL,
+        squadron_name TEXT NOT NULL,
+        total_count INTEGER NOT NULL,
+        UNIQUE (faction, squadron_name)
+    );
+
+    CREATE TABLE IF NOT EXISTS stat_commanders (
+        faction TEXT NOT NULL,
+        commander TEXT NOT NULL,
+        fleets INTEGER NOT NULL,
+        UNIQUE (faction, commander)
+    );
+    ''')
+    if created and conn.execute("SELECT 1 FROM indexed_fleets LIMIT 1").fetchone():
+        with conn:
+            rebuild_stats(conn)
+
+def _apply(conn, where, params, sign):
+    """Add (sign=1) or subtract (sign=-1) the aggregates of the fleets matched by where"""
+    for template in (SHIP_UPGRADE_DELTA, FACTION_SQUADRON_DELTA, COMMANDER_DELTA):
+        conn.execute(template.format(where=where), [sign] + params)
+    if sign < 0:
+        conn.execute("DELETE FROM stat_ship_upgrades WHERE frequency <= 0")
+        conn.execute("DELETE FROM stat_faction_squadrons WHERE total_count <= 0")
+        conn.execute("DELETE FROM stat_commanders WHERE fleets <= 0")
+
+def _chunks(numerical_ids):
+    numerical_ids = [numerical_id for numerical_id in numerical_ids if numerical_id is not None]
+    for start in range(0, len(numerical_ids), ID_CHUNK):
+        yield numerical_ids[start:start + ID_CHUNK]
+
+def count_fleets(conn, numerical_ids):
+    """Add freshly written fleets to the aggregates
+
+    Call after their card rows are written, inside the same transaction; faction and
+    commander come from the fleets rows.
+    """
+    if not has_stat_tables(conn):
+        return
+    for chunk in _chunks(numerical_ids):
+        marks = ", ".join("?" * len(chunk))
+        conn.execute(f"INSERT OR REPLACE INTO stat_fleets (numerical_id, faction, commander) "
+                     f"SELECT numerical_id, COALESCE(faction, ''), COALESCE(commander, '') FROM fleets "
+                     f"WHERE numerical_id IN ({marks})", chunk)
+        _apply(conn, f"f.numerical_id IN ({marks})", chunk, 1)
+
+def uncount_fleets(conn, numerical_ids):
+    """Subtract fleets from the aggregates; call before their card rows are deleted"""
+    if not has_stat_tables(conn):
+        return
+    for chunk in _chunks(numerical_ids):
+        marks = ", ".join("?" * len(chunk))
+        _apply(conn, f"f.numerical_id IN ({marks})", chunk, -1)
+        conn.execute(f"DELETE FROM stat_fleets WHERE numerical_id IN ({marks})", chunk)
+
+def rebuild_stats(conn):
+    """Recompute every aggregate from the card tables (no export text is re-parsed)"""
+    for table in STAT_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("INSERT INTO stat_fleets (numerical_id, faction, commander) "
+                 "SELECT i.numerical_id, COALESCE(MIN(f.faction), ''), COALESCE(MIN(f.commander), '') "
+                 "FROM indexed_fleets i JOIN fleets f ON f.numerical_id = i.numerical_id GROUP BY i.numerical_id")
+    _apply(conn, "1", [], 1)
+
+def _csv_field(value):
+    """Quote a field the way process-ship-data.cjs does (only when it contains a comma)"""
+    value = str(value)
+    return f'"{value}"' if "," in value else value
+
+def _write_nested(path_base, header, nested):
+    """Write {outer: {inner: n}} as <path_base>.json and <path_base>.csv in the generator's layout"""
+    with open(f"{path_base}.json", "w", encoding="utf-8") as f:
+        f.write(json.dumps(nested, indent=2, ensure_ascii=False))
+    rows = [header]
+    for outer, inner_counts in nested.items():
+        for inner, count in inner_counts.items():
+            rows.append(f"{_csv_field(outer)},{_csv_field(inner)},{count}")
+    with open(f"{path_base}.csv", "w", encoding="utf-8") as f:
+        f.write("\n".join(rows) if nested else header + "\n")
+
+def _nested(conn, query):
+    nested = {}
+    for outer, inner, count in conn.execute(query):
+        nested.setdefault(outer, {})[inner] = count
+    return nested
+
+def export_raw_builds(conn, path_base):
+    """Write raw_ship_builds JSON/CSV (one entry per ship of every fleet) from the card tables"""
+    builds = []
+    current = None
+    rows = conn.execute(f'''
+    SELECT s.numerical_id, s.position, {_label("ship.name", "s.cost")}, {_label("upgrade.name", "u.cost")}
+    FROM fleet_ships s
+    JOIN cards ship ON ship.card_id = s.ship_card_id
+    LEFT JOIN fleet_ship_upgrades u ON u.numerical_id = s.numerical_id AND u.ship_position = s.position
+        AND (u.cost IS NULL OR u.cost <= {MAX_UPGRADE_COST})
+    LEFT JOIN cards upgrade ON upgrade.card_id = u.upgrade_card_id
+    ORDER BY s.numerical_id, s.position, u.position
+    ''')
+    for numerical_id, position, ship_name, upgrade_name in rows:
+        if current is None or current[0] != (numerical_id, position):
+            current = ((numerical_id, position), {"ship_name": ship_name, "upgrades": []})
+            builds.append(current[1])
+        if upgrade_name is not None:
+            current[1]["upgrades"].append(upgrade_name)
+
+    with open(f"{path_base}.json", "w", encoding="utf-8") as f:
+        f.write(json.dumps(builds, indent=2, ensure_ascii=False))
+    csv_rows = ["build_id,ship_name,upgrade_name"]
+    build_id = 0
+    for build in builds:
+        if build["upgrades"]:
+            build_id += 1
+            for upgrade in build["upgrades"]:
+                csv_rows.append(f"{build_id},{_csv_field(build['ship_name'])},{_csv_field(upgrade)}")
+    with open(f"{path_base}.csv", "w", encoding="utf-8") as f:
+        f.write("\n".join(csv_rows) if builds else csv_rows[0] + "\n")
+    return len(builds)
+
+def export_stats(conn, out_dir, tag=None, raw_builds=False):
+    """Dump the current aggregates to the statistics files in databases/
+
+    Writes ship_upgrade_frequencies, squadron_faction_counts and commander_faction_counts
+    (.json and .csv, suffixed with _<tag> when given). Reads only the aggregate tables, so
+    the cost does not grow with the number of fleets; raw_builds also rewrites
+    raw_ship_builds, which lists every ship and therefore scans the card tables.
+    """
+    suffix = f"_{tag}" if tag else ""
+    os.makedirs(out_dir, exist_ok=True)
+    start_time = time.time()
+
+    ship_upgrades = _nested(conn, "SELECT ship_name, upgrade_name, frequency FROM stat_ship_upgrades ORDER BY rowid")
+    _write_nested(os.path.join(out_dir, f"ship_upgrade_frequencies{suffix}"),
+                  "ship_name,upgrade_name,frequency", ship_upgrades)
+    squadrons = _nested(conn, "SELECT faction, squadron_name, total_count FROM stat_faction_squadrons ORDER BY rowid")
+    _write_nested(os.path.join(out_dir, f"squadron_faction_counts{suffix}"),
+                  "faction,squadron_name,total_count", squadrons)
+    commanders = _nested(conn, "SELECT faction, commander, fleets FROM stat_commanders ORDER BY rowid")
+    _write_nested(os.path.join(out_dir, f"commander_faction_counts{suffix}"),
+                  "faction,commander,fleets", commanders)
+    if raw_builds:
+        builds = export_raw_builds(conn, os.path.join(out_dir, f"raw_ship_builds{suffix}"))
+        logger.info(f"Wrote {builds} raw ship builds")
+
+    fleets = conn.execute("SELECT COUNT(*) FROM stat_fleets").fetchone()[0]
+    logger.info(f"Exported statistics of {fleets} fleets to {out_dir} in {time.time() - start_time:.2f}s "
+                f"({sum(len(inner) for inner in ship_upgrades.values())} ship/upgrade pairs, "
+                f"{sum(len(inner) for inner in squadrons.values())} faction/squadron pairs, "
+                f"{sum(len(inner) for inner in commanders.values())} commanders)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally maintained fleet statistics')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Write the statistics JSON/CSV files from a database')
+    export_parser.add_argument('database', help='Database file to export from')
+    export_parser.add_argument('--output-dir', default='databases', help='Directory for the statistics files')
+    export_parser.add_argument('--tag', default=None, help='Suffix for the file names, e.g. "fleets"')
+    export_parser.add_argument('--raw-builds', action='store_true', help='Also write raw_ship_builds (scans every fleet)')
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='Recompute the aggregates from the card tables')
+    rebuild_parser.add_argument('databases', nargs='+', help='Database files to rebuild in place')
+    args = parser.parse_args()
+
+    # Import here: fleet_tables maintains these tables and imports this module
+    from fleet_tables import ensure_fleet_tables, index_fleets
+
+    if args.command == 'export':
+        conn = connect(args.database, CLEANUP)
+        try:
+            # Fleets scraped before the card tables existed are indexed (and counted) first
+            index_fleets(conn)
+            export_stats(conn, args.output_dir, tag=args.tag, raw_builds=args.raw_builds)
+        finally:
+            conn.close()
+    else:
+        for db_file in args.databases:
+            conn = connect(db_file, CLEANUP)
+            try:
+                ensure_fleet_tables(conn)
+                with conn:
+                    rebuild_stats(conn)
+                logger.info(f"Rebuilt statistics of {db_file}")
+            finally:
+                conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
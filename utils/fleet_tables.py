@@ -0,0 +1,332 @@
+import sys
+import time
+import logging
+import hashlib
+import argparse
+from functools import lru_cache
+from fleet_db import connect, ANALYSIS, CLEANUP
+from fleet_codec import FINGERPRINT_COLUMN, register_functions, fleet_select_sql
+from fleet_parser import parse_fleet
+from fleet_stats import STAT_TABLES, ensure_stat_tables, count_fleets, uncount_fleets
+
+logger = logging.getLogger("FleetTables")
+
+# Card kinds stored in the cards table
+SHIP = "ship"
+UPGRADE = "upgrade"
+SQUADRON = "squadron"
+
+CHILD_TABLES = ("fleet_ships", "fleet_ship_upgrades", "fleet_squadrons", "indexed_fleets")
+
+# Which copy of a repeated list dedup_fleets keeps
+DEDUP_KEEP = ("first", "last")
+
+def ensure_fleet_tables(conn):
+    """Create the normalized card tables next to fleets
+
+    Child rows are keyed by numerical_id (stable across shards, unlike the
+    autoincrement id) and reference cards by an id derived from the card's kind and
+    name, so every database agrees on card ids without a lookup. indexed_fleets marks
+    the fleets whose cards have been written, including fleets with no cards. The
+    aggregate statistics tables are kept next to them (see fleet_stats).
+    """
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS cards (
+        card_id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_kind_name ON cards(kind, name);
+
+    CREATE TABLE IF NOT EXISTS fleet_ships (
+        numerical_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        ship_card_id INTEGER NOT NULL,
+        cost INTEGER,
+        total_points INTEGER,
+        marked INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (numerical_id, position)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_fleet_ships_card ON fleet_ships(ship_card_id);
+
+    CREATE TABLE IF NOT EXISTS fleet_ship_upgrades (
+        numerical_id INTEGER NOT NULL,
+        ship_position INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        ship_card_id INTEGER NOT NULL,
+        upgrade_card_id INTEGER NOT NULL,
+        cost INTEGER,
+        marked INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (numerical_id, ship_position, position)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_fleet_ship_upgrades_pair ON fleet_ship_upgrades(upgrade_card_id, ship_card_id);
+    CREATE INDEX IF NOT EXISTS idx_fleet_ship_upgrades_ship ON fleet_ship_upgrades(ship_card_id);
+
+    CREATE TABLE IF NOT EXISTS fleet_squadrons (
+        numerical_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        squadron_card_id INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 1,
+        cost INTEGER,
+        marked INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (numerical_id, position)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_fleet_squadrons_card ON fleet_squadrons(squadron_card_id);
+
+    CREATE TABLE IF NOT EXISTS indexed_fleets (
+        numerical_id INTEGER PRIMARY KEY
+    ) WITHOUT ROWID;
+    ''')
+    ensure_fingerprint_column(conn)
+    ensure_stat_tables(conn)
+
+def ensure_fingerprint_column(conn):
+    """Add the indexed fingerprint column to fleets if missing; index_fleets fills it in"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(fleets)")]
+    if not columns:
+        return
+    if FINGERPRINT_COLUMN not in columns:
+        conn.execute(f"ALTER TABLE fleets ADD COLUMN {FINGERPRINT_COLUMN} INTEGER")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_fingerprint ON fleets({FINGERPRINT_COLUMN})")
+
+@lru_cache(maxsize=16384)
+def card_id(kind, name):
+    """Return the interned id of a card: the first 7 bytes of a hash of kind and name"""
+    return int.from_bytes(hashlib.sha256(f"{kind}\0{name}".encode("utf-8")).digest()[:7], "big")
+
+def fleet_fingerprint(fleet):
+    """Return the content fingerprint of a parsed Fleet: a hash of its sorted composition
+
+    Ships with their upgrades and squadrons with their counts, each with costs, sorted
+    so card order does not matter. The fleet name, objectives and "!" markers are left
+    out, so the same list saved under another name or ID gets the same fingerprint.
+    """
+    ships = sorted("\t".join([f"{ship.name} ({ship.cost})"] +
+                             sorted(f"{upgrade.name} ({upgrade.cost})" for upgrade in ship.upgrades))
+                   for ship in fleet.ships)
+    squadrons = sorted(f"{squadron.count} x {squadron.name} ({squadron.cost})" for squadron in fleet.squadrons)
+    canonical = "\n".join(ships + ["Squadrons:"] + squadrons)
+    return int.from_bytes(hashlib.sha256(canonical.encode("utf-8")).digest()[:7], "big")
+
+# Fingerprint of a fleet that parses to no ships and no squadrons. Such texts are not the same
+# list, so dedup_fleets never groups them; keeping the hash value leaves stored fingerprints valid.
+EMPTY_FINGERPRINT = fleet_fingerprint(parse_fleet(""))
+
+def forget_fleets(conn, numerical_ids):
+    """Delete the card rows of fleets so they are rewritten on the next write or index"""
+    uncount_fleets(conn, numerical_ids)
+    params = [(numerical_id,) for numerical_id in numerical_ids]
+    for table in CHILD_TABLES:
+        conn.executemany(f"DELETE FROM {table} WHERE numerical_id = ?", params)
+
+def write_fleet_cards(conn, fleets):
+    """Write the card rows of (numerical_id, export_text) pairs, replacing any existing rows
+
+    Runs inside the caller's transaction, so cards, the fleet's fingerprint and the
+    aggregate statistics land atomically with the fleet insert.
+    """
+    cards = {}
+    ships = []
+    upgrades = []
+    squadrons = []
+    numerical_ids = []
+    fingerprints = []
+    for numerical_id, export_text in fleets:
+        if numerical_id is None:
+            continue
+        numerical_ids.append(numerical_id)
+        fleet = parse_fleet(export_text)
+        fingerprints.append((fleet_fingerprint(fleet), numerical_id))
+        for ship_position, (name, cost, marked, total_points, ship_upgrades) in enumerate(fleet.ships):
+            ship_card = card_id(SHIP, name)
+            cards[ship_card] = (SHIP, name)
+            ships.append((numerical_id, ship_position, ship_card, cost, total_points, int(marked)))
+            for position, (upgrade_name, upgrade_cost, upgrade_marked) in enumerate(ship_upgrades):
+                upgrade_card = card_id(UPGRADE, upgrade_name)
+                cards[upgrade_card] = (UPGRADE, upgrade_name)
+                upgrades.append((numerical_id, ship_position, position, ship_card, upgrade_card,
+                                 upgrade_cost, int(upgrade_marked)))
+        for position, (name, count, cost, marked) in enumerate(fleet.squadrons):
+            squadron_card = card_id(SQUADRON, name)
+            cards[squadron_card] = (SQUADRON, name)
+            squadrons.append((numerical_id, position, squadron_card, count, cost, int(marked)))
+
+    forget_fleets(conn, numerical_ids)
+    conn.executemany("INSERT OR IGNORE INTO cards (card_id, kind, name) VALUES (?, ?, ?)",
+                     [(card, kind, name) for card, (kind, name) in cards.items()])
+    conn.executemany("INSERT INTO fleet_ships (numerical_id, position, ship_card_id, cost, total_points, marked) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", ships)
+    conn.executemany("INSERT INTO fleet_ship_upgrades (numerical_id, ship_position, position, ship_card_id, "
+                     "upgrade_card_id, cost, marked) VALUES (?, ?, ?, ?, ?, ?, ?)", upgrades)
+    conn.executemany("INSERT INTO fleet_squadrons (numerical_id, position, squadron_card_id, count, cost, marked) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", squadrons)
+    conn.executemany("INSERT INTO indexed_fleets (numerical_id) VALUES (?)",
+                     [(numerical_id,) for numerical_id in numerical_ids])
+    conn.executemany(f"UPDATE fleets SET {FINGERPRINT_COLUMN} = ? WHERE numerical_id = ?", fingerprints)
+    count_fleets(conn, numerical_ids)
+    return len(numerical_ids)
+
+def index_fleets(conn, batch_size=1000, rebuild=False):
+    """Write card rows for every fleet not yet in indexed_fleets (or all fleets with rebuild)
+
+    Used after merges and to backfill databases scraped before the card tables existed;
+    fleets without a fingerprint (copied from shards that predate it) are redone too.
+    Reads fleet_data through the codec, so compressed databases are indexed too.
+    """
+    ensure_fleet_tables(conn)
+    if rebuild:
+        with conn:
+            for table in CHILD_TABLES + STAT_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+    register_functions(conn)
+    select_sql = fleet_select_sql(conn, ["numerical_id", "fleet_data"])
+
+    start_time = time.time()
+    indexed = 0
+    last_id = None
+    while True:
+        rows = conn.execute(
+            f"{select_sql} WHERE numerical_id > COALESCE(?, -1) "
+            f"AND (numerical_id NOT IN (SELECT numerical_id FROM indexed_fleets) OR {FINGERPRINT_COLUMN} IS NULL) "
+            f"ORDER BY numerical_id LIMIT ?", (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        with conn:
+            indexed += write_fleet_cards(conn, rows)
+        last_id = rows[-1][0]
+
+    elapsed = time.time() - start_time
+    if indexed:
+        logger.info(f"Indexed cards of {indexed} fleets in {elapsed:.1f}s "
+                    f"({indexed / elapsed if elapsed > 0 else 0:.0f} fleets/sec)")
+    return indexed
+
+def prune_orphans(conn):
+    """Delete card rows whose fleet no longer exists"""
+    orphans = [row[0] for row in conn.execute(
+        "SELECT numerical_id FROM indexed_fleets WHERE numerical_id NOT IN "
+        "(SELECT numerical_id FROM fleets WHERE numerical_id IS NOT NULL)")]
+    uncount_fleets(conn, orphans)
+    for table in CHILD_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE numerical_id NOT IN (SELECT numerical_id FROM fleets "
+                     f"WHERE numerical_id IS NOT NULL)")
+
+def dedup_fleets(conn, keep="first"):
+    """Delete fleets whose fingerprint repeats another fleet's, keeping one copy of each list
+
+    keep="first" keeps the lowest numerical_id (the original save), "last" the highest.
+    Duplicates are found with a GROUP BY over the fingerprint index; their card rows and
+    statistics go with them. Fleets that parse to an empty composition are never treated
+    as duplicates. Returns the number of fleets deleted.
+    """
+    if keep not in DEDUP_KEEP:
+        raise ValueError(f"Unknown dedup keep mode: {keep}")
+    index_fleets(conn)
+    pick = "MIN" if keep == "first" else "MAX"
+    duplicates = [row[0] for row in conn.execute(f'''
+    SELECT f.numerical_id
+    FROM fleets f
+    JOIN (SELECT {FINGERPRINT_COLUMN} AS fingerprint, {pick}(numerical_id) AS kept_id
+          FROM fleets WHERE {FINGERPRINT_COLUMN} IS NOT NULL AND {FINGERPRINT_COLUMN} != ?
+          GROUP BY {FINGERPRINT_COLUMN} HAVING COUNT(*) > 1) d ON f.{FINGERPRINT_COLUMN} = d.fingerprint
+    WHERE f.numerical_id != d.kept_id
+    ''', (EMPTY_FINGERPRINT,))]
+    if duplicates:
+        with conn:
+            forget_fleets(conn, duplicates)
+            conn.executemany("DELETE FROM fleets WHERE numerical_id = ?", [(numerical_id,) for numerical_id in duplicates])
+    logger.info(f"Removed {len(duplicates)} duplicate fleets (kept the {keep} copy of each list)")
+    return len(duplicates)
+
+def count_unique_lists(conn):
+    """Return (distinct lists, fleets without a fingerprint yet); each empty composition counts as its own list"""
+    return conn.execute(f"SELECT COUNT(DISTINCT NULLIF({FINGERPRINT_COLUMN}, ?)) + "
+                        f"COALESCE(SUM({FINGERPRINT_COLUMN} = ?), 0), COUNT(*) - COUNT({FINGERPRINT_COLUMN}) "
+                        f"FROM fleets", (EMPTY_FINGERPRINT, EMPTY_FINGERPRINT)).fetchone()
+
+def has_fingerprints(conn):
+    """Return True if a database's fleets table has the fingerprint column"""
+    return any(row[1] == FINGERPRINT_COLUMN for row in conn.execute("PRAGMA table_info(fleets)"))
+
+def has_fleet_tables(conn):
+    """Return True if a database has the normalized card tables"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='indexed_fleets'").fetchone() is not None
+
+def upgrade_frequency(conn, ship_name=None, upgrade_name=None):
+    """Return (ship, upgrade, fleets) rows counting how often each upgrade appears on each ship
+
+    Names match with LIKE, so "%Kuat Refit%" selects every ISD Kuat Refit build.
+    """
+    query = '''
+    SELECT ship.name, upgrade.name, COUNT(*) AS frequency
+    FROM fleet_ship_upgrades u
+    JOIN cards ship ON ship.card_id = u.ship_card_id
+    JOIN cards upgrade ON upgrade.card_id = u.upgrade_card_id
+    '''
+    conditions = []
+    params = []
+    if ship_name:
+        conditions.append("ship.name LIKE ?")
+        params.append(ship_name)
+    if upgrade_name:
+        conditions.append("upgrade.name LIKE ?")
+        params.append(upgrade_name)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY u.ship_card_id, u.upgrade_card_id ORDER BY frequency DESC"
+    return conn.execute(query, params).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalized ship/upgrade/squadron tables for Armada fleet databases')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='Write card tables for fleets that are not indexed yet')
+    index_parser.add_argument('databases', nargs='+', help='Database files to index in place')
+    index_parser.add_argument('--rebuild', action='store_true', help='Drop and rewrite every card row')
+
+    dedup_parser = subparsers.add_parser('dedup', help='Delete repeated fleet lists, keeping one copy of each')
+    dedup_parser.add_argument('databases', nargs='+', help='Database files to deduplicate in place')
+    dedup_parser.add_argument('--keep', choices=DEDUP_KEEP, default='first',
+                              help='Keep the first (lowest numerical_id) or last copy of each list')
+    dedup_parser.add_argument('--dry-run', action='store_true', help='Only report how many lists are unique')
+
+    query_parser = subparsers.add_parser('upgrades', help='Count upgrades per ship')
+    query_parser.add_argument('database', help='Database file to query')
+    query_parser.add_argument('--ship', default=None, help='Ship name (SQL LIKE pattern)')
+    query_parser.add_argument('--upgrade', default=None, help='Upgrade name (SQL LIKE pattern)')
+    query_parser.add_argument('--limit', type=int, default=25, help='Rows to print')
+    args = parser.parse_args()
+
+    if args.command == 'index':
+        for db_file in args.databases:
+            conn = connect(db_file, CLEANUP)
+            try:
+                index_fleets(conn, rebuild=args.rebuild)
+            finally:
+                conn.close()
+    elif args.command == 'dedup':
+        for db_file in args.databases:
+            conn = connect(db_file, CLEANUP)
+            try:
+                if args.dry_run:
+                    index_fleets(conn)
+                    unique, _ = count_unique_lists(conn)
+                    total = conn.execute("SELECT COUNT(*) FROM fleets").fetchone()[0]
+                    logger.info(f"{db_file}: {unique} unique lists among {total} fleets ({total - unique} duplicates)")
+                else:
+                    dedup_fleets(conn, keep=args.keep)
+            finally:
+                conn.close()
+    else:
+        conn = connect(args.database, ANALYSIS)
+        try:
+            for ship, upgrade, frequency in upgrade_frequency(conn, args.ship, args.upgrade)[:args.limit]:
+                print(f"{frequency:6d}  {ship}  +  {upgrade}")
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("FleetTrace")
+
+# Stages of a Selenium fetch (extract_fleet_data), in page order
+SELENIUM_STAGES = (
+    "clear_state",     # clearing cookies and storage before a retry
+    "navigate",        # safe_navigate to the fleet page
+    "page_body",       # waiting for <body> of the fleet page
+    "export_button",   # waiting for button.export to be clickable
+    "click",           # clicking the export button
+    "export_window",   # waiting for the export window handle
+    "switch_tab",      # switching to the export window
+    "export_body",     # waiting for <body> of the export view
+    "read_text",       # reading body.text (the HTTP backend uses it for the export text too)
+    "close_tab",       # closing the export window and switching back
+)
+
+# Stages of an HTTP fetch (HttpFetchBackend.fetch)
+HTTP_STAGES = ("http_page", "find_export", "http_export")
+
+# Shared by both backends
+FETCH_STAGES = SELENIUM_STAGES + HTTP_STAGES + ("parse",)
+
+OK = "ok"
+
+class FleetTrace:
+    """Spans of one fleet fetch; written as one JSONL record when the fetch ends
+
+    The record is {"fleet_id", "worker", "pid", "ts", "duration", "outcome", "spans"}
+    where each span is {"stage", "attempt", "start", "duration", "outcome"} with times
+    in seconds relative to the start of the fetch. A span's outcome is "ok" or the
+    name of the exception that left it (e.g. TimeoutException).
+    """
+
+    def __init__(self, tracer, fleet_id, probe, sampled):
+        self.tracer = tracer
+        self.fleet_id = fleet_id
+        self.probe = probe if probe is not None else {}
+        self.sampled = sampled
+        self.attempt = 0
+        self.spans = []
+        self.started = None
+        self.ts = None
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one stage"""
+        started = time.perf_counter()
+        outcome = OK
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            self.tracer.observe(stage, duration)
+            if self.sampled:
+                self.spans.append({"stage": stage, "attempt": self.attempt,
+                                   "start": round(started - self.started, 6),
+                                   "duration": round(duration, 6), "outcome": outcome})
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.ts = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.sampled:
+            outcome = exc_type.__name__ if exc_type else self.probe.get("outcome", "error")
+            self.tracer.write({
+                "fleet_id": self.fleet_id, "worker": self.tracer.worker_id, "pid": os.getpid(),
+                "ts": round(self.ts, 3), "duration": round(time.perf_counter() - self.started, 6),
+                "outcome": outcome, "spans": self.spans,
+            })
+        self.tracer.finished(self)
+        return False
+
+class _NoTrace:
+    """Stand-in trace for fetches that are not traced"""
+    attempt = 0
+
+    @contextmanager
+    def span(self, stage):
+        yield
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NO_TRACE = _NoTrace()
+
+class Tracer:
+    """Per-process span recorder for fleet fetches
+
+    Every span is forwarded to `metrics` (a ScraperMetrics) when given; a `sample`
+    fraction of fleets is also written to `trace_file` as JSONL. Records go out in a
+    single append each, so several processes can share one trace file.
+    """
+
+    def __init__(self, trace_file=None, sample=1.0, worker_id=None, metrics=None):
+        self.trace_file = trace_file
+        self.sample = sample
+        self.worker_id = worker_id
+        self.metrics = metrics
+        self._fd = None
+        self._local = threading.local()
+
+    def fleet(self, fleet_id, probe=None):
+        """Return the trace context of a fleet fetch (the active one if the fetch is nested)"""
+        active = getattr(self._local, "trace", None)
+        if active is not None:
+            return _Nested(active)
+        sampled = self.trace_file is not None and random.random() < self.sample
+        trace = FleetTrace(self, fleet_id, probe, sampled)
+        self._local.trace = trace
+        return trace
+
+    def finished(self, trace):
+        self._local.trace = None
+
+    def observe(self, stage, duration):
+        if self.metrics is not None:
+            self.metrics.observe(stage, duration)
+
+    def write(self, record):
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+            self._fd = os.open(self.trace_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self._fd, (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class _Nested:
+    """Context for a fetch that runs inside another one (e.g. the HTTP backend's Selenium fallback)"""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class _NoTracer:
+    def fleet(self, fleet_id, probe=None):
+        return NO_TRACE
+
+    def close(self):
+        pass
+
+NO_TRACER = _NoTracer()
+
+def quantile(values, q):
+    """Quantile of sorted values with linear interpolation (numpy's default)"""
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+def load_traces(paths, outcome=None):
+    """Yield trace records from JSONL files, optionally only fleets with one outcome"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line {line_number} of {path}")
+                    continue
+                if outcome is None or record.get("outcome") == outcome:
+                    yield record
+
+def summarize(records):
+    """Return per-stage rows and per-outcome fleet rows of p50/p95/p99 and time share"""
+    stages = {}
+    starts = {}
+    fleets = {}
+    for record in records:
+        fleets.setdefault(record["outcome"], []).append(record["duration"])
+        for span in record["spans"]:
+            durations, failures = stages.setdefault(span["stage"], ([], {}))
+            durations.append(span["duration"])
+            starts[span["stage"]] = starts.get(span["stage"], 0.0) + span["start"]
+            if span["outcome"] != OK:
+                failures[span["outcome"]] = failures.get(span["outcome"], 0) + 1
+
+    # Stages in page order: by their mean offset from the start of the fetch
+    total_time = sum(sum(durations) for durations, _ in stages.values())
+    stage_rows = []
+    for stage in sorted(stages, key=lambda name: starts[name] / len(stages[name][0])):
+        durations, failures = stages[stage]
+        durations.sort()
+        stage_rows.append({
+            "stage": stage, "count": len(durations),
+            "p50": quantile(durations, 0.5), "p95": quantile(durations, 0.95), "p99": quantile(durations, 0.99),
+            "mean": sum(durations) / len(durations),
+            "share": sum(durations) / total_time if total_time else 0.0,
+            "failures": failures,
+        })
+    fleet_rows = []
+    for outcome, durations in sorted(fleets.items(), key=lambda item: -len(item[1])):
+        durations.sort()
+        fleet_rows.append({
+            "outcome": outcome, "count": len(durations),
+            "p50": quantile(durations, 0.5), "p95": quantile(durations, 0.95), "p99": quantile(durations, 0.99),
+            "mean": sum(durations) / len(durations),
+        })
+    return stage_rows, fleet_rows
+
+def _ms(seconds):
+    if seconds < 0.01:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds * 1000:.0f}ms" if seconds < 10 else f"{seconds:.1f}s"
+
+def print_summary(paths, outcome=None):
+    stage_rows, fleet_rows = summarize(load_traces(paths, outcome))
+    if not fleet_rows:
+        print("No trace records found")
+        return
+    print(f"{'stage':14s} {'count':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'mean':>8s} {'share':>6s}  failures")
+    for row in stage_rows:
+        failures = ", ".join(f"{name} {count}" for name, count in sorted(row["failures"].items()))
+        print(f"{row['stage']:14s} {row['count']:7d} {_ms(row['p50']):>8s} {_ms(row['p95']):>8s} "
+              f"{_ms(row['p99']):>8s} {_ms(row['mean']):>8s} {row['share']:6.1%}  {failures}")
+    print()
+    print(f"{'fleet outcome':14s} {'count':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'mean':>8s}")
+    for row in fleet_rows:
+        print(f"{row['outcome']:14s} {row['count']:7d} {_ms(row['p50']):>8s} {_ms(row['p95']):>8s} "
+              f"{_ms(row['p99']):>8s} {_ms(row['mean']):>8s}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage timing traces of fleet fetches')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary_parser = subparsers.add_parser('summary', help='Print p50/p95/p99 per stage from JSONL traces')
+    summary_parser.add_argument('traces', nargs='+', help='Trace files written with kingston-scraper2.py --trace-file')
+    summary_parser.add_argument('--outcome', default=None,
+                                help='Only fleets with this outcome (found, private, below_threshold, error, ...)')
+    args = parser.parse_args()
+
+    print_summary(args.traces, args.outcome)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
@@ -1,8 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
 import time
-import sqlite3
-import re
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -10,10 +8,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
+from fleet_parser import parse_fleet
+from fleet_db import connect, SCRAPE_WRITER
+from probe_ledger import ProbeLedger, FOUND, PRIVATE, BELOW_THRESHOLD, ERROR
 
 # Database setup
 def setup_database():
-    conn = sqlite3.connect('armada_fleets.db')
+    conn = connect('armada_fleets.db', SCRAPE_WRITER)
     cursor = conn.cursor()
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS fleets (
@@ -46,7 +47,9 @@ def setup_driver():
     return webdriver.Chrome(service=service, options=options)
 
 # Extract fleet data
-def extract_fleet_data(fleet_id, driver):
+def extract_fleet_data(fleet_id, driver, probe=None):
+    # probe["outcome"] receives the probe ledger outcome; it stays unset on errors
+    probe = probe if probe is not None else {}
     try:
         # First check if the fleet exists
         fleet_url = f"https://armada.ryankingston.com/fleet/{fleet_id}/"
@@ -58,6 +61,7 @@ def extract_fleet_data(fleet_id, driver):
         # Check if redirected to home page (private or non-existent fleet)
         if driver.current_url == "https://armada.ryankingston.com/":
             print(f"Fleet {fleet_id} is private or doesn't exist. Skipping...")
+            probe["outcome"] = PRIVATE
             return None
         
         # Find and click the export button
@@ -83,22 +87,20 @@ def extract_fleet_data(fleet_id, driver):
             driver.switch_to.window(driver.window_handles[0])
             
             # Extract fleet information
-            fleet_name_match = re.search(r"Name:\s+(.*)", export_text)
-            faction_match = re.search(r"Faction:\s+(.*)", export_text)
-            commander_match = re.search(r"Commander:\s+(.*)", export_text)
-            points_match = re.search(r"Total Points:\s+(\d+)", export_text)
-            
-            fleet_name = fleet_name_match.group(1) if fleet_name_match else ""
-            faction = faction_match.group(1) if faction_match else ""
-            commander = commander_match.group(1) if commander_match else ""
-            points = int(points_match.group(1)) if points_match else 0
+            fleet = parse_fleet(export_text)
+            fleet_name = fleet.name
+            faction = fleet.faction
+            commander = fleet.commander
+            points = fleet.total_points or 0
             
             # Check if total points is less than 375
             if points < 375:
                 print(f"Fleet {fleet_id} has only {points} points. Skipping...")
+                probe["outcome"] = BELOW_THRESHOLD
                 return None
                 
             # Return fleet data
+            probe["outcome"] = FOUND
             return {
                 "fleet_data": export_text,
                 "faction": faction,
@@ -120,6 +122,7 @@ def extract_fleet_data(fleet_id, driver):
 def main():
     conn, cursor = setup_database()
     driver = setup_driver()
+    ledger = ProbeLedger('probe_ledger.db').open()
     
     try:
         # Loop through fleet IDs in descending order
@@ -131,9 +134,16 @@ def main():
             if cursor.fetchone():
                 print(f"Fleet {fleet_id} already in database. Skipping...")
                 continue
+            
+            # Skip IDs recently probed as private or under 375 points
+            if not ledger.should_probe(fleet_id):
+                print(f"Fleet {fleet_id} was recently probed as private or under the points minimum. Skipping...")
+                continue
                 
             # Extract fleet data
-            fleet_data = extract_fleet_data(fleet_id, driver)
+            probe = {}
+            fleet_data = extract_fleet_data(fleet_id, driver, probe)
+            ledger.record(fleet_id, probe.get("outcome", ERROR))
             
             if fleet_data:
                 # Insert into database
@@ -162,6 +172,7 @@ def main():
         print(f"Error in main execution: {e}")
     finally:
         driver.quit()
+        ledger.close()
         conn.close()
         print("Script execution completed")
 
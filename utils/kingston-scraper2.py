@@ -6,8 +6,17 @@ import os
 import argparse
 import logging
 import socket
+import html
+import asyncio
+import threading
+import queue
+import signal
+from concurrent.futures import ThreadPoolExecutor
 import urllib3
-from multiprocessing import Process, Value, Lock
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from multiprocessing import Process, Value, Lock, Queue
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,6 +24,16 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
+from fleet_merge import merge_shards, kway_merge, MERGE_POLICIES
+from fleet_parser import parse_fleet
+from fleet_db import connect, SCRAPE_WRITER, BULK_MERGE, ANALYSIS
+from fleet_tables import ensure_fleet_tables, write_fleet_cards, index_fleets, dedup_fleets
+from fleet_checkpoint import (ScanJournal, ensure_checkpoint_table, has_checkpoint_table, record_scanned,
+                              remaining_gaps, scanned_intervals, subtract_runs, legacy_checkpoint_file,
+                              import_legacy_checkpoint)
+from scraper_metrics import ScraperMetrics, MetricsServer
+from fleet_trace import Tracer, NO_TRACE, NO_TRACER
+from probe_ledger import ProbeLedger, FOUND, PRIVATE, BELOW_THRESHOLD, ERROR, DEFAULT_MISS_TTL_DAYS
 
 # Configure logging
 logging.basicConfig(
@@ -35,9 +54,51 @@ logging.getLogger('urllib3.connectionpool').setLevel(logging.WARNING)
 os.environ['WDM_LOG_LEVEL'] = '0'
 os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 
+# Fleet site and minimum points for a fleet to be stored
+BASE_URL = "https://armada.ryankingston.com"
+MIN_FLEET_POINTS = 375
+
+# Shard that holds fleets found while sampling the ID space
+SAMPLE_DB_FILE = "databases/armada_fleets_sample.db"
+
+# Shard that holds fleets ingested by the tail follower
+FOLLOW_DB_FILE = "databases/armada_fleets_follow.db"
+
+# Host:port probed by the connectivity check; a local stand-in site (fleet_site.py) points it at itself
+CONNECTIVITY_CHECK_ENV = "ARMADA_CONNECTIVITY_CHECK"
+DEFAULT_CONNECTIVITY_CHECK = "8.8.8.8:53"
+
+# Split a connectivity check address
+def parse_check_address(value):
+    """Parse HOST[:PORT] into (host, port), defaulting to the DNS port 53"""
+    host, sep, port = value.rpartition(":")
+    if not sep:
+        return value, 53
+    if not host or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Invalid connectivity check address {value!r}, expected HOST[:PORT]")
+    return host, int(port)
+
+# Validate --connectivity-check on the command line
+def connectivity_check_arg(value):
+    """argparse type for HOST[:PORT] connectivity check addresses"""
+    try:
+        parse_check_address(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
 # Internet connectivity check
-def check_internet_connection(host="8.8.8.8", port=53, timeout=3):
+def check_internet_connection(host=None, port=None, timeout=3):
     """Check if there is an internet connection available"""
+    if host is None:
+        address = os.environ.get(CONNECTIVITY_CHECK_ENV, DEFAULT_CONNECTIVITY_CHECK)
+        try:
+            host, check_port = parse_check_address(address)
+        except ValueError as e:
+            logger.warning(f"{e} in ${CONNECTIVITY_CHECK_ENV}, using {DEFAULT_CONNECTIVITY_CHECK}")
+            host, check_port = parse_check_address(DEFAULT_CONNECTIVITY_CHECK)
+        port = port if port is not None else check_port
+    port = port if port is not None else 53
     try:
         socket.setdefaulttimeout(timeout)
         socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
@@ -68,13 +129,12 @@ def wait_for_internet(initial_delay=5, max_delay=300, max_attempts=None):
     return False
 
 # Database setup
-def setup_database(db_file):
-    """Create and set up the SQLite database"""
+def setup_database(db_file, profile=SCRAPE_WRITER):
+    """Create and set up the SQLite database (scrape-writer connection unless a profile is given)"""
     # Retry database connection in case of issues
     for attempt in range(3):
         try:
-            conn = sqlite3.connect(db_file, timeout=60)
-            conn.execute("PRAGMA journal_mode=WAL")
+            conn = connect(db_file, profile)
             cursor = conn.cursor()
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS fleets (
@@ -99,6 +159,12 @@ def setup_database(db_file):
             
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_numerical_id ON fleets(numerical_id)')
             
+            # Normalized ship/upgrade/squadron tables, written alongside each fleet
+            ensure_fleet_tables(conn)
+            
+            # Journal of scanned ID intervals, written in the same transactions as the fleets
+            ensure_checkpoint_table(conn)
+            
             conn.commit()
             return conn, cursor
         except sqlite3.Error as e:
@@ -109,6 +175,66 @@ def setup_database(db_file):
                 logger.error(f"Failed to set up database after multiple attempts: {e}")
                 raise
 
+# Resolve the chromedriver binary once per run instead of on every browser start
+CHROMEDRIVER_PATH_ENV = "ARMADA_CHROMEDRIVER_PATH"
+
+def get_chromedriver_path():
+    """Return the chromedriver path, installing it on first use and sharing it with child processes"""
+    path = os.environ.get(CHROMEDRIVER_PATH_ENV)
+    if path and os.path.exists(path):
+        return path
+    path = ChromeDriverManager().install()
+    os.environ[CHROMEDRIVER_PATH_ENV] = path
+    return path
+
+# Compact set of fleet IDs already stored for a worker's range
+class KnownIdSet:
+    """Bitset over end < id <= start; IDs outside the range are never reported as known"""
+    
+    def __init__(self, start_id, end_id):
+        self.start_id = start_id
+        self.end_id = end_id
+        self.bits = bytearray((max(0, start_id - end_id) + 7) // 8)
+        self.count = 0
+    
+    def _offset(self, fleet_id):
+        if self.end_id < fleet_id <= self.start_id:
+            return self.start_id - fleet_id
+        return None
+    
+    def add(self, fleet_id):
+        offset = self._offset(fleet_id)
+        if offset is not None and not self.bits[offset >> 3] & (1 << (offset & 7)):
+            self.bits[offset >> 3] |= 1 << (offset & 7)
+            self.count += 1
+    
+    def __contains__(self, fleet_id):
+        offset = self._offset(fleet_id)
+        return offset is not None and bool(self.bits[offset >> 3] & (1 << (offset & 7)))
+    
+    def __len__(self):
+        return self.count
+
+# Load the stored fleet IDs of a range in one query
+def load_known_ids(cursor, start_id, end_id):
+    """Return a KnownIdSet of every numerical_id in end < id <= start, retrying on database locks"""
+    known_ids = KnownIdSet(start_id, end_id)
+    for attempt in range(3):
+        try:
+            cursor.execute(
+                "SELECT numerical_id FROM fleets WHERE numerical_id <= ? AND numerical_id > ?",
+                (start_id, end_id)
+            )
+            for (fleet_id,) in cursor:
+                known_ids.add(fleet_id)
+            return known_ids
+        except sqlite3.OperationalError as e:
+            if "database is locked" in str(e) and attempt < 2:
+                logger.warning("Database locked while preloading IDs, retrying in 2s...")
+                time.sleep(2)
+            else:
+                raise
+
 # Setup Selenium WebDriver with robust error prevention
 def setup_driver(retry_count=3):
     """Set up Chrome WebDriver with optimized settings for stability"""
@@ -154,7 +280,7 @@ def setup_driver(retry_count=3):
                     raise ConnectionError("No internet connection available")
             
             # Setup service with automatic chromedriver management
-            service = Service(ChromeDriverManager().install())
+            service = Service(get_chromedriver_path())
             driver = webdriver.Chrome(service=service, options=options)
             driver.set_page_load_timeout(30)
             driver.set_script_timeout(30)
@@ -181,7 +307,7 @@ def setup_driver(retry_count=3):
                     minimal_options.add_argument('--headless')
                     minimal_options.add_argument('--disable-gpu')
                     minimal_options.add_argument('--no-sandbox')
-                    service = Service(ChromeDriverManager().install())
+                    service = Service(get_chromedriver_path())
                     driver = webdriver.Chrome(service=service, options=minimal_options)
                     return driver
                 except Exception as e2:
@@ -196,7 +322,7 @@ def get_highest_processed_id(db_file):
     
     for attempt in range(3):
         try:
-            conn = sqlite3.connect(db_file)
+            conn = connect(db_file, ANALYSIS)
             cursor = conn.cursor()
             cursor.execute("SELECT MAX(numerical_id) FROM fleets")
             result = cursor.fetchone()[0]
@@ -261,24 +387,61 @@ def safe_navigate(driver, url, max_retries=5):
     
     return False
 
+# Parse the summary fields out of an export page
+def parse_fleet_export(fleet_id, export_text, probe=None):
+    """Build the fleet record from export text, or return None if the fleet is under the points minimum"""
+    probe = probe if probe is not None else {}
+    fleet = parse_fleet(export_text)
+    fleet_name = fleet.name
+    faction = fleet.faction
+    commander = fleet.commander
+    points = fleet.total_points or 0
+    
+    # Check if total points is less than the minimum
+    if points < MIN_FLEET_POINTS:
+        logger.info(f"Fleet {fleet_id} has only {points} points. Skipping...")
+        probe["outcome"] = BELOW_THRESHOLD
+        return None
+    
+    probe["outcome"] = FOUND
+    return {
+        "fleet_data": export_text,
+        "faction": faction,
+        "fleet_name": fleet_name,
+        "commander": commander,
+        "points": points,
+        "numerical_id": fleet_id
+    }
+
 # Extract fleet data with robust error handling and recovery
-def extract_fleet_data(fleet_id, driver, max_retries=3):
-    """Extract fleet data from the website with retry mechanism"""
+def extract_fleet_data(fleet_id, driver, max_retries=3, base_url=BASE_URL, probe=None, trace=None):
+    """Extract fleet data from the website with retry mechanism
+
+    If a `probe` dict is given, its "outcome" is set to the probe ledger outcome
+    (found, private or below_threshold); it is left unset for errors. If a `trace`
+    (fleet_trace.FleetTrace) is given, every page step is recorded as a span.
+    """
+    probe = probe if probe is not None else {}
+    trace = trace if trace is not None else NO_TRACE
     for attempt in range(max_retries):
+        trace.attempt = attempt
         try:
             # Clear cookies and cache between attempts
             if attempt > 0:
                 try:
-                    driver.delete_all_cookies()
-                    driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+                    with trace.span("clear_state"):
+                        driver.delete_all_cookies()
+                        driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
                 except Exception as e:
                     logger.warning(f"Failed to clear browser state: {e}")
             
             # First check if the fleet exists
-            fleet_url = f"https://armada.ryankingston.com/fleet/{fleet_id}/"
+            fleet_url = f"{base_url}/fleet/{fleet_id}/"
             
             # Use safe navigation that handles connection issues
-            if not safe_navigate(driver, fleet_url):
+            with trace.span("navigate"):
+                navigated = safe_navigate(driver, fleet_url)
+            if not navigated:
                 logger.warning(f"Safe navigation failed for fleet {fleet_id}. Checking internet...")
                 
                 # If we can't navigate, it might be a connection issue
@@ -301,9 +464,10 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
             
             # Wait for the page to load
             try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
+                with trace.span("page_body"):
+                    WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    )
             except TimeoutException:
                 logger.warning(f"Timeout waiting for fleet page {fleet_id} to load")
                 # Check for internet connection issues
@@ -323,27 +487,31 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
                     return None
             
             # Check if redirected to home page (private or non-existent fleet)
-            if driver.current_url == "https://armada.ryankingston.com/":
+            if driver.current_url.rstrip("/") == base_url.rstrip("/"):
                 logger.info(f"Fleet {fleet_id} is private or doesn't exist. Skipping...")
+                probe["outcome"] = PRIVATE
                 return None
             
             # Find and click the export button
             try:
                 # Look for the export button
                 try:
-                    export_button = WebDriverWait(driver, 8).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "button.export"))
-                    )
+                    with trace.span("export_button"):
+                        export_button = WebDriverWait(driver, 8).until(
+                            EC.element_to_be_clickable((By.CSS_SELECTOR, "button.export"))
+                        )
                     
                     # Try JavaScript click first (more reliable)
-                    try:
-                        driver.execute_script("arguments[0].click();", export_button)
-                    except Exception as js_e:
-                        logger.warning(f"JavaScript click failed, trying regular click: {js_e}")
-                        export_button.click()
+                    with trace.span("click"):
+                        try:
+                            driver.execute_script("arguments[0].click();", export_button)
+                        except Exception as js_e:
+                            logger.warning(f"JavaScript click failed, trying regular click: {js_e}")
+                            export_button.click()
                     
                     # Wait for new tab to open
-                    WebDriverWait(driver, 8).until(lambda d: len(d.window_handles) > 1)
+                    with trace.span("export_window"):
+                        WebDriverWait(driver, 8).until(lambda d: len(d.window_handles) > 1)
                 except TimeoutException:
                     logger.warning(f"Export button not found or not clickable for fleet {fleet_id}")
                     
@@ -363,17 +531,19 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
                         return None
                 
                 # Switch to the new tab
-                original_window = driver.current_window_handle
-                for window_handle in driver.window_handles:
-                    if window_handle != original_window:
-                        driver.switch_to.window(window_handle)
-                        break
+                with trace.span("switch_tab"):
+                    original_window = driver.current_window_handle
+                    for window_handle in driver.window_handles:
+                        if window_handle != original_window:
+                            driver.switch_to.window(window_handle)
+                            break
                 
                 # Wait for export page content to load
                 try:
-                    WebDriverWait(driver, 8).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
+                    with trace.span("export_body"):
+                        WebDriverWait(driver, 8).until(
+                            EC.presence_of_element_located((By.TAG_NAME, "body"))
+                        )
                 except TimeoutException:
                     logger.warning(f"Timeout waiting for export page content for fleet {fleet_id}")
                     
@@ -410,15 +580,17 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
                 
                 # Get the text content
                 try:
-                    export_text = driver.find_element(By.TAG_NAME, "body").text
+                    with trace.span("read_text"):
+                        export_text = driver.find_element(By.TAG_NAME, "body").text
                 except Exception as e:
                     logger.warning(f"Failed to extract text from export page: {e}")
                     export_text = ""
                 
                 # Always close the export tab and switch back
                 try:
-                    driver.close()
-                    driver.switch_to.window(original_window)
+                    with trace.span("close_tab"):
+                        driver.close()
+                        driver.switch_to.window(original_window)
                 except Exception as e:
                     logger.warning(f"Error closing export tab: {e}")
                     # Need a browser reset
@@ -434,34 +606,8 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
                 
                 # Extract fleet information with robust error handling
                 try:
-                    fleet_name_match = re.search(r"Name:\s+(.*)", export_text)
-                    faction_match = re.search(r"Faction:\s+(.*)", export_text)
-                    commander_match = re.search(r"Commander:\s+(.*)", export_text)
-                    points_match = re.search(r"Total Points:\s+(\d+)", export_text)
-                    
-                    fleet_name = fleet_name_match.group(1) if fleet_name_match else ""
-                    faction = faction_match.group(1) if faction_match else ""
-                    commander = commander_match.group(1) if commander_match else ""
-                    points = int(points_match.group(1)) if points_match and points_match.group(1).isdigit() else 0
-                    
-                    # Validate points extraction - use 0 if extraction fails
-                    if not isinstance(points, int):
-                        points = 0
-                    
-                    # Check if total points is less than 375
-                    if points < 375:
-                        logger.info(f"Fleet {fleet_id} has only {points} points. Skipping...")
-                        return None
-                    
-                    # Return fleet data
-                    return {
-                        "fleet_data": export_text,
-                        "faction": faction,
-                        "fleet_name": fleet_name,
-                        "commander": commander,
-                        "points": points,
-                        "numerical_id": fleet_id
-                    }
+                    with trace.span("parse"):
+                        return parse_fleet_export(fleet_id, export_text, probe)
                 except Exception as e:
                     logger.error(f"Error extracting fleet information for {fleet_id}: {e}")
                     if attempt < max_retries - 1:
@@ -530,14 +676,373 @@ def extract_fleet_data(fleet_id, driver, max_retries=3):
     
     return None  # Return None if all retries failed
 
+# Locate the export view linked from a fleet page's export button
+def find_export_url(page_html, page_url, export_url_template=None, fleet_id=None):
+    """Return the absolute export URL for a fleet page, or None if the page does not expose one"""
+    match = re.search(r'<(?:a|button)[^>]*class="[^"]*\bexport\b[^"]*"[^>]*>', page_html)
+    if match:
+        tag = match.group(0)
+        link = re.search(r'(?:href|data-href|data-url)="([^"]+)"', tag)
+        if not link:
+            link = re.search(r"window\.open\(\s*['\"]([^'\"]+)['\"]", html.unescape(tag))
+        if link:
+            return urljoin(page_url, html.unescape(link.group(1)))
+    
+    if export_url_template and fleet_id is not None:
+        return urljoin(page_url, export_url_template.format(fleet_id=fleet_id))
+    
+    return None
+
+# Turn an export response into the same text Selenium reads from <body>
+def extract_export_text(response):
+    """Return the visible export text from a plain-text or HTML export response"""
+    content_type = response.headers.get("Content-Type", "")
+    text = response.text
+    if "html" not in content_type and not text.lstrip().startswith("<"):
+        return text.strip()
+    
+    pre_match = re.search(r"<pre[^>]*>(.*?)</pre>", text, re.S | re.I)
+    if pre_match:
+        text = pre_match.group(1)
+    else:
+        body_match = re.search(r"<body[^>]*>(.*?)</body>", text, re.S | re.I)
+        text = body_match.group(1) if body_match else text
+        text = re.sub(r"<(script|style)[^>]*>.*?</\1>", "", text, flags=re.S | re.I)
+        text = re.sub(r"<br\s*/?>|</(?:p|div|li|h[1-6])>", "\n", text, flags=re.I)
+    
+    text = html.unescape(re.sub(r"<[^>]+>", "", text))
+    lines = [line.strip() for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+# Token bucket shared by all worker processes, adapting its rate AIMD-style
+class SharedRateLimiter:
+    """Global requests/sec budget shared through multiprocessing state
+
+    Successful, fast responses add `increase` req/s to the rate; timeouts, connection
+    errors and responses slower than `slow_threshold` seconds multiply it by `decrease`
+    (at most once per `cooldown` seconds so one burst of failures counts once).
+    """
+    
+    def __init__(self, rate=8.0, min_rate=0.5, max_rate=40.0, burst=None, increase=0.05,
+                 decrease=0.5, slow_threshold=5.0, cooldown=5.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_threshold = slow_threshold
+        self.cooldown = cooldown
+        self._lock = Lock()
+        self._rate = Value('d', rate, lock=False)
+        self._tokens = Value('d', self.burst, lock=False)
+        self._updated = Value('d', time.time(), lock=False)
+        self._last_decrease = Value('d', 0.0, lock=False)
+    
+    @property
+    def rate(self):
+        return self._rate.value
+    
+    def try_acquire(self):
+        """Take a token if one is available; otherwise return the seconds to wait before retrying"""
+        with self._lock:
+            now = time.time()
+            elapsed = max(0.0, now - self._updated.value)
+            self._tokens.value = min(self.burst, self._tokens.value + elapsed * self._rate.value)
+            self._updated.value = now
+            if self._tokens.value >= 1.0:
+                self._tokens.value -= 1.0
+                return 0.0
+            return (1.0 - self._tokens.value) / self._rate.value
+    
+    def acquire(self):
+        """Block until a request token is available"""
+        wait = self.try_acquire()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.try_acquire()
+    
+    async def acquire_async(self):
+        """Wait for a request token without blocking the event loop"""
+        wait = self.try_acquire()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.try_acquire()
+    
+    def record(self, latency, ok=True):
+        """Feed a request outcome back into the rate"""
+        with self._lock:
+            now = time.time()
+            if not ok or latency > self.slow_threshold:
+                if now - self._last_decrease.value >= self.cooldown:
+                    self._rate.value = max(self.min_rate, self._rate.value * self.decrease)
+                    self._last_decrease.value = now
+                    logger.warning(f"Rate limiter backing off to {self._rate.value:.2f} req/s "
+                                   f"({'error' if not ok else f'slow response {latency:.1f}s'})")
+            else:
+                self._rate.value = min(self.max_rate, self._rate.value + self.increase)
+
+# Pool that keeps a pre-started spare browser ready for the next recycle
+class WarmDriverPool:
+    """Hand out WebDrivers from a spare started in the background, and quit old ones off-thread"""
+    
+    def __init__(self, warm_spare=True):
+        self.warm_spare = warm_spare
+        self._spare = None
+        self._builder = None
+        self._retiring = []
+        self._closed = False
+        self._lock = threading.Lock()
+    
+    def _build_spare(self):
+        try:
+            driver = setup_driver()
+        except Exception as e:
+            logger.warning(f"Failed to warm a spare WebDriver: {e}")
+            return
+        with self._lock:
+            if not self._closed:
+                self._spare, driver = driver, None
+        if driver is not None:
+            _quit_driver(driver)
+    
+    def _start_warming(self):
+        if not self.warm_spare or self._closed:
+            return
+        if self._builder is not None and self._builder.is_alive():
+            return
+        self._builder = threading.Thread(target=self._build_spare, name="warm-webdriver", daemon=True)
+        self._builder.start()
+    
+    def _take_spare(self):
+        with self._lock:
+            driver, self._spare = self._spare, None
+        if driver is None:
+            return None
+        try:
+            driver.current_url  # Make sure the spare session is still alive
+            return driver
+        except Exception:
+            _quit_driver(driver)
+            return None
+    
+    def get(self):
+        """Return a ready WebDriver, preferring the warm spare, and start warming the next one"""
+        driver = self._take_spare()
+        if driver is None and self._builder is not None and self._builder.is_alive():
+            # A spare is already starting; waiting for it beats launching a second Chrome
+            self._builder.join()
+            driver = self._take_spare()
+        if driver is None:
+            driver = setup_driver()
+        self._start_warming()
+        return driver
+    
+    def retire(self, driver):
+        """Quit a WebDriver in the background so the worker does not wait on it"""
+        self._retiring = [t for t in self._retiring if t.is_alive()]
+        thread = threading.Thread(target=_quit_driver, args=(driver,), name="retire-webdriver", daemon=True)
+        thread.start()
+        self._retiring.append(thread)
+    
+    def close(self):
+        """Quit the spare and wait for retiring browsers so no Chrome outlives the worker"""
+        self._closed = True
+        if self._builder is not None:
+            self._builder.join(timeout=60)
+        with self._lock:
+            spare, self._spare = self._spare, None
+        if spare is not None:
+            _quit_driver(spare)
+        for thread in self._retiring:
+            thread.join(timeout=30)
+        self._retiring = []
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error quitting WebDriver: {e}")
+
+# Fetch backends share one interface: open(), close(), recycle(), shutdown() and
+# fetch(fleet_id, probe=None), where
+# fetch returns the same values as extract_fleet_data (fleet dict, None, or {"needs_reset": True})
+# and fills in the probe outcome the same way
+class SeleniumFetchBackend:
+    """Fetch fleets by driving a headless Chrome session"""
+    name = "selenium"
+    
+    def __init__(self, base_url=BASE_URL, warm_spare=True, tracer=None):
+        self.base_url = base_url
+        self.pool = WarmDriverPool(warm_spare=warm_spare)
+        self.driver = None
+        self.tracer = tracer or NO_TRACER
+    
+    def open(self):
+        if self.driver is None:
+            self.driver = self.pool.get()
+    
+    def close(self):
+        driver, self.driver = self.driver, None
+        if driver is not None:
+            self.pool.retire(driver)
+    
+    def recycle(self):
+        """Swap in the warm spare browser and retire the current one in the background"""
+        self.close()
+        self.open()
+    
+    def shutdown(self):
+        self.close()
+        self.pool.close()
+    
+    def fetch(self, fleet_id, probe=None):
+        probe = probe if probe is not None else {}
+        self.open()
+        with self.tracer.fleet(fleet_id, probe) as trace:
+            return extract_fleet_data(fleet_id, self.driver, base_url=self.base_url, probe=probe, trace=trace)
+
+class HttpFetchBackend:
+    """Fetch fleet and export pages directly over a pooled requests.Session"""
+    name = "http"
+    
+    def __init__(self, base_url=BASE_URL, fallback=None, export_url_template=None,
+                 timeout=(5, 20), pool_size=4, tracer=None):
+        self.base_url = base_url
+        self.tracer = tracer or NO_TRACER
+        self.fallback = fallback
+        self.export_url_template = export_url_template
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+        self.fallback_count = 0
+        # One browser serves every thread that shares this backend (e.g. the density planner)
+        self._fallback_lock = threading.Lock()
+    
+    def open(self):
+        if self.session is not None:
+            return
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; ArmadaScraper)"})
+        self.session = session
+    
+    def close(self):
+        session, self.session = self.session, None
+        if session is not None:
+            session.close()
+        if self.fallback is not None:
+            self.fallback.close()
+    
+    def recycle(self):
+        self.close()
+        self.open()
+    
+    def shutdown(self):
+        self.close()
+        if self.fallback is not None:
+            self.fallback.shutdown()
+    
+    def _get(self, url, fleet_id):
+        """GET a URL, returning the response or a needs_reset marker on connection failures"""
+        try:
+            return self.session.get(url, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logger.warning(f"Connection error fetching {url} for fleet {fleet_id}: {e}")
+            return {"needs_reset": True}
+    
+    def _use_fallback(self, fleet_id, reason, probe):
+        if self.fallback is None:
+            logger.warning(f"HTTP backend cannot handle fleet {fleet_id} ({reason}) and no fallback is configured")
+            return None
+        logger.info(f"HTTP backend falling back to {self.fallback.name} for fleet {fleet_id}: {reason}")
+        with self._fallback_lock:
+            self.fallback_count += 1
+            return self.fallback.fetch(fleet_id, probe)
+    
+    def fetch(self, fleet_id, probe=None):
+        probe = probe if probe is not None else {}
+        self.open()
+        with self.tracer.fleet(fleet_id, probe) as trace:
+            return self._fetch(fleet_id, probe, trace)
+    
+    def _fetch(self, fleet_id, probe, trace):
+        fleet_url = f"{self.base_url}/fleet/{fleet_id}/"
+        
+        try:
+            with trace.span("http_page"):
+                response = self._get(fleet_url, fleet_id)
+            if isinstance(response, dict):
+                return response
+            
+            # Private and missing fleets redirect to the home page
+            if response.url.rstrip("/") == self.base_url.rstrip("/") or response.status_code == 404:
+                logger.info(f"Fleet {fleet_id} is private or doesn't exist. Skipping...")
+                probe["outcome"] = PRIVATE
+                return None
+            if response.status_code >= 400:
+                return self._use_fallback(fleet_id, f"fleet page returned HTTP {response.status_code}", probe)
+            
+            with trace.span("find_export"):
+                export_url = find_export_url(response.text, response.url, self.export_url_template, fleet_id)
+            if export_url is None:
+                return self._use_fallback(fleet_id, "no export link in fleet page", probe)
+            
+            with trace.span("http_export"):
+                export_response = self._get(export_url, fleet_id)
+            if isinstance(export_response, dict):
+                return export_response
+            if export_response.status_code >= 400:
+                return self._use_fallback(fleet_id, f"export page returned HTTP {export_response.status_code}", probe)
+            
+            with trace.span("read_text"):
+                export_text = extract_export_text(export_response)
+            if "Total Points:" not in export_text:
+                return self._use_fallback(fleet_id, "export page has no fleet text", probe)
+            
+            with trace.span("parse"):
+                return parse_fleet_export(fleet_id, export_text, probe)
+        except requests.RequestException as e:
+            logger.error(f"HTTP error processing fleet {fleet_id}: {e}")
+            return None
+
+# Build the fetch backend selected on the command line
+def create_backend(name, base_url=BASE_URL, selenium_fallback=True, export_url_template=None, tracer=None,
+                   pool_size=4):
+    """Create a fetch backend by name ('http' or 'selenium'), optionally recording stage spans"""
+    if name == "selenium":
+        return SeleniumFetchBackend(base_url=base_url, tracer=tracer)
+    if name == "http":
+        # The fallback is rarely used, so it does not keep a spare Chrome running
+        fallback = SeleniumFetchBackend(base_url=base_url, warm_spare=False, tracer=tracer) if selenium_fallback else None
+        return HttpFetchBackend(base_url=base_url, fallback=fallback, export_url_template=export_url_template,
+                                pool_size=pool_size, tracer=tracer)
+    raise ValueError(f"Unknown fetch backend: {name}")
+
 # Process range of fleet IDs with internet outage resilience
-def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
-    """Process a range of fleet IDs with periodic browser recycling and internet outage handling"""
-    logger.info(f"Worker {worker_id} starting to process range from {start_id} to {end_id}")
+def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30,
+                  backend_name="http", selenium_fallback=True, base_url=BASE_URL, export_url_template=None,
+                  rate_limiter=None, scheduler=None, ledger_file=None, probe_ttl_days=DEFAULT_MISS_TTL_DAYS,
+                  writer_queue=None, metrics=None, trace_file=None, trace_sample=1.0):
+    """Process a range of fleet IDs with periodic browser recycling and internet outage handling
+
+    Only the gaps the shard's scan journal has not recorded yet are visited, and every
+    finished ID is journaled in the same transaction as its insert, so a restarted worker
+    repeats no fetches. With a BlockScheduler the start/end arguments are ignored and the
+    worker keeps claiming ID blocks from the shared queue until none are left.
+    """
+    logger.info(f"Worker {worker_id} starting to process range from {start_id} to {end_id} "
+                f"using the {backend_name} backend")
     
     conn = None
     cursor = None
-    driver = None
+    backend = None
+    ledger = None
+    journal = None
+    tracer = None
     
     try:
         # Set up database connection
@@ -547,43 +1052,132 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
             logger.error(f"[Worker {worker_id}] Failed to set up database: {e}")
             return
         
-        # Initialize the WebDriver
+        # Open the probe ledger so known misses are not fetched again
+        if ledger_file:
+            try:
+                ledger = ProbeLedger(ledger_file, miss_ttl_days=probe_ttl_days).open()
+            except Exception as e:
+                logger.warning(f"[Worker {worker_id}] Probe ledger unavailable, probing every ID: {e}")
+                ledger = None
+        
+        # Per-stage spans feed the live metrics and, sampled, the JSONL trace file
+        if trace_file or metrics:
+            tracer = Tracer(trace_file, sample=trace_sample, worker_id=worker_id, metrics=metrics)
+        
+        # Initialize the fetch backend (HTTP session or WebDriver)
         try:
-            driver = setup_driver()
+            backend = create_backend(backend_name, base_url=base_url, selenium_fallback=selenium_fallback,
+                                     export_url_template=export_url_template, tracer=tracer)
+            backend.open()
         except Exception as e:
-            logger.error(f"[Worker {worker_id}] Failed to set up WebDriver: {e}")
+            logger.error(f"[Worker {worker_id}] Failed to set up {backend_name} backend: {e}")
             if conn:
                 conn.close()
             return
             
         processed_count = 0
         successful_count = 0
+        run_started = time.time()
+        fetched_count = 0
         consecutive_errors = 0
-        fleet_id = start_id
+        skipped_count = 0
+        fleet_id = gap_end = start_id
+        block = None
+        block_passes = {}
+        journal = ScanJournal()
+        # Runs of the current block handed to the writer, which may not have committed them yet
+        sent_runs = []
+        
+        # Record finished IDs that had no insert to ride along with (skips and misses)
+        def save_scanned():
+            if writer_queue is not None:
+                if journal.runs:
+                    runs = journal.take()
+                    sent_runs.extend(runs)
+                    writer_queue.put((db_file, None, runs))
+            else:
+                journal.flush(conn)
         
-        # Process fleet IDs until we reach the end
-        while fleet_id > end_id:
+        # Load every stored ID of the range once instead of querying per fleet
+        known_ids = load_known_ids(cursor, start_id, end_id)
+        logger.info(f"[Worker {worker_id}] Preloaded {len(known_ids)} stored fleet IDs for {start_id} to {end_id}")
+        
+        # Only the parts of the range the journal has not recorded are left to scan
+        gaps = [] if scheduler else remaining_gaps(conn, start_id, end_id)
+        if not scheduler:
+            logger.info(f"[Worker {worker_id}] {sum(gap[0] - gap[1] for gap in gaps)} IDs left "
+                        f"in {len(gaps)} gap(s) of {start_id} to {end_id}")
+        if metrics:
+            metrics.worker_started(worker_id, sum(gap[0] - gap[1] for gap in gaps))
+        
+        # Process fleet IDs until every gap is done (or the block queue runs out)
+        while True:
+            if fleet_id <= gap_end:
+                if not gaps and scheduler:
+                    if block:
+                        save_scanned()
+                        # IDs whose fetch errored are not journaled; the block is only done without them.
+                        # Above the low-water mark it was claimed at, another worker's shard has the progress.
+                        left = subtract_runs(remaining_gaps(conn, block[2], block[1]), sent_runs)
+                        if left:
+                            passes = block_passes[block[0]] = block_passes.get(block[0], 0) + 1
+                            park = passes >= MAX_BLOCK_PASSES
+                            scheduler.reopen(block, left[0][0], park=park)
+                            next_step = "leaving it for the next run" if park else "retrying it"
+                            logger.warning(f"[Worker {worker_id}] Block {block[0]} to {block[1]} has "
+                                           f"{sum(gap[0] - gap[1] for gap in left)} IDs with failed fetches; "
+                                           f"{next_step}")
+                        else:
+                            scheduler.complete(block)
+                    previous = block
+                    block = scheduler.claim(worker_id)
+                    if block is None:
+                        logger.info(f"[Worker {worker_id}] No pending ID blocks left")
+                        break
+                    if previous is None or previous[0] != block[0]:
+                        sent_runs.clear()
+                    # Resume at the block's low-water mark, minus whatever this shard already journaled
+                    gaps = subtract_runs(remaining_gaps(conn, block[2], block[1]), sent_runs)
+                    if metrics:
+                        metrics.worker_added(worker_id, sum(gap[0] - gap[1] for gap in gaps))
+                    logger.info(f"[Worker {worker_id}] Claimed block {block[0]} to {block[1]}"
+                                + (f", resuming at {block[2]}" if block[2] != block[0] else ""))
+                    continue
+                if not gaps:
+                    break
+                fleet_id, gap_end = gaps.pop(0)
+            
+            # Skip stored IDs and known misses before any network or browser work
+            if fleet_id in known_ids:
+                logger.debug(f"[Worker {worker_id}] Fleet {fleet_id} already in database. Skipping...")
+                journal.mark(fleet_id)
+                if metrics:
+                    metrics.skipped("stored")
+                    metrics.worker_advanced(worker_id)
+                fleet_id -= 1
+                skipped_count += 1
+                continue
+            if ledger and not ledger.should_probe(fleet_id):
+                logger.debug(f"[Worker {worker_id}] Fleet {fleet_id} was recently probed as private or under the points minimum. Skipping...")
+                journal.mark(fleet_id)
+                if metrics:
+                    metrics.skipped("ledger")
+                    metrics.worker_advanced(worker_id)
+                fleet_id -= 1
+                skipped_count += 1
+                continue
+            
             logger.info(f"[Worker {worker_id}] Processing fleet ID: {fleet_id}")
             
             # Check if we need a periodic browser reset
             if processed_count >= browser_reset_count:
                 logger.info(f"[Worker {worker_id}] Scheduled browser recycle after {browser_reset_count} operations")
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logger.warning(f"[Worker {worker_id}] Error during scheduled browser shutdown: {e}")
-                
-                # Allow some time for resources to be released
-                time.sleep(2)
                 
-                # Check internet before reinitializing
-                if not check_internet_connection():
-                    logger.warning(f"[Worker {worker_id}] No internet connection during scheduled reset. Waiting...")
-                    wait_for_internet()
-                
-                # Reinitialize the driver
+                # Swap in the warm spare; the old browser is quit in the background
+                if metrics:
+                    metrics.reset("scheduled")
                 try:
-                    driver = setup_driver()
+                    backend.recycle()
                     processed_count = 0
                     consecutive_errors = 0
                 except Exception as e:
@@ -594,7 +1188,7 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                         time.sleep(30)  # Wait longer between attempts
                         logger.info(f"[Worker {worker_id}] Retrying driver initialization...")
                         try:
-                            driver = setup_driver()
+                            backend.open()
                             processed_count = 0
                             consecutive_errors = 0
                             break
@@ -609,8 +1203,10 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
             # Check for too many consecutive errors - might indicate a persistent issue
             if consecutive_errors >= 5:
                 logger.warning(f"[Worker {worker_id}] Too many consecutive errors ({consecutive_errors}). Resetting browser...")
+                if metrics:
+                    metrics.reset("errors")
                 try:
-                    driver.quit()
+                    backend.close()
                 except:
                     pass
                 
@@ -620,13 +1216,13 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                     wait_for_internet()
                 
                 try:
-                    driver = setup_driver()
+                    backend.open()
                     consecutive_errors = 0
                 except Exception as e:
                     logger.error(f"[Worker {worker_id}] Failed to reinitialize driver after errors: {e}")
                     time.sleep(60)  # Wait longer for system to stabilize
                     try:
-                        driver = setup_driver()
+                        backend.open()
                         consecutive_errors = 0
                     except Exception as e:
                         logger.error(f"[Worker {worker_id}] Second attempt to reinitialize failed: {e}")
@@ -638,51 +1234,46 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                 if wait_for_internet():
                     logger.info(f"[Worker {worker_id}] Internet connection restored.")
                     # Reset the browser after a connection outage
+                    if metrics:
+                        metrics.reset("outage")
                     try:
-                        driver.quit()
+                        backend.close()
                     except:
                         pass
-                    driver = setup_driver()
+                    backend.open()
                 else:
                     logger.error(f"[Worker {worker_id}] Internet connection not restored after waiting. Exiting.")
                     break
             
-            # Check if already in database (with retry for database locks)
-            already_in_db = False
-            for db_attempt in range(3):
-                try:
-                    cursor.execute("SELECT numerical_id FROM fleets WHERE numerical_id = ?", (fleet_id,))
-                    if cursor.fetchone():
-                        logger.info(f"[Worker {worker_id}] Fleet {fleet_id} already in database. Skipping...")
-                        already_in_db = True
-                        consecutive_errors = 0  # Reset consecutive errors on success
-                        break
-                    break  # Successfully checked database
-                except sqlite3.OperationalError as e:
-                    if "database is locked" in str(e) and db_attempt < 2:
-                        logger.warning(f"[Worker {worker_id}] Database locked, retrying in 2s...")
-                        time.sleep(2)
-                    else:
-                        logger.error(f"[Worker {worker_id}] Database error checking fleet {fleet_id}: {e}")
-                        consecutive_errors += 1
-                        break
-            
-            if already_in_db:
-                fleet_id -= 1
-                processed_count += 1
-                continue
-            
-            # Extract fleet data with improved extraction function
+            # Extract fleet data with the configured fetch backend
             fleet_data = None
+            probe = {}
             try:
-                fleet_data = extract_fleet_data(fleet_id, driver)
+                fetched_count += 1
+                fetch_started = time.time()
+                if rate_limiter:
+                    rate_limiter.acquire()
+                    if metrics:
+                        metrics.observe("rate_wait", time.time() - fetch_started)
+                fetch_started = time.time()
+                fleet_data = backend.fetch(fleet_id, probe)
+                if metrics:
+                    metrics.observe("fetch", time.time() - fetch_started)
+                if rate_limiter:
+                    needs_reset = isinstance(fleet_data, dict) and fleet_data.get("needs_reset", False)
+                    rate_limiter.record(time.time() - fetch_started, ok=not needs_reset)
             except Exception as e:
                 logger.error(f"[Worker {worker_id}] Unhandled exception extracting fleet {fleet_id}: {e}")
                 consecutive_errors += 1
+                if rate_limiter:
+                    rate_limiter.record(time.time() - fetch_started, ok=False)
+                if metrics:
+                    metrics.observe("fetch", time.time() - fetch_started)
+                    metrics.reset("exception")
                 
                 # Check if we need to reset the browser after an exception
                 try:
-                    driver.quit()
+                    backend.close()
                 except:
                     pass
                 
@@ -692,20 +1283,22 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                     wait_for_internet()
                 
                 try:
-                    driver = setup_driver()
+                    backend.open()
                 except Exception as e:
                     logger.error(f"[Worker {worker_id}] Failed to reinitialize driver after exception: {e}")
                     time.sleep(30)
                     try:
-                        driver = setup_driver()
+                        backend.open()
                     except:
                         logger.error(f"[Worker {worker_id}] Second attempt to initialize driver failed. Will retry next fleet.")
             
             # Handle special case where we need to reset the browser
             if isinstance(fleet_data, dict) and fleet_data.get("needs_reset", False):
                 logger.info(f"[Worker {worker_id}] Browser reset requested for fleet {fleet_id}")
+                if metrics:
+                    metrics.reset("requested")
                 try:
-                    driver.quit()
+                    backend.close()
                 except:
                     pass
                 
@@ -715,25 +1308,45 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                     wait_for_internet()
                 
                 try:
-                    driver = setup_driver()
+                    backend.open()
                     # Retry the same fleet ID (don't decrement)
                     continue
                 except Exception as e:
                     logger.error(f"[Worker {worker_id}] Failed to reinitialize driver: {e}")
                     time.sleep(30)
                     try:
-                        driver = setup_driver()
+                        backend.open()
                         continue
                     except:
                         logger.error(f"[Worker {worker_id}] Second browser init attempt failed. Trying next fleet.")
+                        if metrics:
+                            metrics.fetched(ERROR)
+                            metrics.worker_advanced(worker_id)
                         fleet_id -= 1
                         consecutive_errors += 1
                         processed_count += 1
                         continue
             
-            if fleet_data:
+            if ledger:
+                ledger.record(fleet_id, probe.get("outcome", ERROR))
+            if metrics:
+                metrics.fetched(probe.get("outcome", ERROR))
+            
+            if fleet_data and writer_queue is not None:
+                # Hand the record to the single writer process, which batches the inserts and
+                # journals the finished IDs in the same transaction
+                journal.mark(fleet_id)
+                runs = journal.take()
+                sent_runs.extend(runs)
+                writer_queue.put((db_file, fleet_data, runs))
+                known_ids.add(fleet_id)
+                logger.info(f"[Worker {worker_id}] Queued fleet {fleet_id} for the database writer")
+                successful_count += 1
+                consecutive_errors = 0
+            elif fleet_data:
                 # Insert into database with retry for locked database
                 inserted = False
+                write_started = time.time()
                 for db_attempt in range(3):
                     try:
                         cursor.execute('''
@@ -748,8 +1361,13 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                             fleet_data["points"],
                             fleet_data["numerical_id"]
                         ))
+                        write_fleet_cards(conn, [(fleet_data["numerical_id"], fleet_data["fleet_data"])])
+                        journal.write(conn)
+                        record_scanned(conn, fleet_id, fleet_id)
                         
                         conn.commit()
+                        journal.clear()
+                        known_ids.add(fleet_id)
                         logger.info(f"[Worker {worker_id}] Added fleet {fleet_id} to database")
                         successful_count += 1
                         consecutive_errors = 0  # Reset consecutive errors on success
@@ -757,12 +1375,15 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                         break
                     except sqlite3.IntegrityError:
                         logger.info(f"[Worker {worker_id}] Fleet {fleet_id} already exists (integrity error). Skipping...")
+                        journal.mark(fleet_id)
                         consecutive_errors = 0  # Reset consecutive errors - this is a normal condition
                         inserted = True
                         break
                     except sqlite3.OperationalError as e:
                         if "database is locked" in str(e) and db_attempt < 2:
                             logger.warning(f"[Worker {worker_id}] Database locked during insert, retrying in 2s...")
+                            if metrics:
+                                metrics.lock_wait(2)
                             time.sleep(2)
                         else:
                             logger.error(f"[Worker {worker_id}] Database error inserting fleet {fleet_id}: {e}")
@@ -773,45 +1394,58 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                         consecutive_errors += 1
                         break
                 
+                if metrics:
+                    metrics.observe("db_write", time.time() - write_started)
+                
                 if not inserted:
                     # If we couldn't insert due to database errors, save to a backup file
                     try:
-                        backup_dir = os.path.join(os.path.dirname(db_file), "backup_data")
-                        os.makedirs(backup_dir, exist_ok=True)
-                        backup_file = os.path.join(backup_dir, f"fleet_{fleet_id}.txt")
-                        with open(backup_file, 'w', encoding='utf-8') as f:
-                            f.write(str(fleet_data))
+                        save_fleet_backup(db_file, fleet_data)
                         logger.info(f"[Worker {worker_id}] Saved fleet {fleet_id} to backup file due to database error")
                     except Exception as backup_e:
                         logger.error(f"[Worker {worker_id}] Failed to save backup: {backup_e}")
             else:
                 # If fleet_data is None, we couldn't extract data but there was no connection error
                 logger.info(f"[Worker {worker_id}] No data extracted for fleet {fleet_id}")
+                
+                # Private and under-minimum fleets are done; errors stay in the gap for the next run
+                if "outcome" in probe:
+                    journal.mark(fleet_id)
+                    try:
+                        save_scanned()
+                    except sqlite3.Error as e:
+                        logger.warning(f"[Worker {worker_id}] Failed to journal fleet {fleet_id}: {e}")
             
             # Increment our processed count and move to next fleet ID
+            if metrics:
+                metrics.worker_advanced(worker_id)
             processed_count += 1
             fleet_id -= 1
             
-            # Add a randomized delay to be respectful to the server and reduce blocking
-            sleep_time = 1.0 + (0.5 * (worker_id % 3))  # Stagger workers to reduce server load
-            time.sleep(sleep_time)
+            # Without a shared rate limiter, fall back to a fixed delay staggered per worker
+            if not rate_limiter:
+                sleep_time = 1.0 + (0.5 * (worker_id % 3))  # Stagger workers to reduce server load
+                time.sleep(sleep_time)
             
             # Periodically report progress
             if processed_count % 10 == 0:
-                completion_pct = ((start_id - fleet_id) / (start_id - end_id)) * 100 if start_id != end_id else 100
+                if scheduler:
+                    blocks_done, blocks_total = scheduler.progress()
+                    completion_pct = (blocks_done / blocks_total) * 100 if blocks_total else 100
+                else:
+                    completion_pct = ((start_id - fleet_id) / (start_id - end_id)) * 100 if start_id != end_id else 100
+                elapsed = time.time() - run_started
+                fetch_rate = fetched_count / elapsed if elapsed > 0 else 0
                 logger.info(f"[Worker {worker_id}] Progress: {completion_pct:.1f}% complete. " 
-                           f"Successful: {successful_count}/{processed_count}")
+                           f"Successful: {successful_count}/{processed_count}, skipped: {skipped_count}. "
+                           f"Rate: {fetch_rate:.2f} fleets/sec ({backend.name})")
                 
-                # Save progress checkpoint to file
+                # Move the block's low-water mark so another worker can pick it up from here
                 try:
-                    checkpoint_dir = os.path.join(os.path.dirname(db_file), "checkpoints")
-                    os.makedirs(checkpoint_dir, exist_ok=True)
-                    checkpoint_file = os.path.join(checkpoint_dir, f"worker_{worker_id}_checkpoint.txt")
-                    with open(checkpoint_file, 'w') as f:
-                        f.write(f"{fleet_id}")
-                    logger.info(f"[Worker {worker_id}] Saved checkpoint at fleet ID {fleet_id}")
+                    if scheduler and block:
+                        scheduler.advance(block, fleet_id)
                 except Exception as e:
-                    logger.warning(f"[Worker {worker_id}] Failed to save checkpoint: {e}")
+                    logger.warning(f"[Worker {worker_id}] Failed to save block low-water mark: {e}")
             
     except KeyboardInterrupt:
         logger.info(f"[Worker {worker_id}] Script interrupted by user")
@@ -828,21 +1462,20 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
         except:
             pass
             
-        # Save last processed ID to checkpoint for recovery
-        try:
-            checkpoint_dir = os.path.join(os.path.dirname(db_file), "checkpoints")
-            os.makedirs(checkpoint_dir, exist_ok=True)
-            checkpoint_file = os.path.join(checkpoint_dir, f"worker_{worker_id}_checkpoint.txt")
-            with open(checkpoint_file, 'w') as f:
-                f.write(f"{fleet_id}")
-            logger.info(f"[Worker {worker_id}] Saved emergency checkpoint at fleet ID {fleet_id}")
-        except:
-            pass
     finally:
-        # Ensure WebDriver is properly closed
-        if driver:
+        # Journal skipped IDs that are still pending and leave the block's low-water mark
+        if conn and journal is not None:
             try:
-                driver.quit()
+                save_scanned()
+                if scheduler and block:
+                    scheduler.advance(block, fleet_id)
+            except Exception as e:
+                logger.warning(f"[Worker {worker_id}] Failed to save scan progress: {e}")
+        
+        # Ensure WebDriver (and any warm spare) is properly closed
+        if backend:
+            try:
+                backend.shutdown()
             except:
                 pass
         
@@ -852,84 +1485,494 @@ def process_range(start_id, end_id, db_file, worker_id, browser_reset_count=30):
                 conn.close()
             except:
                 pass
+        
+        # Flush buffered probe outcomes
+        if ledger:
+            try:
+                ledger.close()
+            except Exception as e:
+                logger.warning(f"[Worker {worker_id}] Failed to flush probe ledger: {e}")
+        
+        if tracer:
+            tracer.close()
+        
+        # Hand any unfinished block back to the queue
+        if scheduler:
+            try:
+                scheduler.release_worker(worker_id)
+            except Exception as e:
+                logger.warning(f"[Worker {worker_id}] Failed to release claimed blocks: {e}")
             
         logger.info(f"[Worker {worker_id}] Processing completed for range {start_id} to {end_id}")
 
-# Merge multiple database files
-def merge_databases(source_files, destination_file, chunk_size=1000):
-    """Merge multiple database files into one with chunk processing for memory efficiency"""
-    # Create destination database
-    dest_conn, dest_cursor = setup_database(destination_file)
+# Save a fleet that could not be written to the database
+def save_fleet_backup(db_file, fleet_data):
+    """Write a fleet record to backup_data/fleet_N.txt next to its database"""
+    backup_dir = os.path.join(os.path.dirname(db_file), "backup_data")
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_file = os.path.join(backup_dir, f"fleet_{fleet_data['numerical_id']}.txt")
+    with open(backup_file, 'w', encoding='utf-8') as f:
+        f.write(str(fleet_data))
+
+# Single writer process: workers queue parsed fleets and one process owns all inserts
+def run_fleet_writer(writer_queue, batch_size=200, flush_interval=2.0, metrics=None):
+    """Insert queued (db_file, fleet_data, scanned runs) records in one transaction per database per batch
+
+    fleet_data may be None when a worker only reports scanned IDs. The runs are journaled
+    in the same transaction as the fleets, so a batch lost in a crash is scanned again.
+    A batch is written when `batch_size` records are pending or `flush_interval` seconds
+    have passed. The writer stops after draining the queue when it receives None.
+    """
+    # Ctrl+C is handled by the main process, which stops the writer once workers are done
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
     
-    try:
-        # Get total number of records for progress reporting
-        total_records = 0
-        for source_file in source_files:
-            if not os.path.exists(source_file):
-                logger.warning(f"Source file {source_file} doesn't exist. Skipping...")
-                continue
+    connections = {}
+    pending = {}
+    pending_runs = {}
+    pending_count = 0
+    written_count = 0
+    last_flush = time.time()
+    
+    def flush():
+        nonlocal pending, pending_runs, pending_count, written_count, last_flush
+        for db_file in set(pending) | set(pending_runs):
+            rows = pending.get(db_file, [])
+            if db_file not in connections:
+                connections[db_file] = setup_database(db_file)
+            conn, cursor = connections[db_file]
+            write_started = time.time()
+            for db_attempt in range(3):
+                try:
+                    with conn:
+                        if rows:
+                            cursor.executemany('''
+                            INSERT OR IGNORE INTO fleets 
+                            (fleet_data, faction, fleet_name, commander, points, numerical_id, shared)
+                            VALUES (?, ?, ?, ?, ?, ?, 1)
+                            ''', [(
+                                fleet_data["fleet_data"],
+                                fleet_data["faction"],
+                                fleet_data["fleet_name"],
+                                fleet_data["commander"],
+                                fleet_data["points"],
+                                fleet_data["numerical_id"]
+                            ) for fleet_data in rows])
+                            write_fleet_cards(conn, [(fleet_data["numerical_id"], fleet_data["fleet_data"]) for fleet_data in rows])
+                        for low, high in pending_runs.get(db_file, []):
+                            record_scanned(conn, low, high)
+                    written_count += len(rows)
+                    if metrics:
+                        metrics.observe("writer_batch", time.time() - write_started)
+                    break
+                except sqlite3.OperationalError as e:
+                    if "database is locked" in str(e) and db_attempt < 2:
+                        logger.warning(f"[Writer] Database {db_file} locked, retrying in 2s...")
+                        if metrics:
+                            metrics.lock_wait(2)
+                        time.sleep(2)
+                        continue
+                    logger.error(f"[Writer] Failed to write {len(rows)} fleets to {db_file}: {e}")
+                except Exception as e:
+                    logger.error(f"[Writer] Unexpected error writing {len(rows)} fleets to {db_file}: {e}")
                 
+                # Only a failed batch falls back to backup files
+                for fleet_data in rows:
+                    try:
+                        save_fleet_backup(db_file, fleet_data)
+                    except Exception as backup_e:
+                        logger.error(f"[Writer] Failed to save backup for fleet {fleet_data['numerical_id']}: {backup_e}")
+                break
+        if pending_count:
+            logger.info(f"[Writer] Committed {pending_count} fleets ({written_count} total)")
+        pending = {}
+        pending_runs = {}
+        pending_count = 0
+        last_flush = time.time()
+    
+    try:
+        while True:
+            timeout = max(0.05, flush_interval - (time.time() - last_flush))
+            try:
+                item = writer_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            
+            if item is None:
+                break
+            if item:
+                db_file, fleet_data, runs = item
+                if fleet_data:
+                    pending.setdefault(db_file, []).append(fleet_data)
+                    pending_count += 1
+                pending_runs.setdefault(db_file, []).extend(runs)
+            
+            waiting = pending_count or pending_runs
+            if pending_count >= batch_size or (waiting and time.time() - last_flush >= flush_interval):
+                flush()
+    finally:
+        flush()
+        for conn, _ in connections.values():
+            conn.close()
+        logger.info(f"[Writer] Stopped after writing {written_count} fleets")
+
+# Asynchronous engine: one process keeps many fleet IDs in flight per range
+async def process_range_async(start_id, end_id, db_file, worker_id, backend, executor, global_limit,
+                              concurrency=8, max_retries=3, rate_limiter=None, ledger=None, metrics=None):
+    """Process a range of fleet IDs with up to `concurrency` requests in flight, sharing a global cap
+
+    IDs finish out of order, so each one is journaled as it completes and a restart
+    fetches exactly the IDs that never did.
+    """
+    logger.info(f"[Worker {worker_id}] Async engine processing range {start_id} to {end_id} "
+                f"with {concurrency} requests in flight")
+    loop = asyncio.get_running_loop()
+    conn, cursor = setup_database(db_file)
+    known_ids = load_known_ids(cursor, start_id, end_id)
+    
+    gaps = remaining_gaps(conn, start_id, end_id)
+    total_left = sum(gap_start - gap_end for gap_start, gap_end in gaps)
+    logger.info(f"[Worker {worker_id}] {total_left} IDs left in {len(gaps)} gap(s)")
+    if metrics:
+        metrics.worker_started(worker_id, total_left)
+    ids = (fleet_id for gap_start, gap_end in gaps for fleet_id in range(gap_start, gap_end, -1))
+    journal = ScanJournal()
+    counts = {"processed": 0, "successful": 0}
+    run_started = time.time()
+    
+    async def fetch(fleet_id, probe):
+        for attempt in range(max_retries):
+            async with global_limit:
+                if rate_limiter:
+                    wait_started = time.time()
+                    await rate_limiter.acquire_async()
+                    if metrics:
+                        metrics.observe("rate_wait", time.time() - wait_started)
+                fetch_started = time.time()
+                fleet_data = await loop.run_in_executor(executor, backend.fetch, fleet_id, probe)
+            if metrics:
+                metrics.observe("fetch", time.time() - fetch_started)
+            needs_reset = isinstance(fleet_data, dict) and fleet_data.get("needs_reset", False)
+            if rate_limiter:
+                rate_limiter.record(time.time() - fetch_started, ok=not needs_reset)
+            if not needs_reset:
+                return fleet_data
+            
+            logger.warning(f"[Worker {worker_id}] Connection problem on fleet {fleet_id} "
+                           f"(attempt {attempt+1}/{max_retries})")
+            if metrics:
+                metrics.reset("requested")
+            if not await loop.run_in_executor(None, check_internet_connection):
+                await loop.run_in_executor(None, wait_for_internet)
+            await asyncio.sleep(2 * (attempt + 1))
+        return None
+    
+    async def run_slot():
+        for fleet_id in ids:
             try:
-                source_conn = sqlite3.connect(source_file)
-                source_cursor = source_conn.cursor()
-                source_cursor.execute("SELECT COUNT(*) FROM fleets")
-                count = source_cursor.fetchone()[0]
-                total_records += count
-                source_conn.close()
+                if fleet_id in known_ids:
+                    logger.debug(f"[Worker {worker_id}] Fleet {fleet_id} already in database. Skipping...")
+                    journal.mark(fleet_id)
+                    if metrics:
+                        metrics.skipped("stored")
+                    continue
+                if ledger and not ledger.should_probe(fleet_id):
+                    logger.debug(f"[Worker {worker_id}] Fleet {fleet_id} was recently probed as private or under the points minimum. Skipping...")
+                    journal.mark(fleet_id)
+                    if metrics:
+                        metrics.skipped("ledger")
+                    continue
+                
+                probe = {}
+                fleet_data = await fetch(fleet_id, probe)
+                if ledger:
+                    ledger.record(fleet_id, probe.get("outcome", ERROR))
+                if metrics:
+                    metrics.fetched(probe.get("outcome", ERROR))
+                if fleet_data:
+                    write_started = time.time()
+                    try:
+                        cursor.execute('''
+                        INSERT INTO fleets 
+                        (fleet_data, faction, fleet_name, commander, points, numerical_id, shared)
+                        VALUES (?, ?, ?, ?, ?, ?, 1)
+                        ''', (
+                            fleet_data["fleet_data"],
+                            fleet_data["faction"],
+                            fleet_data["fleet_name"],
+                            fleet_data["commander"],
+                            fleet_data["points"],
+                            fleet_data["numerical_id"]
+                        ))
+                        write_fleet_cards(conn, [(fleet_data["numerical_id"], fleet_data["fleet_data"])])
+                        journal.write(conn)
+                        record_scanned(conn, fleet_id, fleet_id)
+                        conn.commit()
+                        journal.clear()
+                        if metrics:
+                            metrics.observe("db_write", time.time() - write_started)
+                        known_ids.add(fleet_id)
+                        counts["successful"] += 1
+                        logger.info(f"[Worker {worker_id}] Added fleet {fleet_id} to database")
+                    except sqlite3.IntegrityError:
+                        logger.info(f"[Worker {worker_id}] Fleet {fleet_id} already exists (integrity error). Skipping...")
+                        journal.mark(fleet_id)
+                elif "outcome" in probe:
+                    # Private or under-minimum: done; errors stay unjournaled and are retried next run
+                    journal.mark(fleet_id)
+                    journal.flush(conn)
             except Exception as e:
-                logger.error(f"Error counting records in {source_file}: {e}")
+                logger.error(f"[Worker {worker_id}] Error processing fleet {fleet_id}: {e}")
+            finally:
+                counts["processed"] += 1
+                if metrics:
+                    metrics.worker_advanced(worker_id)
+            
+            if counts["processed"] % 10 == 0:
+                elapsed = time.time() - run_started
+                completion_pct = (counts["processed"] / total_left) * 100 if total_left else 100
+                logger.info(f"[Worker {worker_id}] Progress: {completion_pct:.1f}% complete. "
+                            f"Successful: {counts['successful']}/{counts['processed']}. "
+                            f"Rate: {counts['processed'] / elapsed if elapsed > 0 else 0:.2f} fleets/sec (async)")
+    
+    try:
+        await asyncio.gather(*(run_slot() for _ in range(concurrency)))
+    finally:
+        try:
+            journal.flush(conn)
+        except Exception as e:
+            logger.warning(f"[Worker {worker_id}] Failed to journal scanned IDs: {e}")
+        conn.close()
+        logger.info(f"[Worker {worker_id}] Processing completed for range {start_id} to {end_id}")
+
+async def run_async_engine(ranges, concurrency=8, max_in_flight=64, base_url=BASE_URL, export_url_template=None,
+                           rate_limiter=None, ledger_file=None, probe_ttl_days=DEFAULT_MISS_TTL_DAYS, metrics=None,
+                           trace_file=None, trace_sample=1.0):
+    """Run every worker range as coroutines in this process under one global concurrency cap"""
+    global_limit = asyncio.Semaphore(max_in_flight)
+    tracer = Tracer(trace_file, sample=trace_sample, metrics=metrics) if trace_file or metrics else None
+    backend = HttpFetchBackend(base_url=base_url, export_url_template=export_url_template, pool_size=max_in_flight,
+                               tracer=tracer)
+    backend.open()
+    ledger = ProbeLedger(ledger_file, miss_ttl_days=probe_ttl_days).open() if ledger_file else None
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="fetch") as executor:
+        try:
+            await asyncio.gather(*(
+                process_range_async(start, end, db, worker_id, backend, executor, global_limit, concurrency,
+                                    rate_limiter=rate_limiter, ledger=ledger, metrics=metrics)
+                for start, end, db, worker_id in ranges
+            ))
+        finally:
+            backend.shutdown()
+            if ledger:
+                ledger.close()
+            if tracer:
+                tracer.close()
+
+# Tail follower: track newly published fleets above the highest known ID
+class TailFollower:
+    """Find the current highest published fleet ID and keep ingesting new fleets as they appear
+
+    Private and missing IDs both redirect home, so "is anything published at x" is answered
+    by probing a window of consecutive IDs starting at x; under-minimum fleets count as
+    published. New fleets are often saved before they are finished, so under-minimum IDs
+    near the frontier are probed once more after `recheck_after` seconds.
+    """
+    
+    def __init__(self, backend, db_file, ledger=None, rate_limiter=None, window=20, recheck_after=6 * 3600):
+        self.backend = backend
+        self.db_file = db_file
+        self.ledger = ledger
+        self.rate_limiter = rate_limiter
+        self.window = window
+        self.recheck_after = recheck_after
+        self.outcomes = {}
+        self.rechecks = []
+        self.found_count = 0
+        self.conn = None
+        self.cursor = None
+    
+    def open(self):
+        self.conn, self.cursor = setup_database(self.db_file)
+        self.backend.open()
+    
+    def close(self):
+        try:
+            self.backend.shutdown()
+        finally:
+            if self.conn:
+                self.conn.close()
+    
+    def probe(self, fleet_id, use_cache=True, allow_recheck=True):
+        """Fetch one ID, store it if found, and return its outcome"""
+        if use_cache and fleet_id in self.outcomes:
+            return self.outcomes[fleet_id]
+        
+        for attempt in range(3):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            probe = {}
+            fetch_started = time.time()
+            fleet_data = self.backend.fetch(fleet_id, probe)
+            needs_reset = isinstance(fleet_data, dict) and fleet_data.get("needs_reset", False)
+            if self.rate_limiter:
+                self.rate_limiter.record(time.time() - fetch_started, ok=not needs_reset)
+            if not needs_reset:
+                break
+            logger.warning(f"[Follow] Connection problem on fleet {fleet_id}, recycling backend")
+            if not check_internet_connection():
+                wait_for_internet()
+            self.backend.recycle()
+        else:
+            fleet_data = None
+        
+        outcome = probe.get("outcome", ERROR)
+        self.outcomes[fleet_id] = outcome
+        if self.ledger:
+            self.ledger.record(fleet_id, outcome)
+        if fleet_data and not needs_reset:
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO fleets 
+            (fleet_data, faction, fleet_name, commander, points, numerical_id, shared)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+            ''', (
+                fleet_data["fleet_data"],
+                fleet_data["faction"],
+                fleet_data["fleet_name"],
+                fleet_data["commander"],
+                fleet_data["points"],
+                fleet_data["numerical_id"]
+            ))
+            write_fleet_cards(self.conn, [(fleet_data["numerical_id"], fleet_data["fleet_data"])])
+            self.conn.commit()
+            self.found_count += 1
+            logger.info(f"[Follow] Added new fleet {fleet_id} to database")
+        elif outcome == BELOW_THRESHOLD and allow_recheck and self.recheck_after:
+            self.rechecks.append((time.time() + self.recheck_after, fleet_id))
+        return outcome
+    
+    def highest_published_in_window(self, first_id):
+        """Return the highest published ID in [first_id, first_id + window), or None"""
+        highest = None
+        for fleet_id in range(first_id, first_id + self.window):
+            if self.probe(fleet_id) in (FOUND, BELOW_THRESHOLD):
+                highest = fleet_id
+        return highest
+    
+    def find_frontier(self, known_id):
+        """Exponential then binary search for the highest published ID above known_id"""
+        frontier = known_id
+        step = self.window
+        
+        # Gallop upwards until a whole window is empty
+        while True:
+            highest = self.highest_published_in_window(frontier + step)
+            if highest is None:
+                break
+            frontier = highest
+            step *= 2
+        low, high = frontier, frontier + step
+        logger.info(f"[Follow] Frontier is between {low} and {high}, narrowing down...")
         
-        logger.info(f"Merging {total_records} records from {len(source_files)} databases...")
+        # Binary search between the last published ID and the first empty window
+        while high - low > self.window:
+            mid = (low + high) // 2
+            highest = self.highest_published_in_window(mid)
+            if highest is None:
+                high = mid
+            else:
+                low = highest
         
-        # Process each source database
-        processed_records = 0
-        for idx, source_file in enumerate(source_files, 1):
-            if not os.path.exists(source_file):
+        # Anything published between low and high lies within one window of low
+        highest = self.highest_published_in_window(low + 1)
+        return highest if highest is not None else low
+    
+    def run_rechecks(self):
+        """Probe under-minimum fleets again once their recheck time has passed"""
+        now = time.time()
+        due = [fleet_id for due_at, fleet_id in self.rechecks if due_at <= now]
+        self.rechecks = [(due_at, fleet_id) for due_at, fleet_id in self.rechecks if due_at > now]
+        for fleet_id in due:
+            self.probe(fleet_id, use_cache=False, allow_recheck=False)
+    
+    def backfill(self, known_id, frontier):
+        """Probe every ID in known_id < id <= frontier once, reusing outcomes from the frontier search
+
+        The search only samples windows, so fleets published while nothing was following
+        would otherwise be skipped. Recent misses in the ledger are not probed again, and
+        failed fetches are retried with the first rechecks.
+        """
+        missed = 0
+        errors = 0
+        logger.info(f"[Follow] Backfilling {frontier - known_id} IDs above {known_id} up to the frontier...")
+        for fleet_id in range(known_id + 1, frontier + 1):
+            if fleet_id not in self.outcomes and self.ledger and not self.ledger.should_probe(fleet_id):
+                missed += 1
                 continue
-                
-            logger.info(f"Merging data from {source_file} ({idx}/{len(source_files)})...")
+            if self.probe(fleet_id) == ERROR:
+                self.rechecks.append((time.time(), fleet_id))
+                errors += 1
+        if self.ledger:
+            self.ledger.flush()
+        logger.info(f"[Follow] Backfill done: {self.found_count} new fleets, {missed} known misses skipped, "
+                    f"{errors} failed fetches to retry")
+    
+    def follow(self, known_id, interval=60):
+        """Ingest everything up to the frontier, then poll the window above it forever"""
+        frontier = self.find_frontier(known_id)
+        logger.info(f"[Follow] Highest published fleet ID is {frontier}")
+        self.backfill(known_id, frontier)
+        logger.info(f"[Follow] Following new fleets above {frontier}...")
+        self.outcomes.clear()
+        
+        while True:
+            highest = None
+            for fleet_id in range(frontier + 1, frontier + 1 + self.window):
+                if self.probe(fleet_id, use_cache=False) in (FOUND, BELOW_THRESHOLD):
+                    highest = fleet_id
+            self.run_rechecks()
+            if self.ledger:
+                self.ledger.flush()
             
-            try:
-                source_conn = sqlite3.connect(source_file)
-                source_cursor = source_conn.cursor()
-                
-                # Get column names
-                source_cursor.execute("PRAGMA table_info(fleets)")
-                columns = [column[1] for column in source_cursor.fetchall()]
-                columns_str = ", ".join(columns)
-                
-                # Process in chunks to avoid memory issues
-                source_cursor.execute("SELECT COUNT(*) FROM fleets")
-                total_in_file = source_cursor.fetchone()[0]
-                
-                for offset in range(0, total_in_file, chunk_size):
-                    source_cursor.execute(f"SELECT {columns_str} FROM fleets LIMIT {chunk_size} OFFSET {offset}")
-                    fleets_chunk = source_cursor.fetchall()
-                    
-                    if fleets_chunk:
-                        # Insert into destination
-                        placeholders = ", ".join(["?" for _ in range(len(columns))])
-                        
-                        for fleet in fleets_chunk:
-                            try:
-                                dest_cursor.execute(f"INSERT OR IGNORE INTO fleets ({columns_str}) VALUES ({placeholders})", fleet)
-                            except sqlite3.IntegrityError:
-                                # Skip duplicates
-                                pass
-                            
-                            processed_records += 1
-                            
-                        dest_conn.commit()
-                        
-                        # Report progress
-                        if offset % (chunk_size * 10) == 0:
-                            logger.info(f"Merged {processed_records}/{total_records} records ({processed_records/total_records*100:.1f}%)")
-                
-                source_conn.close()
-                
-            except Exception as e:
-                logger.error(f"Error processing {source_file}: {e}")
-                
+            if highest is not None:
+                frontier = highest
+                logger.info(f"[Follow] Frontier advanced to {frontier} ({self.found_count} new fleets so far)")
+                continue  # Fleets are often published in bursts, so look again right away
+            time.sleep(interval)
+
+# Highest fleet ID stored in any shard
+def get_highest_known_id(db_dir="databases"):
+    """Return MAX(numerical_id) across every armada_fleets_*.db shard in a directory"""
+    highest = None
+    if not os.path.isdir(db_dir):
+        return None
+    for name in sorted(os.listdir(db_dir)):
+        if name.startswith("armada_fleets_") and name.endswith(".db"):
+            shard_highest = get_highest_processed_id(os.path.join(db_dir, name))
+            if shard_highest is not None and (highest is None or shard_highest > highest):
+                highest = shard_highest
+    return highest
+
+# Merge multiple database files
+def merge_databases(source_files, destination_file, batch_size=5000, policy=None, dedup=False):
+    """Merge multiple database files into one with set-based, keyset-paginated copying
+
+    With a conflict policy the shards are combined with a deterministic k-way merge
+    instead, resolving duplicate fleets by that policy and reporting per-shard results.
+    With dedup, fleets repeating an earlier list (same fingerprint) are dropped afterwards.
+    """
+    # Create destination database
+    dest_conn, dest_cursor = setup_database(destination_file, BULK_MERGE)
+    
+    try:
+        logger.info(f"Merging {len(source_files)} databases into {destination_file}...")
+        if policy:
+            stats = kway_merge(dest_conn, source_files, policy=policy, batch_size=batch_size)
+        else:
+            stats = merge_shards(dest_conn, source_files, batch_size=batch_size)
+        index_fleets(dest_conn)
+        if dedup:
+            dedup_fleets(dest_conn)
+        processed_records = sum(source_stats["read"] for source_stats in stats.values())
         logger.info(f"Merged all databases into {destination_file}. Total records processed: {processed_records}")
         
     except Exception as e:
@@ -937,32 +1980,312 @@ def merge_databases(source_files, destination_file, chunk_size=1000):
     finally:
         dest_conn.close()
 
-# Check for and load saved checkpoint
-def load_checkpoint(db_file, worker_id, original_start):
-    """Load checkpoint for a worker to resume from previous run"""
-    checkpoint_dir = os.path.join(os.path.dirname(db_file), "checkpoints")
-    checkpoint_file = os.path.join(checkpoint_dir, f"worker_{worker_id}_checkpoint.txt")
+# Passes a worker makes over a block whose fetches keep failing before leaving it for the next run
+MAX_BLOCK_PASSES = 3
+
+# Shared queue of small ID blocks so idle workers take over remaining work
+class BlockScheduler:
+    """Hand out descending fleet ID blocks from a coordinator SQLite database
+
+    Each block is (start, end) with the same semantics as process_range: start is
+    processed, end is not. Blocks move pending -> claimed -> done, and claimed blocks
+    of a dead or stopped worker go back to pending so restarts resume per block. A
+    block that still has unscanned IDs (failed fetches) is reopened instead of done,
+    and parked as incomplete until the next run if they keep failing.
+    A block's low-water mark is the next ID its worker would have processed, so a
+    released block is picked up where it was left rather than from its start.
+    """
     
-    if os.path.exists(checkpoint_file):
+    def __init__(self, db_file, block_size=500):
+        self.db_file = db_file
+        self.block_size = block_size
+    
+    def _connect(self):
+        return connect(self.db_file, SCRAPE_WRITER, isolation_level=None)
+    
+    def initialize(self, start_id, end_id):
+        """Create the block queue for a range, keeping completed blocks from earlier runs"""
+        os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+        conn = self._connect()
         try:
-            with open(checkpoint_file, 'r') as f:
-                fleet_id = int(f.read().strip())
-                logger.info(f"[Worker {worker_id}] Loaded checkpoint at fleet ID {fleet_id}")
-                return fleet_id
-        except Exception as e:
-            logger.warning(f"[Worker {worker_id}] Error loading checkpoint: {e}")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS id_blocks (
+                block_start INTEGER PRIMARY KEY,
+                block_end INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id INTEGER,
+                claimed_at TIMESTAMP,
+                completed_at TIMESTAMP,
+                priority REAL NOT NULL DEFAULT 0,
+                low_water INTEGER
+            )
+            ''')
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(id_blocks)")]
+            if "priority" not in columns:
+                conn.execute("ALTER TABLE id_blocks ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+            if "low_water" not in columns:
+                conn.execute("ALTER TABLE id_blocks ADD COLUMN low_water INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_id_blocks_status ON id_blocks(status, block_start)")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO id_blocks (block_start, block_end) VALUES (?, ?)",
+                ((block_start, max(block_start - self.block_size, end_id))
+                 for block_start in range(start_id, end_id, -self.block_size))
+            )
+            # Claims left over from a previous run belong to workers that no longer exist; the
+            # worker ID stays so the same worker (and its shard's scan journal) gets the block back.
+            # Blocks parked with failed fetches get another try.
+            conn.execute("UPDATE id_blocks SET status = 'pending' WHERE status IN ('claimed', 'incomplete')")
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        
+        done, total = self.progress()
+        logger.info(f"Block scheduler ready: {total} blocks of {self.block_size} IDs, {done} already complete")
+    
+    def claim(self, worker_id):
+        """Claim a pending block as (start, end, low-water mark), or return None when the queue is empty
+
+        Blocks this worker released earlier come first, then the highest priority, then
+        the highest IDs.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT block_start, block_end, COALESCE(low_water, block_start) FROM id_blocks "
+                "WHERE status = 'pending' ORDER BY worker_id IS ? DESC, priority DESC, block_start DESC LIMIT 1",
+                (worker_id,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE id_blocks SET status = 'claimed', worker_id = ?, claimed_at = CURRENT_TIMESTAMP "
+                    "WHERE block_start = ?", (worker_id, row[0])
+                )
+            conn.execute("COMMIT")
+            return row
+        finally:
+            conn.close()
+    
+    def complete(self, block):
+        """Mark a claimed block as fully processed"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE id_blocks SET status = 'done', completed_at = CURRENT_TIMESTAMP WHERE block_start = ?",
+                (block[0],)
+            )
+        finally:
+            conn.close()
+    
+    def reopen(self, block, next_id, park=False):
+        """Put a claimed block with unscanned IDs back in the queue, resuming at next_id
+
+        A parked block is left as incomplete rather than pending, so this run does not
+        keep claiming it; the next initialize() makes it pending again.
+        """
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE id_blocks SET status = ?, low_water = ? WHERE block_start = ?",
+                ('incomplete' if park else 'pending', next_id, block[0])
+            )
+        finally:
+            conn.close()
+    
+    def apply_scanned(self, intervals, worker_id):
+        """Skip the parts of pending blocks a shard's scan journal already covers
+
+        Blocks covered from their low-water mark to their end are done; a block whose
+        top is covered resumes below it and goes to the shard's worker, which has the
+        journal. Returns the number of blocks changed.
+        """
+        changed = 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for low, high in intervals:
+                rows = conn.execute(
+                    "SELECT block_start, block_end, COALESCE(low_water, block_start) FROM id_blocks "
+                    "WHERE status = 'pending' AND block_start >= ? AND block_end < ?",
+                    (low, high)
+                ).fetchall()
+                for block_start, block_end, low_water in rows:
+                    if not low <= low_water <= high:
+                        continue
+                    if low <= block_end + 1:
+                        conn.execute(
+                            "UPDATE id_blocks SET status = 'done', completed_at = CURRENT_TIMESTAMP "
+                            "WHERE block_start = ?", (block_start,)
+                        )
+                    else:
+                        conn.execute("UPDATE id_blocks SET low_water = ?, worker_id = ? WHERE block_start = ?",
+                                     (low - 1, worker_id, block_start))
+                    changed += 1
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return changed
+    
+    def advance(self, block, next_id):
+        """Record the next ID to process in a claimed block"""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE id_blocks SET low_water = ? WHERE block_start = ?", (next_id, block[0]))
+        finally:
+            conn.close()
+    
+    def release_worker(self, worker_id):
+        """Return a worker's unfinished blocks to the queue (it is offered them first when it claims again)"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE id_blocks SET status = 'pending' WHERE status = 'claimed' AND worker_id = ?", (worker_id,)
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
+    def set_priority(self, region_start, region_end, priority):
+        """Set the claim priority of every block starting in end < block_start <= start"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE id_blocks SET priority = ? WHERE block_start <= ? AND block_start > ?",
+                (priority, region_start, region_end)
+            )
+        finally:
+            conn.close()
+    
+    def region_progress(self, region_start, region_end):
+        """Return (completed blocks, total blocks, priority) for blocks starting in a region"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COALESCE(SUM(status = 'done'), 0), COUNT(*), COALESCE(MAX(priority), 0) "
+                "FROM id_blocks WHERE block_start <= ? AND block_start > ?",
+                (region_start, region_end)
+            ).fetchone()
+        finally:
+            conn.close()
+    
+    def progress(self):
+        """Return (completed blocks, total blocks)"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COALESCE(SUM(status = 'done'), 0), COUNT(*) FROM id_blocks"
+            ).fetchone()
+        finally:
+            conn.close()
+
+# Split the ID space into fixed-size descending regions for density planning
+def iter_regions(start_id, end_id, region_size):
+    """Yield (region_start, region_end) pairs with process_range semantics"""
+    for region_start in range(start_id, end_id, -region_size):
+        yield region_start, max(region_start - region_size, end_id)
+
+# Estimate fleet hit density of a region from the probe ledger
+def estimate_density(ledger, region_start, region_end):
+    """Return (estimated hit rate, found, conclusive probes) with a Laplace prior for unsampled regions"""
+    counts = ledger.summary(region_start, region_end)
+    found = counts.get(FOUND, 0)
+    probed = found + counts.get(PRIVATE, 0) + counts.get(BELOW_THRESHOLD, 0)
+    return (found + 1) / (probed + 2), found, probed
+
+# Sample the ID space sparsely and prioritise the densest regions
+def plan_density(scheduler, ledger, backend, start_id, end_id, sample_db, region_size=5000,
+                 samples_per_region=20, concurrency=1, rate_limiter=None):
+    """Probe a few evenly spaced IDs per region, then set block priorities from the hit density"""
+    regions = list(iter_regions(start_id, end_id, region_size))
+    
+    # Pick evenly spaced IDs per region that the ledger has not seen yet
+    sample_ids = []
+    for region_start, region_end in regions:
+        _, _, probed = estimate_density(ledger, region_start, region_end)
+        wanted = samples_per_region - probed
+        if wanted <= 0:
+            continue
+        stride = max(1, (region_start - region_end) // wanted)
+        for fleet_id in range(region_start - stride // 2, region_end, -stride)[:wanted]:
+            if ledger.lookup(fleet_id) is None:
+                sample_ids.append(fleet_id)
+    
+    logger.info(f"Density planning: sampling {len(sample_ids)} IDs across {len(regions)} regions "
+                f"of {region_size} IDs")
+    
+    def sample(fleet_id):
+        if rate_limiter:
+            rate_limiter.acquire()
+        probe = {}
+        fetch_started = time.time()
+        fleet_data = backend.fetch(fleet_id, probe)
+        needs_reset = isinstance(fleet_data, dict) and fleet_data.get("needs_reset", False)
+        if rate_limiter:
+            rate_limiter.record(time.time() - fetch_started, ok=not needs_reset)
+        return fleet_id, (None if needs_reset else fleet_data), probe.get("outcome", ERROR)
+    
+    # Sampled hits are real fleets, so keep them in their own shard for the merge
+    conn, cursor = setup_database(sample_db)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sample") as executor:
+            for sampled, (fleet_id, fleet_data, outcome) in enumerate(executor.map(sample, sample_ids), 1):
+                ledger.record(fleet_id, outcome)
+                if fleet_data:
+                    cursor.execute('''
+                    INSERT OR IGNORE INTO fleets 
+                    (fleet_data, faction, fleet_name, commander, points, numerical_id, shared)
+                    VALUES (?, ?, ?, ?, ?, ?, 1)
+                    ''', (
+                        fleet_data["fleet_data"],
+                        fleet_data["faction"],
+                        fleet_data["fleet_name"],
+                        fleet_data["commander"],
+                        fleet_data["points"],
+                        fleet_data["numerical_id"]
+                    ))
+                    write_fleet_cards(conn, [(fleet_data["numerical_id"], fleet_data["fleet_data"])])
+                if sampled % 100 == 0:
+                    conn.commit()
+                    logger.info(f"Density planning: sampled {sampled}/{len(sample_ids)} IDs")
+        conn.commit()
+    finally:
+        conn.close()
+    ledger.flush()
+    
+    # Dense regions are claimed first
+    for region_start, region_end in regions:
+        density, _, _ = estimate_density(ledger, region_start, region_end)
+        scheduler.set_priority(region_start, region_end, density)
+    
+    report_coverage(scheduler, ledger, start_id, end_id, region_size)
+
+# Report per-region coverage and density
+def report_coverage(scheduler, ledger, start_id, end_id, region_size=5000):
+    """Log blocks done, fleets found and estimated hit density for every region"""
+    logger.info("--- Coverage by region (claimed in priority order) ---")
+    rows = []
+    for region_start, region_end in iter_regions(start_id, end_id, region_size):
+        blocks_done, blocks_total, priority = scheduler.region_progress(region_start, region_end)
+        density, found, probed = estimate_density(ledger, region_start, region_end)
+        rows.append((priority, region_start, region_end, blocks_done, blocks_total, found, probed, density))
     
-    # If no checkpoint or error, check database for highest processed ID
-    highest_id = get_highest_processed_id(db_file)
-    if highest_id:
-        return highest_id
+    for priority, region_start, region_end, blocks_done, blocks_total, found, probed, density in sorted(
+            rows, key=lambda row: (-row[0], -row[1])):
+        coverage_pct = (blocks_done / blocks_total) * 100 if blocks_total else 0
+        logger.info(f"  {region_start}-{region_end}: {coverage_pct:5.1f}% of blocks done "
+                    f"({blocks_done}/{blocks_total}), found {found}/{probed} probed, "
+                    f"est. density {density:.3f}")
     
-    # Fall back to original start ID
-    return original_start
+    total_found = sum(row[5] for row in rows)
+    blocks_done = sum(row[3] for row in rows)
+    blocks_total = sum(row[4] for row in rows)
+    logger.info(f"Overall: {blocks_done}/{blocks_total} blocks done, {total_found} fleets found")
 
 # Monitor process
-def monitor_worker_processes(processes, ranges, max_restart_attempts=3):
+def monitor_worker_processes(processes, ranges, max_restart_attempts=3, worker_kwargs=None):
     """Monitor worker processes and restart them if they die"""
+    worker_kwargs = worker_kwargs or {}
     restart_counts = {i+1: 0 for i in range(len(processes))}
     
     while any(p.is_alive() for p in processes):
@@ -975,11 +2298,16 @@ def monitor_worker_processes(processes, ranges, max_restart_attempts=3):
                 # Get the original range for this worker
                 start_id, end_id, db_file, _ = ranges[i]
                 
-                # Try to load checkpoint
-                start_id = load_checkpoint(db_file, worker_id, start_id)
+                # Put the dead worker's claimed blocks back in the queue; either way the restarted
+                # worker skips everything its shard's scan journal already covers
+                scheduler = worker_kwargs.get('scheduler')
+                if scheduler:
+                    released = scheduler.release_worker(worker_id)
+                    logger.info(f"Released {released} unfinished block(s) from worker {worker_id}")
                 
                 # Create a new process
-                new_process = Process(target=process_range, args=(start_id, end_id, db_file, worker_id))
+                new_process = Process(target=process_range, args=(start_id, end_id, db_file, worker_id),
+                                      kwargs=worker_kwargs)
                 new_process.start()
                 
                 # Replace the old process in our list
@@ -989,7 +2317,7 @@ def monitor_worker_processes(processes, ranges, max_restart_attempts=3):
                 restart_counts[worker_id] += 1
                 
                 # Log restart
-                logger.info(f"Worker {worker_id} restarted from fleet ID {start_id}")
+                logger.info(f"Worker {worker_id} restarted on range {start_id} to {end_id}")
                 
                 # Wait a moment between restarts
                 time.sleep(5)
@@ -1006,15 +2334,152 @@ def main():
     parser.add_argument('--end', type=int, default=200000, help='Ending fleet ID')
     parser.add_argument('--reset-count', type=int, default=30, help='Number of operations before browser reset')
     parser.add_argument('--merge', action='store_true', help='Merge databases after completion')
+    parser.add_argument('--merge-policy', choices=sorted(MERGE_POLICIES), default=None,
+                        help='Resolve duplicate fleets across shards with a deterministic k-way merge keeping the '
+                             'newest date_added, longest fleet_data or first shard (default: first copy, fastest)')
+    parser.add_argument('--dedup', action='store_true',
+                        help='After merging, drop fleets that repeat an earlier list (same ships, upgrades and squadrons)')
     parser.add_argument('--monitor', action='store_true', help='Enable worker monitoring and automatic restart')
+    parser.add_argument('--backend', choices=['http', 'selenium'], default='http',
+                        help='Fetch backend: plain HTTP requests or headless Chrome')
+    parser.add_argument('--no-selenium-fallback', action='store_true',
+                        help='Do not fall back to Selenium when the HTTP backend cannot read a fleet')
+    parser.add_argument('--base-url', default=BASE_URL, help='Base URL of the fleet site')
+    parser.add_argument('--connectivity-check', default=None, metavar='HOST[:PORT]', type=connectivity_check_arg,
+                        help=f'Address the internet check connects to (default {DEFAULT_CONNECTIVITY_CHECK}, '
+                             f'or ${CONNECTIVITY_CHECK_ENV}; port defaults to 53)')
+    parser.add_argument('--export-url-template', default=None,
+                        help='Export URL to use when a fleet page has no export link, e.g. /fleet/{fleet_id}/export/')
+    parser.add_argument('--engine', choices=['process', 'async'], default='process',
+                        help='Run one process per worker range, or all ranges as coroutines in one process')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Requests in flight per worker range (async engine)')
+    parser.add_argument('--max-in-flight', type=int, default=64,
+                        help='Global cap on requests in flight across all ranges (async engine)')
+    parser.add_argument('--rate', type=float, default=8.0,
+                        help='Initial requests/sec shared by all workers (adapts between --min-rate and --max-rate)')
+    parser.add_argument('--min-rate', type=float, default=0.5, help='Lowest requests/sec the limiter backs off to')
+    parser.add_argument('--max-rate', type=float, default=40.0, help='Highest requests/sec the limiter ramps up to')
+    parser.add_argument('--no-rate-limiter', action='store_true',
+                        help='Use the fixed per-worker delay instead of the shared adaptive rate limiter')
+    parser.add_argument('--block-size', type=int, default=500,
+                        help='Fleet IDs per block handed out by the work-stealing scheduler')
+    parser.add_argument('--static-ranges', action='store_true',
+                        help='Split the ID range into one fixed chunk per worker instead of scheduling blocks')
+    parser.add_argument('--probe-ledger', default='databases/probe_ledger.db',
+                        help='Database recording the outcome of every probed fleet ID')
+    parser.add_argument('--no-probe-ledger', action='store_true', help='Probe every ID without consulting the ledger')
+    parser.add_argument('--probe-ttl-days', type=float, default=DEFAULT_MISS_TTL_DAYS,
+                        help='Days before private or under-minimum IDs are probed again')
+    parser.add_argument('--plan', action='store_true',
+                        help='Sample the ID space first and schedule the densest regions before sparse ones')
+    parser.add_argument('--plan-samples', type=int, default=20, help='IDs sampled per region when planning')
+    parser.add_argument('--plan-concurrency', type=int, default=8,
+                        help='Parallel sample requests when planning with the http backend')
+    parser.add_argument('--region-size', type=int, default=5000, help='Fleet IDs per density region')
+    parser.add_argument('--coverage', action='store_true', help='Print coverage per region and exit')
+    parser.add_argument('--no-writer', action='store_true',
+                        help='Let each worker insert into its own database instead of using the single writer process')
+    parser.add_argument('--writer-batch', type=int, default=200, help='Fleets per writer transaction')
+    parser.add_argument('--writer-interval', type=float, default=2.0,
+                        help='Maximum seconds a queued fleet waits before the writer commits it')
+    parser.add_argument('--single-db', default=None,
+                        help='Write every worker\'s fleets into this one database instead of per-worker shards')
+    parser.add_argument('--follow', action='store_true',
+                        help='Find the newest published fleet and keep ingesting new fleets as they appear')
+    parser.add_argument('--follow-window', type=int, default=20,
+                        help='Consecutive IDs probed to decide whether anything is published at an ID')
+    parser.add_argument('--follow-interval', type=float, default=60, help='Seconds between frontier polls')
+    parser.add_argument('--follow-rate', type=float, default=1.0, help='Requests/sec budget for follow mode')
+    parser.add_argument('--follow-recheck-hours', type=float, default=6,
+                        help='Hours before an under-minimum fleet near the frontier is probed again')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve live metrics on this port (/metrics for Prometheus, /metrics.json); 0 picks a free port')
+    parser.add_argument('--metrics-host', default='127.0.0.1', help='Address the metrics endpoint listens on')
+    parser.add_argument('--trace-file', default=None,
+                        help='Append per-stage timing spans of fetched fleets to this JSONL file '
+                             '(summarize with fleet_trace.py summary)')
+    parser.add_argument('--trace-sample', type=float, default=1.0, help='Fraction of fleets written to --trace-file')
     args = parser.parse_args()
     
+    if args.engine == 'async' and args.backend != 'http':
+        parser.error("the async engine only supports the http backend")
+    if args.single_db and (args.static_ranges or args.engine != 'process'):
+        parser.error("--single-db needs the block scheduler (process engine without --static-ranges)")
+    if (args.plan or args.coverage) and (args.static_ranges or args.engine != 'process' or args.no_probe_ledger):
+        parser.error("--plan and --coverage need the block scheduler and the probe ledger")
+    
+    # Set in the environment so spawned workers check the same address
+    if args.connectivity_check:
+        os.environ[CONNECTIVITY_CHECK_ENV] = args.connectivity_check
+    
     max_workers = args.workers
     original_start_id = args.start
     end_id = args.end
     browser_reset_count = args.reset_count
     
-    logger.info(f"Starting Armada fleet scraper with {max_workers} workers")
+    rate_limiter = None
+    if not args.no_rate_limiter:
+        rate_limiter = SharedRateLimiter(rate=args.rate, min_rate=args.min_rate, max_rate=args.max_rate)
+    
+    worker_kwargs = {
+        'rate_limiter': rate_limiter,
+        'browser_reset_count': browser_reset_count,
+        'backend_name': args.backend,
+        'selenium_fallback': not args.no_selenium_fallback,
+        'base_url': args.base_url.rstrip('/'),
+        'export_url_template': args.export_url_template,
+        'ledger_file': None if args.no_probe_ledger else args.probe_ledger,
+        'probe_ttl_days': args.probe_ttl_days,
+        'trace_file': args.trace_file,
+        'trace_sample': args.trace_sample,
+    }
+    
+    # Shared counters every worker writes to; the endpoint is served from this process
+    metrics = None
+    if args.metrics_port is not None:
+        metrics = ScraperMetrics(workers=max_workers)
+        worker_kwargs['metrics'] = metrics
+    
+    # Follow mode runs a single low-rate poller instead of workers
+    if args.follow:
+        known_id = get_highest_known_id("databases") or original_start_id
+        logger.info(f"Follow mode: starting above fleet ID {known_id} ({args.backend} backend)")
+        os.makedirs('databases', exist_ok=True)
+        ledger = None if args.no_probe_ledger else ProbeLedger(args.probe_ledger, miss_ttl_days=args.probe_ttl_days).open()
+        tracer = Tracer(args.trace_file, sample=args.trace_sample) if args.trace_file else None
+        follower = TailFollower(
+            create_backend(args.backend, base_url=worker_kwargs['base_url'],
+                           selenium_fallback=not args.no_selenium_fallback,
+                           export_url_template=args.export_url_template, tracer=tracer),
+            FOLLOW_DB_FILE,
+            ledger=ledger,
+            rate_limiter=SharedRateLimiter(rate=args.follow_rate, min_rate=min(args.min_rate, args.follow_rate),
+                                           max_rate=args.follow_rate),
+            window=args.follow_window,
+            recheck_after=args.follow_recheck_hours * 3600,
+        )
+        try:
+            follower.open()
+            follower.follow(known_id, interval=args.follow_interval)
+        except KeyboardInterrupt:
+            logger.info(f"Follow mode stopped by user after {follower.found_count} new fleets")
+        finally:
+            follower.close()
+            if ledger:
+                ledger.close()
+            if tracer:
+                tracer.close()
+        return
+    
+    logger.info(f"Starting Armada fleet scraper with {max_workers} workers ({args.backend} backend)")
+    
+    # Resolve chromedriver once; workers inherit the path through the environment
+    if args.engine == 'process' and (args.backend == 'selenium' or not args.no_selenium_fallback):
+        try:
+            logger.info(f"Using chromedriver at {get_chromedriver_path()}")
+        except Exception as e:
+            logger.warning(f"Could not resolve chromedriver up front, workers will retry: {e}")
     logger.info(f"Fleet range: {original_start_id} to {end_id}")
     
     # Create directories for organization
@@ -1025,36 +2490,133 @@ def main():
     total_ids = original_start_id - end_id
     chunk_size = total_ids // max_workers
     
+    # Fold each old worker_N_checkpoint.txt into its shard's journal the first time it is seen; they
+    # were written with static ranges, so each one covers the top of that worker's static range
+    shard_files = [args.single_db or f"databases/armada_fleets_{i+1}.db" for i in range(max_workers)]
+    for i, db_file in enumerate(shard_files):
+        if os.path.exists(legacy_checkpoint_file(db_file, i+1)):
+            conn, _ = setup_database(db_file)
+            try:
+                import_legacy_checkpoint(conn, db_file, i+1, original_start_id - (i * chunk_size))
+            finally:
+                conn.close()
+    
+    # Workers claim blocks from a shared queue unless static ranges are requested
+    use_scheduler = not args.static_ranges and args.engine == 'process'
+    if use_scheduler:
+        scheduler = BlockScheduler("databases/checkpoints/id_blocks.db", block_size=args.block_size)
+        scheduler.initialize(original_start_id, end_id)
+        worker_kwargs['scheduler'] = scheduler
+        
+        # Blocks the shards' journals already cover (e.g. from imported checkpoints) need no new scan
+        covered = 0
+        for worker_id, db_file in enumerate(dict.fromkeys(shard_files), 1):
+            if not os.path.exists(db_file):
+                continue
+            conn = connect(db_file, ANALYSIS)
+            try:
+                if has_checkpoint_table(conn):
+                    covered += scheduler.apply_scanned(scanned_intervals(conn, original_start_id, end_id), worker_id)
+            finally:
+                conn.close()
+        if covered:
+            logger.info(f"Scan journals already cover all or the top of {covered} pending blocks")
+        
+        if args.plan or args.coverage:
+            with ProbeLedger(args.probe_ledger, miss_ttl_days=args.probe_ttl_days) as ledger:
+                if args.coverage:
+                    report_coverage(scheduler, ledger, original_start_id, end_id, args.region_size)
+                    return
+                
+                # Selenium drivers are not thread-safe, so only the http backend samples in parallel;
+                # it gets the workers' Selenium fallback for export views it cannot resolve
+                if args.backend == 'http':
+                    planner = create_backend('http', base_url=worker_kwargs['base_url'],
+                                             selenium_fallback=not args.no_selenium_fallback,
+                                             export_url_template=args.export_url_template,
+                                             pool_size=args.plan_concurrency)
+                    concurrency = args.plan_concurrency
+                else:
+                    planner = SeleniumFetchBackend(base_url=worker_kwargs['base_url'], warm_spare=False)
+                    concurrency = 1
+                try:
+                    planner.open()
+                    plan_density(scheduler, ledger, planner, original_start_id, end_id, SAMPLE_DB_FILE,
+                                 region_size=args.region_size, samples_per_region=args.plan_samples,
+                                 concurrency=concurrency, rate_limiter=rate_limiter)
+                finally:
+                    planner.shutdown()
+    
     # Create ranges for each worker
     ranges = []
     for i in range(max_workers):
-        db_file = f"databases/armada_fleets_{i+1}.db"
+        db_file = args.single_db or f"databases/armada_fleets_{i+1}.db"
         
-        # Try to load checkpoint first
-        checkpoint_start = load_checkpoint(db_file, i+1, None)
-        
-        # If no checkpoint, then check database or calculate start point
-        if checkpoint_start is None:
-            # Get the highest processed ID if the database exists
-            highest_id = get_highest_processed_id(db_file)
-            
-            if highest_id is not None:
-                start_id = highest_id
-                logger.info(f"Resuming worker {i+1} from database ID {start_id}")
-            else:
-                start_id = original_start_id - (i * chunk_size)
-                logger.info(f"Starting worker {i+1} with calculated ID {start_id}")
-        else:
-            start_id = checkpoint_start
-            logger.info(f"Resuming worker {i+1} from checkpoint ID {start_id}")
+        # Scheduled workers only need their database; their IDs come from the block queue
+        if use_scheduler:
+            ranges.append((original_start_id, end_id, db_file, i+1))
+            continue
         
+        # Workers always get their whole range; the shard's scan journal says what is left
+        start_id = original_start_id - (i * chunk_size)
         end_id_for_worker = max(original_start_id - ((i + 1) * chunk_size), end_id)
+        
+        conn, _ = setup_database(db_file)
+        try:
+            gaps = remaining_gaps(conn, start_id, end_id_for_worker)
+        finally:
+            conn.close()
+        left = sum(gap_start - gap_end for gap_start, gap_end in gaps)
+        logger.info(f"Worker {i+1}: range {start_id} to {end_id_for_worker}, {left} IDs left in {len(gaps)} gap(s)")
         ranges.append((start_id, end_id_for_worker, db_file, i+1))
     
+    # The async engine runs every range from this process and skips the process monitor
+    if args.engine == 'async':
+        logger.info(f"Running async engine: {args.concurrency} per range, {args.max_in_flight} in flight overall")
+        metrics_server = None
+        if metrics:
+            metrics_server = MetricsServer(metrics, host=args.metrics_host, port=args.metrics_port,
+                                           rate_limiter=rate_limiter).start()
+        try:
+            asyncio.run(run_async_engine(ranges, concurrency=args.concurrency, max_in_flight=args.max_in_flight,
+                                         base_url=worker_kwargs['base_url'],
+                                         export_url_template=args.export_url_template,
+                                         rate_limiter=rate_limiter,
+                                         ledger_file=worker_kwargs['ledger_file'],
+                                         probe_ttl_days=args.probe_ttl_days,
+                                         metrics=metrics, trace_file=args.trace_file,
+                                         trace_sample=args.trace_sample))
+        except KeyboardInterrupt:
+            logger.info("Async engine interrupted by user")
+        finally:
+            if metrics_server:
+                metrics_server.stop()
+        if args.merge:
+            logger.info("Merging databases as requested...")
+            merge_databases([r[2] for r in ranges], "armada_fleets_merged.db", policy=args.merge_policy,
+                            dedup=args.dedup)
+        return
+    
+    # Start the single writer process that owns all fleet inserts
+    writer_process = None
+    if not args.no_writer:
+        writer_queue = Queue(maxsize=10000)
+        writer_process = Process(target=run_fleet_writer, args=(writer_queue,),
+                                 kwargs={'batch_size': args.writer_batch, 'flush_interval': args.writer_interval,
+                                         'metrics': metrics})
+        writer_process.start()
+        worker_kwargs['writer_queue'] = writer_queue
+    
+    metrics_server = None
+    if metrics:
+        metrics_server = MetricsServer(metrics, host=args.metrics_host, port=args.metrics_port,
+                                       writer_queue=worker_kwargs.get('writer_queue'),
+                                       scheduler=worker_kwargs.get('scheduler'), rate_limiter=rate_limiter).start()
+    
     # Process ranges in parallel using separate processes for isolation
     processes = []
     for start, end, db, worker_id in ranges:
-        p = Process(target=process_range, args=(start, end, db, worker_id, browser_reset_count))
+        p = Process(target=process_range, args=(start, end, db, worker_id), kwargs=worker_kwargs)
         processes.append(p)
         p.start()
         # Stagger process starts to avoid overwhelming system resources
@@ -1063,7 +2625,8 @@ def main():
     # Monitor processes and restart them if they die
     if args.monitor:
         logger.info("Starting worker process monitor...")
-        monitor_process = Process(target=monitor_worker_processes, args=(processes, ranges))
+        monitor_process = Process(target=monitor_worker_processes, args=(processes, ranges),
+                                  kwargs={'worker_kwargs': worker_kwargs})
         monitor_process.start()
     
     try:
@@ -1089,11 +2652,21 @@ def main():
     
     logger.info("All workers have completed their tasks")
     
+    # Let the writer drain whatever the workers queued
+    if writer_process:
+        worker_kwargs['writer_queue'].put(None)
+        writer_process.join()
+    if metrics_server:
+        metrics_server.stop()
+    
     # Merge databases if requested
     if args.merge:
         logger.info("Merging databases as requested...")
-        source_files = [r[2] for r in ranges]
-        merge_databases(source_files, "armada_fleets_merged.db")
+        source_files = list(dict.fromkeys(r[2] for r in ranges))
+        for extra_file in (SAMPLE_DB_FILE, FOLLOW_DB_FILE):
+            if os.path.exists(extra_file):
+                source_files.append(extra_file)
+        merge_databases(source_files, "armada_fleets_merged.db", policy=args.merge_policy, dedup=args.dedup)
     else:
         logger.info("To merge all databases later, run: python script_name.py --merge")
 
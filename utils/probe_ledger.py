@@ -0,0 +1,130 @@
+import os
+import time
+import sqlite3
+import logging
+from fleet_db import connect, SCRAPE_WRITER
+
+logger = logging.getLogger("ProbeLedger")
+
+# Probe outcomes, stored as small integer codes
+FOUND = "found"
+PRIVATE = "private"
+BELOW_THRESHOLD = "below_threshold"
+ERROR = "error"
+
+OUTCOME_CODES = {FOUND: 1, PRIVATE: 2, BELOW_THRESHOLD: 3, ERROR: 4}
+OUTCOME_NAMES = {code: name for name, code in OUTCOME_CODES.items()}
+
+# Outcomes that are skipped until the miss TTL runs out (found and errored IDs are always retried)
+MISS_OUTCOMES = (OUTCOME_CODES[PRIVATE], OUTCOME_CODES[BELOW_THRESHOLD])
+
+DEFAULT_MISS_TTL_DAYS = 30
+
+class ProbeLedger:
+    """Record the outcome of every probed fleet ID so reruns skip known misses
+
+    One row per ID in a WITHOUT ROWID table (id, outcome code, epoch seconds) keeps
+    the full ~360k ID space to a few MB. Writes are buffered and flushed every
+    `flush_every` records, so a crash only costs re-probing the last few IDs.
+    """
+
+    def __init__(self, db_file, miss_ttl_days=DEFAULT_MISS_TTL_DAYS, flush_every=50):
+        self.db_file = db_file
+        self.miss_ttl = miss_ttl_days * 86400 if miss_ttl_days is not None else None
+        self.flush_every = flush_every
+        self.conn = None
+        self.pending = []
+
+    def open(self):
+        if self.conn is not None:
+            return self
+        os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+        self.conn = connect(self.db_file, SCRAPE_WRITER)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS probes (
+            numerical_id INTEGER PRIMARY KEY,
+            outcome INTEGER NOT NULL,
+            probed_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+        return self
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, fleet_id):
+        """Return (outcome, probed_at) for an ID, or None if it was never probed"""
+        row = self.conn.execute(
+            "SELECT outcome, probed_at FROM probes WHERE numerical_id = ?", (fleet_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return OUTCOME_NAMES.get(row[0], ERROR), row[1]
+
+    def should_probe(self, fleet_id):
+        """Return False if the ID was missed within the TTL
+
+        FOUND never skips a probe: the outcome is recorded when the fetch returns,
+        before the fleet is committed, so only the fleets database can say it is
+        stored. Callers check that first.
+        """
+        row = self.conn.execute(
+            "SELECT outcome, probed_at FROM probes WHERE numerical_id = ?", (fleet_id,)
+        ).fetchone()
+        if row is None:
+            return True
+        outcome, probed_at = row
+        if outcome in MISS_OUTCOMES:
+            return self.miss_ttl is not None and time.time() - probed_at >= self.miss_ttl
+        return True
+
+    def record(self, fleet_id, outcome):
+        """Buffer the outcome of a probe"""
+        self.pending.append((fleet_id, OUTCOME_CODES[outcome], int(time.time())))
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered outcomes in one transaction"""
+        if not self.pending:
+            return
+        for attempt in range(3):
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO probes (numerical_id, outcome, probed_at) VALUES (?, ?, ?)",
+                        self.pending
+                    )
+                self.pending = []
+                return
+            except sqlite3.OperationalError as e:
+                if "database is locked" in str(e) and attempt < 2:
+                    logger.warning("Probe ledger locked, retrying in 2s...")
+                    time.sleep(2)
+                else:
+                    logger.error(f"Failed to write {len(self.pending)} probe outcomes: {e}")
+                    return
+
+    def summary(self, start_id=None, end_id=None):
+        """Return {outcome: count}, optionally limited to end_id < numerical_id <= start_id"""
+        self.flush()
+        query = "SELECT outcome, COUNT(*) FROM probes"
+        params = ()
+        if start_id is not None and end_id is not None:
+            query += " WHERE numerical_id <= ? AND numerical_id > ?"
+            params = (start_id, end_id)
+        rows = self.conn.execute(query + " GROUP BY outcome", params).fetchall()
+        return {OUTCOME_NAMES.get(code, ERROR): count for code, count in rows}
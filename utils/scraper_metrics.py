@@ -0,0 +1,386 @@
+import sys
+import json
+import time
+import bisect
+import logging
+import argparse
+import threading
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Array, Lock
+from fleet_trace import FETCH_STAGES
+
+logger = logging.getLogger("ScraperMetrics")
+
+PREFIX = "armada_scraper"
+
+# Probe outcomes as recorded in the probe ledger
+OUTCOMES = ("found", "private", "below_threshold", "error")
+
+# IDs skipped without a fetch: already stored, or a recent miss in the probe ledger
+SKIP_REASONS = ("stored", "ledger")
+
+# Why a worker's browser (or HTTP session) was recycled
+RESET_CAUSES = ("scheduled", "errors", "outage", "exception", "requested")
+
+# Timed stages of a fleet, including the page steps recorded by fleet_trace; each gets a latency histogram
+STAGES = ("rate_wait", "fetch", "db_write", "writer_batch") + FETCH_STAGES
+
+# Histogram upper bounds in seconds (one more bucket counts everything above the last)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Window for the recent fetch and ID rates
+RATE_WINDOW = 60.0
+
+class ScraperMetrics:
+    """Counters, per-stage latency histograms and per-worker progress in shared memory
+
+    All values live in one multiprocessing Array of doubles with a fixed layout, so a
+    single instance can be handed to every worker process (like SharedRateLimiter) and
+    read by the metrics server in the main process. Worker IDs above `workers` are not
+    tracked per worker.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        keys = [("fetches",), ("lock_waits",), ("lock_wait_seconds",)]
+        keys += [("outcome", outcome) for outcome in OUTCOMES]
+        keys += [("skipped", reason) for reason in SKIP_REASONS]
+        keys += [("reset", cause) for cause in RESET_CAUSES]
+        for stage in STAGES:
+            keys += [("stage_count", stage), ("stage_sum", stage)]
+            keys += [("stage_bucket", stage, i) for i in range(len(BUCKETS) + 1)]
+        for worker_id in range(1, workers + 1):
+            keys += [("worker_done", worker_id), ("worker_left", worker_id), ("worker_started", worker_id)]
+        self._index = {key: i for i, key in enumerate(keys)}
+        self._lock = Lock()
+        self._values = Array('d', len(keys), lock=False)
+        self.started = time.time()
+
+    def _add(self, key, amount):
+        slot = self._index.get(key)
+        if slot is not None:
+            with self._lock:
+                self._values[slot] += amount
+
+    def fetched(self, outcome):
+        """Count a fetch and its probe outcome"""
+        with self._lock:
+            self._values[self._index[("fetches",)]] += 1
+            self._values[self._index[("outcome", outcome if outcome in OUTCOMES else "error")]] += 1
+
+    def skipped(self, reason):
+        self._add(("skipped", reason), 1)
+
+    def reset(self, cause):
+        """Count a browser or session reset"""
+        self._add(("reset", cause), 1)
+
+    def lock_wait(self, seconds):
+        """Count a retry after 'database is locked' and the time spent waiting"""
+        with self._lock:
+            self._values[self._index[("lock_waits",)]] += 1
+            self._values[self._index[("lock_wait_seconds",)]] += seconds
+
+    def observe(self, stage, seconds):
+        """Add one duration to a stage's histogram"""
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self._values[self._index[("stage_count", stage)]] += 1
+            self._values[self._index[("stage_sum", stage)]] += seconds
+            self._values[self._index[("stage_bucket", stage, bucket)]] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one observation of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def worker_started(self, worker_id, ids_left):
+        """Start a worker's progress clock with the IDs it has left to scan"""
+        with self._lock:
+            if ("worker_left", worker_id) in self._index:
+                self._values[self._index[("worker_left", worker_id)]] = ids_left
+                self._values[self._index[("worker_done", worker_id)]] = 0
+                self._values[self._index[("worker_started", worker_id)]] = time.time()
+
+    def worker_added(self, worker_id, ids):
+        """Add IDs to a worker's remaining work (a newly claimed block)"""
+        self._add(("worker_left", worker_id), ids)
+
+    def worker_advanced(self, worker_id, ids=1):
+        """Move a worker past IDs it finished or skipped"""
+        with self._lock:
+            if ("worker_left", worker_id) in self._index:
+                self._values[self._index[("worker_done", worker_id)]] += ids
+                slot = self._index[("worker_left", worker_id)]
+                self._values[slot] = max(0.0, self._values[slot] - ids)
+
+    def snapshot(self):
+        """Return a consistent copy of every value as a nested dict"""
+        with self._lock:
+            values = list(self._values)
+        get = lambda *key: values[self._index[key]]
+        stages = {}
+        for stage in STAGES:
+            stages[stage] = {
+                "count": int(get("stage_count", stage)),
+                "sum": get("stage_sum", stage),
+                "buckets": [int(get("stage_bucket", stage, i)) for i in range(len(BUCKETS) + 1)],
+            }
+        workers = {}
+        for worker_id in range(1, self.workers + 1):
+            workers[worker_id] = {
+                "done": int(get("worker_done", worker_id)),
+                "left": int(get("worker_left", worker_id)),
+                "started": get("worker_started", worker_id),
+            }
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "fetches": int(get("fetches")),
+            "outcomes": {outcome: int(get("outcome", outcome)) for outcome in OUTCOMES},
+            "skipped": {reason: int(get("skipped", reason)) for reason in SKIP_REASONS},
+            "resets": {cause: int(get("reset", cause)) for cause in RESET_CAUSES},
+            "lock_waits": int(get("lock_waits")),
+            "lock_wait_seconds": get("lock_wait_seconds"),
+            "stages": stages,
+            "workers": workers,
+        }
+
+def histogram_quantile(buckets, q):
+    """Estimate a quantile from bucket counts by linear interpolation inside the bucket"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            if i >= len(BUCKETS):
+                return BUCKETS[-1]
+            low = BUCKETS[i - 1] if i else 0.0
+            return low + (BUCKETS[i] - low) * (rank - seen) / count
+        seen += count
+    return BUCKETS[-1]
+
+class MetricsServer:
+    """Serve ScraperMetrics on /metrics (Prometheus text) and /metrics.json from a background thread
+
+    Gauges that only the main process can see (writer queue depth, scheduler blocks,
+    the shared rate) are read at request time. Recent rates come from snapshots kept
+    for RATE_WINDOW seconds.
+    """
+
+    def __init__(self, metrics, host="127.0.0.1", port=9108, writer_queue=None, scheduler=None,
+                 rate_limiter=None):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.writer_queue = writer_queue
+        self.scheduler = scheduler
+        self.rate_limiter = rate_limiter
+        self.httpd = None
+        self.samples = deque()
+        self._samples_lock = threading.Lock()
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body, content_type = render_prometheus(server.report()), "text/plain; version=0.0.4"
+                elif path == "/metrics.json":
+                    body, content_type = json.dumps(server.report(), indent=2), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Metrics at http://{self.host}:{self.httpd.server_address[1]}/metrics (and /metrics.json)")
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def _recent_rates(self, snapshot):
+        """Return (fetches/sec, IDs/sec) over the last RATE_WINDOW seconds, or since start"""
+        ids_done = sum(worker["done"] for worker in snapshot["workers"].values())
+        now = snapshot["time"]
+        with self._samples_lock:
+            self.samples.append((now, snapshot["fetches"], ids_done))
+            while len(self.samples) > 1 and now - self.samples[1][0] >= RATE_WINDOW:
+                self.samples.popleft()
+            then, fetches_then, ids_then = self.samples[0]
+        if now - then >= 1.0:
+            elapsed = now - then
+            return (snapshot["fetches"] - fetches_then) / elapsed, (ids_done - ids_then) / elapsed
+        elapsed = snapshot["uptime"]
+        return (snapshot["fetches"] / elapsed, ids_done / elapsed) if elapsed > 0 else (0.0, 0.0)
+
+    def report(self):
+        """Snapshot plus derived rates, hit rates, quantiles, queue depths and ETAs"""
+        snapshot = self.metrics.snapshot()
+        fetch_rate, id_rate = self._recent_rates(snapshot)
+        snapshot["fetches_per_sec"] = fetch_rate
+        snapshot["ids_per_sec"] = id_rate
+        fetches = snapshot["fetches"]
+        snapshot["hit_rate"] = {outcome: count / fetches if fetches else 0.0
+                                for outcome, count in snapshot["outcomes"].items()}
+        for stage in snapshot["stages"].values():
+            stage["p50"] = histogram_quantile(stage["buckets"], 0.5)
+            stage["p95"] = histogram_quantile(stage["buckets"], 0.95)
+            stage["p99"] = histogram_quantile(stage["buckets"], 0.99)
+
+        for worker in snapshot["workers"].values():
+            elapsed = snapshot["time"] - worker["started"] if worker["started"] else 0
+            rate = worker["done"] / elapsed if elapsed > 0 else 0
+            worker["ids_per_sec"] = rate
+            worker["eta_seconds"] = worker["left"] / rate if rate > 0 else None
+
+        queues = {}
+        if self.writer_queue is not None:
+            try:
+                queues["writer"] = self.writer_queue.qsize()
+            except NotImplementedError:
+                pass
+        snapshot["queues"] = queues
+
+        if self.scheduler is not None:
+            try:
+                done, total = self.scheduler.progress()
+                ids_left = (total - done) * self.scheduler.block_size
+                snapshot["blocks"] = {"done": done, "total": total,
+                                      "eta_seconds": ids_left / id_rate if id_rate > 0 else None}
+            except Exception as e:
+                logger.debug(f"Block progress unavailable: {e}")
+        if self.rate_limiter is not None:
+            snapshot["rate_limit"] = self.rate_limiter.rate
+        return snapshot
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}" if labels else ""
+
+def render_prometheus(report):
+    """Format a MetricsServer report in the Prometheus text exposition format"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+        for suffix, labels, value in samples:
+            if value is not None:
+                lines.append(f"{PREFIX}_{name}{suffix}{_labels(**labels)} {value:g}")
+
+    metric("fetches_total", "counter", "Fleet pages fetched", [("", {}, report["fetches"])])
+    metric("fetches_per_second", "gauge", f"Fetches per second over the last {RATE_WINDOW:g}s",
+           [("", {}, report["fetches_per_sec"])])
+    metric("outcomes_total", "counter", "Fetches by probe outcome",
+           [("", {"outcome": outcome}, count) for outcome, count in report["outcomes"].items()])
+    metric("skipped_total", "counter", "IDs skipped without a fetch",
+           [("", {"reason": reason}, count) for reason, count in report["skipped"].items()])
+    metric("browser_resets_total", "counter", "Browser or session resets by cause",
+           [("", {"cause": cause}, count) for cause, count in report["resets"].items()])
+    metric("db_lock_waits_total", "counter", "Retries after 'database is locked'", [("", {}, report["lock_waits"])])
+    metric("db_lock_wait_seconds_total", "counter", "Seconds spent waiting on database locks",
+           [("", {}, report["lock_wait_seconds"])])
+
+    samples = []
+    for stage, histogram in report["stages"].items():
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), histogram["buckets"]):
+            cumulative += count
+            samples.append(("_bucket", {"stage": stage, "le": "+Inf" if bound == float("inf") else f"{bound:g}"},
+                            cumulative))
+        samples.append(("_sum", {"stage": stage}, histogram["sum"]))
+        samples.append(("_count", {"stage": stage}, histogram["count"]))
+    metric("stage_seconds", "histogram", "Duration of each stage of a fleet", samples)
+
+    metric("queue_depth", "gauge", "Items waiting in a queue",
+           [("", {"queue": name}, depth) for name, depth in report["queues"].items()])
+    metric("worker_ids_left", "gauge", "IDs left in a worker's range",
+           [("", {"worker": worker_id}, worker["left"]) for worker_id, worker in report["workers"].items()])
+    metric("worker_ids_done_total", "counter", "IDs a worker finished or skipped",
+           [("", {"worker": worker_id}, worker["done"]) for worker_id, worker in report["workers"].items()])
+    metric("worker_eta_seconds", "gauge", "Estimated seconds until a worker's range is done",
+           [("", {"worker": worker_id}, worker["eta_seconds"]) for worker_id, worker in report["workers"].items()])
+    if "blocks" in report:
+        metric("blocks", "gauge", "Scheduler blocks by status",
+               [("", {"status": "done"}, report["blocks"]["done"]),
+                ("", {"status": "total"}, report["blocks"]["total"])])
+        metric("eta_seconds", "gauge", "Estimated seconds until the block queue is done",
+               [("", {}, report["blocks"]["eta_seconds"])])
+    if "rate_limit" in report:
+        metric("rate_limit", "gauge", "Current shared requests/sec budget", [("", {}, report["rate_limit"])])
+    return "\n".join(lines) + "\n"
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+def print_report(report):
+    """Print a metrics.json report as a short text summary"""
+    print(f"Uptime {report['uptime']:.0f}s, {report['fetches']} fetches, "
+          f"{report['fetches_per_sec']:.2f} fetches/sec, {report['ids_per_sec']:.2f} IDs/sec")
+    print("Outcomes: " + ", ".join(f"{outcome} {count} ({report['hit_rate'][outcome]:.1%})"
+                                   for outcome, count in report["outcomes"].items()))
+    print("Resets: " + ", ".join(f"{cause} {count}" for cause, count in report["resets"].items()))
+    print(f"Lock waits: {report['lock_waits']} ({report['lock_wait_seconds']:.1f}s)")
+    for name, depth in report["queues"].items():
+        print(f"Queue {name}: {depth}")
+    print(f"{'stage':14s} {'count':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    for stage, histogram in report["stages"].items():
+        if not histogram["count"]:
+            continue
+        print(f"{stage:14s} {histogram['count']:8d} {_format_seconds(histogram['p50']):>8s} "
+              f"{_format_seconds(histogram['p95']):>8s} {_format_seconds(histogram['p99']):>8s}")
+    for worker_id, worker in report["workers"].items():
+        if worker["started"]:
+            eta = worker["eta_seconds"]
+            print(f"Worker {worker_id}: {worker['done']} done, {worker['left']} left, "
+                  f"ETA {'-' if eta is None else f'{eta / 60:.1f} min'}")
+    if "blocks" in report:
+        eta = report["blocks"]["eta_seconds"]
+        print(f"Blocks: {report['blocks']['done']}/{report['blocks']['total']} done, "
+              f"ETA {'-' if eta is None else f'{eta / 60:.1f} min'}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Read the live metrics of a running kingston-scraper2.py')
+    parser.add_argument('--url', default='http://127.0.0.1:9108/metrics.json', help='metrics.json URL of the scraper')
+    parser.add_argument('--watch', type=float, default=0, help='Repeat every N seconds')
+    args = parser.parse_args()
+
+    while True:
+        with urllib.request.urlopen(args.url, timeout=10) as response:
+            print_report(json.load(response))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+        print()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    main()
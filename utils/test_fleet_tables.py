@@ -0,0 +1,61 @@
+import sqlite3
+import unittest
+from fleet_tables import ensure_fleet_tables, dedup_fleets, count_unique_lists, EMPTY_FINGERPRINT
+
+LIST = """Name: Motti
+Faction: Imperial
+Commander: Admiral Motti
+ISD Kuat Refit (112)
+• Admiral Motti (24)
+= 136 Points
+Squadrons:
+• 3 x TIE Interceptor Squadron (33)
+= 33 Points
+Total Points: 169
+"""
+
+class DedupFleetsTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute('''
+        CREATE TABLE fleets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fleet_data TEXT,
+            faction TEXT,
+            fleet_name TEXT,
+            commander TEXT,
+            points INTEGER,
+            numerical_id INTEGER UNIQUE
+        )
+        ''')
+        ensure_fleet_tables(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def add(self, numerical_id, fleet_data, fleet_name="fleet"):
+        self.conn.execute("INSERT INTO fleets (fleet_data, fleet_name, points, numerical_id) VALUES (?, ?, 0, ?)",
+                          (fleet_data, fleet_name, numerical_id))
+        self.conn.commit()
+
+    def stored_ids(self):
+        return sorted(row[0] for row in self.conn.execute("SELECT numerical_id FROM fleets"))
+
+    def test_repeated_list_is_removed(self):
+        self.add(1, LIST)
+        self.add(2, LIST.replace("Name: Motti", "Name: Motti again"))
+        self.assertEqual(dedup_fleets(self.conn), 1)
+        self.assertEqual(self.stored_ids(), [1])
+
+    def test_different_unparseable_fleets_survive(self):
+        self.add(1, "This fleet could not be exported")
+        self.add(2, "Something else entirely\nwith no ships")
+        self.add(3, LIST)
+        self.assertEqual(dedup_fleets(self.conn), 0)
+        self.assertEqual(self.stored_ids(), [1, 2, 3])
+        fingerprints = [row[0] for row in self.conn.execute("SELECT fingerprint FROM fleets ORDER BY numerical_id")]
+        self.assertEqual(fingerprints[:2], [EMPTY_FINGERPRINT, EMPTY_FINGERPRINT])
+        self.assertEqual(count_unique_lists(self.conn), (3, 0))
+
+if __name__ == "__main__":
+    unittest.main()